@@ -1,7 +1,11 @@
 import os
-import shutil
-from pathlib import Path
-from ultralytics import YOLO
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cpu_inference import load_model
+from file_transfer import transfer_files
+from inference_cache import InferenceCache, Detections
 
 # CONFIGURATION PARAMETERS
 # List all directories you want to scan for images
@@ -17,6 +21,9 @@ TARGET_FOLDER = "path/to/destination_folder"
 # Path to your custom YOLO model
 MODEL_PATH = "custom_model.pt"
 
+# "pytorch", or "onnxruntime" / "openvino" on PCs without a GPU (see cpu_inference.py)
+BACKEND = "pytorch"
+
 # Number of top images to extract per subfolder
 NUM_TOP_IMAGES = 2
 
@@ -26,92 +33,187 @@ MIN_CONFIDENCE_THRESHOLD = 0.1
 # Valid image extensions
 VALID_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
 
+# Images per model call
+BATCH_SIZE = 16
+
+# Subfolders scored at the same time. With "pytorch" every worker thread loads its own
+# copy of the model (a YOLO model must not be shared between threads); lower this on a
+# small GPU. The CPU backends share one thread-safe session.
+FOLDER_WORKERS = min(4, os.cpu_count() or 1)
+
+# Confidence the model uses for its boxes (ultralytics' default)
+DETECTION_CONF = 0.25
+
+# Cache all detections per image (see inference_cache.py), so re-runs with another
+# MIN_CONFIDENCE_THRESHOLD or NUM_TOP_IMAGES skip the model for images seen before
+USE_CACHE = False
+
+_local = threading.local()
+_shared_model = None
+_spare_model = None  # loaded by main() to check the model; handed to the first worker
+_spare_lock = threading.Lock()
+_cache = None
+
+
+def get_model():
+    """The model of the current worker thread (loaded on first use)."""
+    global _shared_model, _spare_model
+    if BACKEND != "pytorch":
+        if _shared_model is None:
+            _shared_model = load_model(MODEL_PATH, BACKEND)
+        return _shared_model
+    model = getattr(_local, "model", None)
+    if model is None:
+        with _spare_lock:
+            model, _spare_model = _spare_model, None
+        if model is None:
+            model = load_model(MODEL_PATH, BACKEND)
+        _local.model = model
+    return model
+
+
+def batch_max_conf(results):
+    """
+    Highest box confidence per image of a batch (0.0 without boxes).
+
+    The confidences of the whole batch are concatenated and reduced per image on the
+    model's device, so there is one device-to-host copy per batch instead of one per image.
+    """
+    if results and isinstance(results[0], Detections):  # CPU backend, already NumPy
+        return [det.max_conf for det in results]
+
+    import torch
+    confs = [r.boxes.conf if r.boxes is not None else torch.empty(0) for r in results]
+    if not confs:
+        return []
+    device = confs[0].device
+    values = torch.cat([c.to(device) for c in confs])
+    counts = torch.tensor([len(c) for c in confs], device=device)
+    index = torch.repeat_interleave(torch.arange(len(confs), device=device), counts)
+    maxes = torch.zeros(len(confs), dtype=values.dtype, device=device)
+    return maxes.scatter_reduce(0, index, values, reduce="amax").tolist()
+
+
+def score_subfolder(subfolder_path):
+    """
+    Score all images of one subfolder in batches and keep the NUM_TOP_IMAGES best.
+
+    Returns (number of images, [(filename, score)] best first). Only a heap of
+    NUM_TOP_IMAGES entries is kept in memory, not a score per image.
+    """
+    files = [f for f in os.listdir(subfolder_path) if os.path.splitext(f)[1].lower() in VALID_EXTENSIONS]
+    if not files:
+        return 0, []
+
+    model = get_model()
+    heap = []  # min-heap of (score, -index, filename); the index keeps ties in listing order
+    for start in range(0, len(files), BATCH_SIZE):
+        batch = files[start:start + BATCH_SIZE]
+        paths = [os.path.join(subfolder_path, f) for f in batch]
+        if _cache is not None:
+            scores = [det.max_conf for det in _cache.predict(model, paths, conf=DETECTION_CONF)]
+        else:
+            scores = batch_max_conf(model(paths, conf=DETECTION_CONF, verbose=False))
+        for offset, (filename, max_conf) in enumerate(zip(batch, scores)):
+            # Only keep images that meet the threshold
+            if max_conf < MIN_CONFIDENCE_THRESHOLD:
+                continue
+            entry = (max_conf, -(start + offset), filename)
+            if len(heap) < NUM_TOP_IMAGES:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    best = sorted(heap, reverse=True)
+    return len(files), [(filename, score) for score, _, filename in best]
+
+
+def move_selection(item, subfolder_path, best_selection, reserved):
+    moves = []
+    for filename, score in best_selection:
+        source_file = os.path.join(subfolder_path, filename)
+
+        # Create a unique filename to prevent overwriting in the target folder
+        new_name = f"{item}_{filename}"
+        target_file = os.path.join(TARGET_FOLDER, new_name)
+
+        # Handle duplicate filenames in the target directory
+        counter = 1
+        name_parts = os.path.splitext(new_name)
+        while target_file in reserved or os.path.exists(target_file):
+            target_file = os.path.join(TARGET_FOLDER, f"{name_parts[0]}_{counter}{name_parts[1]}")
+            counter += 1
+        reserved.add(target_file)
+
+        print(f" -> Moving: {filename} (Score: {score:.2f})")
+        moves.append((source_file, target_file))
+
+    report = transfer_files(moves, mode="move", desc=item, verbose=False)
+    for src, dst, error in report.failures:
+        print(f"    ERROR during move of {os.path.basename(src)}: {error}")
+
+
 # Main code
 def main():
+    global _cache, _spare_model
+
     # Ensure target directory exists
     os.makedirs(TARGET_FOLDER, exist_ok=True)
-    
+
     print(f"Loading model: {MODEL_PATH}...")
     try:
-        model = YOLO(MODEL_PATH)
+        if BACKEND == "pytorch":
+            # Handed to the first worker thread: the main thread keeps no model of its own
+            _spare_model = load_model(MODEL_PATH, BACKEND)
+        else:
+            get_model()
     except Exception as e:
         print(f"ERROR: Could not load model. Check the path. ({e})")
         return
 
-    # Iterate through all specified source root folders
-    for source_root in SOURCE_FOLDERS:
-        if not os.path.exists(source_root):
-            print(f"\nWARNING: Path not found, skipping: {source_root}")
-            continue
+    if USE_CACHE:
+        _cache = InferenceCache(MODEL_PATH, backend=BACKEND)
 
-        print(f"\n======= Scanning Root: {source_root} =======")
-        print(f"Minimum score threshold: {MIN_CONFIDENCE_THRESHOLD}")
-
-        for item in os.listdir(source_root):
-            subfolder_path = os.path.join(source_root, item)
-            
-            # Only process directories
-            if not os.path.isdir(subfolder_path):
+    reserved = set()  # target names already claimed in this run
+    with ThreadPoolExecutor(max_workers=FOLDER_WORKERS) as pool:
+        # Iterate through all specified source root folders
+        for source_root in SOURCE_FOLDERS:
+            if not os.path.exists(source_root):
+                print(f"\nWARNING: Path not found, skipping: {source_root}")
                 continue
 
-            print(f"\n--- Processing subfolder: {item} ---")
-            
-            image_scores = []
-            files = [f for f in os.listdir(subfolder_path) if os.path.splitext(f)[1].lower() in VALID_EXTENSIONS]
-            
-            if not files:
-                print("No images found in this folder.")
-                continue
+            print(f"\n======= Scanning Root: {source_root} =======")
+            print(f"Minimum score threshold: {MIN_CONFIDENCE_THRESHOLD}")
 
-            # Run predictions on each image
-            for filename in files:
-                full_path = os.path.join(subfolder_path, filename)
-                
-                # Run inference
-                results = model(full_path, verbose=False)
-                
-                max_conf = 0.0
-                for result in results:
-                    boxes = result.boxes
-                    if boxes is not None and len(boxes) > 0:
-                        confs = boxes.conf.cpu().numpy()
-                        if len(confs) > 0:
-                            max_conf = max(confs)
-                
-                # Only keep images that meet the threshold
-                if max_conf >= MIN_CONFIDENCE_THRESHOLD:
-                    image_scores.append((filename, max_conf))
-
-            # Sort images by confidence score (highest first)
-            image_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            # Select the top N images
-            best_selection = image_scores[:NUM_TOP_IMAGES]
-            
-            if not best_selection:
-                print(f"No images in '{item}' met the threshold of {MIN_CONFIDENCE_THRESHOLD}.")
-            else:
-                print(f"Selected top {len(best_selection)} (above threshold):")
-
-                for filename, score in best_selection:
-                    source_file = os.path.join(subfolder_path, filename)
-                    
-                    # Create a unique filename to prevent overwriting in the target folder
-                    new_name = f"{item}_{filename}"
-                    target_file = os.path.join(TARGET_FOLDER, new_name)
-
-                    # Handle duplicate filenames in the target directory
-                    counter = 1
-                    name_parts = os.path.splitext(new_name)
-                    while os.path.exists(target_file):
-                        target_file = os.path.join(TARGET_FOLDER, f"{name_parts[0]}_{counter}{name_parts[1]}")
-                        counter += 1
-                    
-                    print(f" -> Moving: {filename} (Score: {score:.2f})")
-                    try:
-                        shutil.move(source_file, target_file)
-                    except Exception as e:
-                        print(f"    ERROR during move: {e}")
+            # Only process directories
+            subfolders = [item for item in sorted(os.listdir(source_root))
+                          if os.path.isdir(os.path.join(source_root, item))]
+
+            # Score subfolders on the worker pool; move the winners as folders finish
+            futures = {pool.submit(score_subfolder, os.path.join(source_root, item)): item
+                       for item in subfolders}
+            for future in as_completed(futures):
+                item = futures[future]
+                subfolder_path = os.path.join(source_root, item)
+                print(f"\n--- Processing subfolder: {item} ---")
+                try:
+                    n_images, best_selection = future.result()
+                except Exception as e:
+                    print(f"ERROR while scoring '{item}': {e}")
+                    continue
+
+                if n_images == 0:
+                    print("No images found in this folder.")
+                elif not best_selection:
+                    print(f"No images in '{item}' met the threshold of {MIN_CONFIDENCE_THRESHOLD}.")
+                else:
+                    print(f"Selected top {len(best_selection)} (above threshold):")
+                    move_selection(item, subfolder_path, best_selection, reserved)
+
+    if _cache is not None:
+        stats = _cache.stats()
+        _cache.close()
+        print(f"\nInference cache: {stats['hits']} hits, {stats['misses']} misses ({stats['mb']:.1f} MB)")
 
     print("\n--- Process Completed Successfully! ---")
 
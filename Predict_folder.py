@@ -1,7 +1,59 @@
-from ultralytics import YOLO
+from cpu_inference import load_model
 
 # Load trained model
-model = YOLO("custom_model.pt")
+MODEL_PATH = "custom_model.pt"
+# "pytorch", or "onnxruntime" / "openvino" on PCs without a GPU (see cpu_inference.py)
+BACKEND = "pytorch"
+model = load_model(MODEL_PATH, BACKEND)
 
-# Run the prediction on your folder
-model.predict(source=r"path/to/folder/", show=True, save=True, conf=0.4, verbose=True)
+SOURCE_FOLDER = r"path/to/folder/"
+CONF = 0.4
+
+# Cached mode (see inference_cache.py): detections of every image are stored, so a
+# re-run over the same folder (also with another CONF) skips the model.
+# In cached mode and with the CPU backends, annotated images are written to
+# CACHED_SAVE_DIR instead of being shown.
+USE_CACHE = False
+CACHED_SAVE_DIR = r"runs/detect/cached"
+
+if BACKEND == "pytorch" and not USE_CACHE:
+    # Run the prediction on your folder
+    model.predict(source=SOURCE_FOLDER, show=True, save=True, conf=CONF, verbose=True)
+else:
+    import os
+    import cv2
+    from contextlib import nullcontext
+    from inference_cache import InferenceCache, Detections
+
+    extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+    paths = sorted(os.path.join(SOURCE_FOLDER, f) for f in os.listdir(SOURCE_FOLDER)
+                   if f.lower().endswith(extensions))
+    os.makedirs(CACHED_SAVE_DIR, exist_ok=True)
+
+    def predict_uncached(batch_size=16):
+        for start in range(0, len(paths), batch_size):
+            for result in model.predict(source=paths[start:start + batch_size], conf=CONF, verbose=False):
+                yield Detections.from_result(result)
+
+    with InferenceCache(MODEL_PATH, backend=BACKEND) if USE_CACHE else nullcontext() as cache:
+        detections = cache.predict(model, paths, conf=CONF) if cache else predict_uncached()
+        for path, det in zip(paths, detections):
+            counts = {}
+            for cls in det.classes.tolist():
+                counts[model.names[cls]] = counts.get(model.names[cls], 0) + 1
+            summary = ", ".join(f"{n} {name}" for name, n in counts.items()) or "(no detections)"
+            print(f"{os.path.basename(path)}: {summary}")
+
+            img = cv2.imread(path)
+            if img is None:
+                continue
+            for (x1, y1, x2, y2), score, cls in zip(det.xyxy.astype(int), det.scores, det.classes):
+                cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(img, f"{model.names[cls]} {score:.2f}", (x1, max(y1 - 5, 10)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            cv2.imwrite(os.path.join(CACHED_SAVE_DIR, os.path.basename(path)), img)
+
+        stats = cache.stats() if cache else None
+    print(f"Results saved to {CACHED_SAVE_DIR}")
+    if stats:
+        print(f"Inference cache: {stats['hits']} hits, {stats['misses']} misses ({stats['mb']:.1f} MB)")
@@ -1,7 +1,15 @@
 from ultralytics import YOLO
 
+from cpu_inference import export_model
+
+MODEL_PATH = "custom_model.pt"
+# "pytorch", or "onnxruntime" / "openvino" on PCs without a GPU (see cpu_inference.py).
+# The CPU backends export the model once; ultralytics then runs the export, so
+# show/save keep working for videos.
+BACKEND = "pytorch"
+
 # Load trained model
-model = YOLO("custom_model.pt")
+model = YOLO(MODEL_PATH if BACKEND == "pytorch" else export_model(MODEL_PATH, BACKEND), task="detect")
 
 # Run the prediction on .mp4 /.jpg / .png etc. files
 model.predict(source="file_name.mp4", show=True, save=True, conf=0.4, verbose=True)
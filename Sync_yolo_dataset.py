@@ -20,6 +20,8 @@ import sys
 import argparse
 from pathlib import Path
 
+from dataset_catalog import DirectoryCatalog
+
 
 def sync_yolo_dataset(images_folder, labels_folder, label_formats=None):
     """
@@ -51,21 +53,14 @@ def sync_yolo_dataset(images_folder, labels_folder, label_formats=None):
     if label_formats is None:
         label_formats = {'.txt', '.json', '.jsonl', '.xml', '.yaml', '.yml'}
     
-    # Collect all image files
-    image_files = set()
-    image_file_map = {}  # Maps stem to full Path object
-    for file in images_path.iterdir():
-        if file.suffix.lower() in image_extensions:
-            image_files.add(file.stem)
-            image_file_map[file.stem] = file
-    
-    # Collect all label files
-    label_files = set()
-    label_file_map = {}  # Maps stem to full Path object
-    for file in labels_path.iterdir():
-        if file.suffix.lower() in label_formats:
-            label_files.add(file.stem)
-            label_file_map[file.stem] = file
+    # Collect all image and label files (one directory scan each, stems matched case-insensitively)
+    image_catalog = DirectoryCatalog(images_path, sorted(image_extensions))
+    label_catalog = DirectoryCatalog(labels_path, sorted(label_formats))
+    image_files = image_catalog.stems()
+    label_files = label_catalog.stems()
+    # Maps stem to full Path objects (a stem can have several files, e.g. a.jpg + a.png)
+    image_file_map = {stem: [Path(e.path) for e in image_catalog.entries_for(stem)] for stem in image_files}
+    label_file_map = {stem: [Path(e.path) for e in label_catalog.entries_for(stem)] for stem in label_files}
     
     # Find images without labels
     images_without_labels = image_files - label_files
@@ -79,8 +74,8 @@ def sync_yolo_dataset(images_folder, labels_folder, label_formats=None):
     print("=" * 50)
     print(f"Image formats: {', '.join(sorted(image_extensions))}")
     print(f"Label formats: {', '.join(sorted(label_formats))}")
-    print(f"Total images found: {len(image_files)}")
-    print(f"Total labels found: {len(label_files)}")
+    print(f"Total images found: {len(image_catalog)}")
+    print(f"Total labels found: {len(label_catalog)}")
     print(f"Images without labels: {len(images_without_labels)}")
     print(f"Labels without images: {len(labels_without_images)}")
     print("=" * 50)
@@ -91,16 +86,16 @@ def sync_yolo_dataset(images_folder, labels_folder, label_formats=None):
         if images_without_labels:
             print("\nImages without labels:")
             for img in sorted(images_without_labels)[:10]:  # Show first 10
-                img_path = image_file_map[img]
-                print(f"  - {img_path.name}")
+                for img_path in image_file_map[img]:
+                    print(f"  - {img_path.name}")
             if len(images_without_labels) > 10:
                 print(f"  ... and {len(images_without_labels) - 10} more")
         
         if labels_without_images:
             print("\nLabels without images:")
             for lbl in sorted(labels_without_images)[:10]:  # Show first 10
-                lbl_path = label_file_map[lbl]
-                print(f"  - {lbl_path.name}")
+                for lbl_path in label_file_map[lbl]:
+                    print(f"  - {lbl_path.name}")
             if len(labels_without_images) > 10:
                 print(f"  ... and {len(labels_without_images) - 10} more")
         
@@ -115,24 +110,22 @@ def sync_yolo_dataset(images_folder, labels_folder, label_formats=None):
         # Remove images without labels
         removed_images = 0
         for img_stem in images_without_labels:
-            img_path = image_file_map[img_stem]
-            if img_path.exists():
-                img_path.unlink()
+            for img_path in image_file_map[img_stem]:
+                img_path.unlink(missing_ok=True)
                 removed_images += 1
                 print(f"Removed: {img_path}")
         
         # Remove labels without images
         removed_labels = 0
         for lbl_stem in labels_without_images:
-            lbl_path = label_file_map[lbl_stem]
-            if lbl_path.exists():
-                lbl_path.unlink()
+            for lbl_path in label_file_map[lbl_stem]:
+                lbl_path.unlink(missing_ok=True)
                 removed_labels += 1
                 print(f"Removed: {lbl_path}")
         
         # Calculate remaining files
-        remaining_images = len(image_files) - removed_images
-        remaining_labels = len(label_files) - removed_labels
+        remaining_images = len(image_catalog) - removed_images
+        remaining_labels = len(label_catalog) - removed_labels
         
         print("\n" + "=" * 50)
         print("Synchronization Complete!")
@@ -0,0 +1,341 @@
+"""
+Multi-Camera Inference Service
+
+Runs one model for all cameras in config.py (every RTSP_URL_CAMERA<N> entry):
+
+  * one decode thread per camera keeps only the latest frame (older, unprocessed
+    frames are counted as dropped instead of queueing up behind the model)
+  * one model worker collects the newest frame of every camera and runs them as a
+    single batch per inference step
+
+So four cameras cost one model's memory, and a slow model lowers the processed frame
+rate instead of adding delay. With MOTION_GATE every reader first runs a cheap motion
+check (motion_gate.py), so static scenes only reach the model on the heartbeat. Per-camera read/inference FPS, drops and reconnects are
+printed every STATS_INTERVAL seconds and written to STATS_FILE (JSON).
+
+Local video files can stand in for the cameras (they are played at their own frame
+rate, like a live stream):
+    python camera_service.py --sources cam1.mp4 cam2.mp4 --loop --duration 60
+
+Usage:
+    python camera_service.py                     # cameras from config.py
+    python camera_service.py --show              # with a preview window per camera
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+
+import cv2
+
+from cpu_inference import load_model
+from inference_cache import Detections
+from motion_gate import MotionGate
+
+# ========================================
+# CONFIGURATION PARAMETERS
+# ========================================
+MODEL_PATH = "custom_model.pt"
+BACKEND = "pytorch"        # or "onnxruntime" / "openvino" (see cpu_inference.py)
+CONF = 0.4
+IMGSZ = None               # None = the size the model was trained at
+
+STATS_INTERVAL = 10        # seconds between stats reports
+STATS_FILE = "camera_stats.json"
+RECONNECT_DELAY = 5        # seconds before reopening a camera that stopped delivering frames
+FRAME_WAIT = 0.5           # max. seconds the model worker waits for a new frame
+MOTION_GATE = True         # only offer frames with motion (or a heartbeat) to the model
+
+# Save frames with detections (None = off); at most one per camera per SAVE_COOLDOWN seconds
+SAVE_DIR = None
+SAVE_COOLDOWN = 10
+JPEG_QUALITY = 90
+
+
+def cameras_from_config() -> dict:
+    """{camera name: url} for every RTSP_URL_CAMERA<N> in config.py, in camera order."""
+    try:
+        import config
+    except ImportError:
+        print("Error: No config.py found")
+        return {}
+    cameras = {}
+    for name in dir(config):
+        match = re.fullmatch(r"RTSP_URL_CAMERA(\d+)", name)
+        if match and getattr(config, name):
+            cameras[int(match.group(1))] = getattr(config, name)
+    return {f"camera{n}": cameras[n] for n in sorted(cameras)}
+
+
+class CameraReader(threading.Thread):
+    """Decode thread for one camera; holds only the most recent frame."""
+
+    def __init__(self, name, source, new_frame, stop, loop=False, gate=None):
+        super().__init__(name=f"reader-{name}", daemon=True)
+        self.camera = name
+        self.source = source
+        self.is_file = os.path.isfile(str(source))
+        self.loop = loop
+        self.gate = gate
+        self._new_frame = new_frame
+        self._stop_event = stop
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_id = 0
+        self._consumed_id = 0
+        self.finished = False
+
+        # Counters (only ever increased; rates are computed from differences)
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_inferred = 0
+        self.reconnects = 0
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def run(self):
+        cap = self._open()
+        # Files are played at their own frame rate so they behave like a live camera
+        frame_time = 1 / (cap.get(cv2.CAP_PROP_FPS) or 25) if self.is_file else 0
+        next_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            ok, frame = cap.read() if cap.isOpened() else (False, None)
+            if not ok:
+                if self.is_file and self.loop and cap.isOpened():
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if self.is_file:
+                    break
+                print(f"[{self.camera}] No frame, reconnecting in {RECONNECT_DELAY}s...")
+                cap.release()
+                if self._stop_event.wait(RECONNECT_DELAY):
+                    break
+                cap = self._open()
+                self.reconnects += 1
+                continue
+
+            self.frames_read += 1
+            # The gate runs here, in the camera's own thread, so it adds no model-loop time
+            if self.gate is None or self.gate.check(frame):
+                with self._lock:
+                    if self._frame_id > self._consumed_id:
+                        self.frames_dropped += 1  # previous frame was never processed
+                    self._frame = frame
+                    self._frame_id += 1
+                self._new_frame.set()
+
+            if frame_time:
+                next_time += frame_time
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.perf_counter()
+        cap.release()
+        self.finished = True
+        self._new_frame.set()
+
+    def take_latest(self):
+        """The newest frame if it was not processed yet, else None."""
+        with self._lock:
+            if self._frame_id == self._consumed_id:
+                return None
+            self._consumed_id = self._frame_id
+            return self._frame
+
+
+class CameraService:
+    """One model worker serving all camera readers with batched inference."""
+
+    def __init__(self, sources: dict, model, loop=False, show=False, conf=CONF, imgsz=IMGSZ,
+                 motion_gate=MOTION_GATE):
+        self.model = model
+        self.show = show
+        self.conf = conf
+        self.imgsz = imgsz
+        self.stop_event = threading.Event()
+        self.new_frame = threading.Event()
+        self.readers = [CameraReader(name, src, self.new_frame, self.stop_event, loop,
+                                     MotionGate() if motion_gate else None)
+                        for name, src in sources.items()]
+        self.batches = 0
+        self.batch_images = 0
+        self.batch_seconds = 0.0
+        self._last_saved = {}
+        self._last_stats = None
+
+    # ── inference ──────────────────────────────────────────────────────────────
+
+    def step(self) -> int:
+        """Run one batch over the newest unprocessed frame of every camera."""
+        batch = []
+        for reader in self.readers:
+            frame = reader.take_latest()
+            if frame is not None:
+                batch.append((reader, frame))
+        if not batch:
+            return 0
+
+        t0 = time.perf_counter()
+        kwargs = {"imgsz": self.imgsz} if self.imgsz else {}
+        results = self.model.predict([frame for _, frame in batch], conf=self.conf,
+                                     verbose=False, **kwargs)
+        self.batch_seconds += time.perf_counter() - t0
+        self.batches += 1
+        self.batch_images += len(batch)
+
+        for (reader, frame), result in zip(batch, results):
+            reader.frames_inferred += 1
+            self.handle(reader.camera, frame, Detections.from_result(result))
+        return len(batch)
+
+    def handle(self, camera, frame, det):
+        """Per-frame output: optional saving of frames with detections and preview."""
+        if SAVE_DIR and len(det):
+            now = time.time()
+            if now - self._last_saved.get(camera, 0) >= SAVE_COOLDOWN:
+                self._last_saved[camera] = now
+                os.makedirs(SAVE_DIR, exist_ok=True)
+                name = f"{camera}_{datetime.now():%Y%m%d_%H%M%S}.jpg"
+                cv2.imwrite(os.path.join(SAVE_DIR, name), frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                print(f"[{camera}] {len(det)} detections, saved {name}")
+
+        if self.show:
+            preview = frame.copy()
+            for (x1, y1, x2, y2), score, cls in zip(det.xyxy.astype(int), det.scores, det.classes):
+                cv2.rectangle(preview, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(preview, f"{self.model.names.get(int(cls), cls)} {score:.2f}", (x1, max(y1 - 5, 10)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            cv2.imshow(camera, preview)
+
+    # ── stats ──────────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """Per-camera counters and rates since the previous call, plus model totals."""
+        now = time.perf_counter()
+        counters = {r.camera: (r.frames_read, r.frames_inferred, r.frames_dropped) for r in self.readers}
+        model_counters = (self.batches, self.batch_images, self.batch_seconds)
+        prev_time, prev, prev_model = self._last_stats or (now, {}, (0, 0, 0.0))
+        elapsed = max(now - prev_time, 1e-9)
+        self._last_stats = (now, counters, model_counters)
+
+        cameras = {}
+        for r in self.readers:
+            read, inferred, dropped = counters[r.camera]
+            p_read, p_inferred, p_dropped = prev.get(r.camera, (0, 0, 0))
+            cameras[r.camera] = {
+                "read_fps": round((read - p_read) / elapsed, 1),
+                "inference_fps": round((inferred - p_inferred) / elapsed, 1),
+                "dropped": dropped,
+                "dropped_interval": dropped - p_dropped,
+                "frames_read": read,
+                "frames_inferred": inferred,
+                "reconnects": r.reconnects,
+                "finished": r.finished,
+            }
+            if r.gate is not None:
+                cameras[r.camera]["gate"] = r.gate.stats()
+        batches = model_counters[0] - prev_model[0]
+        images = model_counters[1] - prev_model[1]
+        seconds = model_counters[2] - prev_model[2]
+        return {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "cameras": cameras,
+            "model": {
+                "batches_per_s": round(batches / elapsed, 2),
+                "avg_batch": round(images / batches, 2) if batches else 0,
+                "ms_per_batch": round(seconds * 1000 / batches, 1) if batches else 0,
+            },
+        }
+
+    def report_stats(self):
+        stats = self.stats()
+        model = stats["model"]
+        print(f"\n[{stats['time']}] model: {model['batches_per_s']} batches/s, "
+              f"avg batch {model['avg_batch']}, {model['ms_per_batch']} ms/batch")
+        for camera, s in stats["cameras"].items():
+            print(f"  {camera:10s} read {s['read_fps']:5.1f} fps | inferred {s['inference_fps']:5.1f} fps | "
+                  f"dropped {s['dropped_interval']} (total {s['dropped']}) | reconnects {s['reconnects']}")
+            if "gate" in s:
+                g = s["gate"]
+                print(f"  {'':10s} gate hit rate {g['hit_rate']:.1%} ({g['motion']} motion, "
+                      f"{g['heartbeats']} heartbeat), {g['skipped']} inferences saved")
+        if STATS_FILE:
+            with open(STATS_FILE, "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=2)
+        return stats
+
+    # ── main loop ──────────────────────────────────────────────────────────────
+
+    def run(self, duration=None):
+        for reader in self.readers:
+            reader.start()
+        self.stats()  # start the first stats interval
+        start = last_report = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                self.new_frame.wait(FRAME_WAIT)
+                self.new_frame.clear()
+                self.step()
+
+                if self.show and cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                now = time.perf_counter()
+                if now - last_report >= STATS_INTERVAL:
+                    self.report_stats()
+                    last_report = now
+                if duration and now - start >= duration:
+                    break
+                if all(r.finished for r in self.readers):
+                    self.step()  # last frames
+                    break
+        except KeyboardInterrupt:
+            print("\nStopping...")
+        finally:
+            self.stop_event.set()
+            for reader in self.readers:
+                reader.join(timeout=2)
+            if self.show:
+                cv2.destroyAllWindows()
+            self.report_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run one batched model over all cameras in config.py",
+        epilog="Example: python camera_service.py --sources cam1.mp4 cam2.mp4 cam3.mp4 cam4.mp4 --loop")
+    parser.add_argument("--sources", nargs="+",
+                        help="Video files or URLs instead of the cameras in config.py (for testing)")
+    parser.add_argument("--loop", action="store_true", help="Restart video files at the end")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--show", action="store_true", help="Show a preview window per camera")
+    parser.add_argument("--no-gate", action="store_true", help="Send every frame to the model (no motion gate)")
+    parser.add_argument("--model", default=MODEL_PATH, help=f"Model (default: {MODEL_PATH})")
+    parser.add_argument("--backend", default=BACKEND, help=f"Inference backend (default: {BACKEND})")
+    args = parser.parse_args()
+
+    if args.sources:
+        sources = {f"camera{i}": src for i, src in enumerate(args.sources, 1)}
+    else:
+        sources = cameras_from_config()
+    if not sources:
+        print("Error: No cameras found (add RTSP_URL_CAMERA1, ... to config.py or use --sources)")
+        sys.exit(1)
+
+    print(f"Loading model: {args.model} ({args.backend})...")
+    model = load_model(args.model, args.backend)
+    print(f"Starting {len(sources)} cameras: {', '.join(sources)}")
+    CameraService(sources, model, loop=args.loop, show=args.show,
+                  motion_gate=MOTION_GATE and not args.no_gate).run(args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,621 @@
+"""
+YOLO / COCO / Pascal VOC Label Converter
+
+Converts annotations between:
+    YOLO txt   : one <stem>.txt per image, bbox or segmentation rows (as read by seg_to_bbox.py)
+    COCO JSON  : one annotations file (images, annotations, categories)
+    Pascal VOC : one <stem>.xml per image (bounding boxes only)
+
+COCO files are read and written as streams: the reader walks the top-level
+object and decodes one array item at a time, the writer emits images while the
+annotations are spooled to a temp file. A multi-million-annotation COCO file
+never has to sit in memory as a whole; only the image table (id → name, size)
+and the categories are kept.
+
+The heavy per-item work (annotation → YOLO rows, label file → COCO records,
+XML parsing/writing) runs on a process pool in chunks.
+
+Usage:
+    python convert_labels.py coco2yolo --json instances.json --output labels/ [--task segment]
+    python convert_labels.py yolo2coco --images images/ --labels labels/ --yaml dataset.yaml --output instances.json
+    python convert_labels.py yolo2voc  --images images/ --labels labels/ --yaml dataset.yaml --output xml/
+    python convert_labels.py voc2yolo  --xml xml/ --output labels/ [--yaml dataset.yaml]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np  # pip install numpy
+import yaml  # pip install pyyaml
+
+from dataset_catalog import DirectoryCatalog
+from image_probe import image_size
+from validate_yolo_dataset import load_class_names
+from yolo_labels import read_label_file
+
+# ===== DEFAULT CONFIGURATION =====
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff', '.tif']
+NUM_WORKERS = os.cpu_count() or 1
+READ_CHUNK_BYTES = 1 << 20    # COCO reader buffer refill size
+ANNOTATION_BATCH = 20000      # COCO annotations per worker task
+FILE_BATCH = 256              # label/XML files per worker task
+FLUSH_ROWS = 500000           # buffered YOLO rows before they are appended to the label files
+IO_THREADS = 8                # concurrent label file writes
+CLASSES_FILE = "classes.yaml" # class names written next to converted YOLO labels
+# ===== END CONFIGURATION =====
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Streaming JSON
+# ─────────────────────────────────────────────────────────────────────────────
+
+class JsonStreamReader:
+    """
+    Incremental reader for a JSON document with a top-level object.
+
+    Arrays under the top-level keys are decoded item by item (json's C decoder
+    per item), so memory use is bounded by the largest single item.
+    """
+
+    def __init__(self, path, chunk_bytes: int = READ_CHUNK_BYTES):
+        self.file = open(path, 'r', encoding='utf-8')
+        self.chunk_bytes = chunk_bytes
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fill(self) -> bool:
+        data = self.file.read(self.chunk_bytes)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character ('' at the end of the file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected '{char}', found '{found or 'end of file'}'")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue  # value continues in the next chunk
+                raise
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue  # a number may continue in the next chunk
+            self.pos = end
+            return value
+
+    def iter_arrays(self, keys):
+        """Yield (key, item) for every item of the top-level arrays named in keys."""
+        keys = set(keys)
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if self._peek() == '[':
+                # Walk arrays item by item, also the ones we skip (they can be huge)
+                self.pos += 1
+                if self._peek() == ']':
+                    self.pos += 1
+                else:
+                    while True:
+                        item = self._value()
+                        if key in keys:
+                            yield key, item
+                        sep = self._peek()
+                        self.pos += 1
+                        if sep == ']':
+                            break
+                        if sep != ',':
+                            raise ValueError(f"Invalid JSON in array '{key}'")
+            else:
+                self._value()
+            sep = self._peek()
+            self.pos += 1
+            if sep == '}':
+                return
+            if sep != ',':
+                raise ValueError("Invalid JSON: expected ',' or '}' in top-level object")
+
+
+class JsonArrayWriter:
+    """Writes array items one at a time (comma handling only; brackets are the caller's)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def write(self, item):
+        if self.count:
+            self.f.write(',\n')
+        self.f.write(json.dumps(item, separators=(',', ':')))
+        self.count += 1
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Shared helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def list_image_label_pairs(images_dir, labels_dir) -> list[tuple[str, str | None]]:
+    images = DirectoryCatalog(images_dir, IMAGE_EXTENSIONS)
+    labels = DirectoryCatalog(labels_dir, ['.txt'])
+    pairs = []
+    for entry in sorted(images, key=lambda e: e.name):
+        label = labels.find_entry(os.path.splitext(entry.name)[0])
+        pairs.append((entry.path, label.path if label is not None else None))
+    return pairs
+
+
+def batched(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def make_pool(workers: int):
+    """Process pool for the conversion work; with a single worker everything runs in this process."""
+    if workers > 1:
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=1)
+
+
+def run_ordered(pool, workers: int, func, batches, *args):
+    """Submit batches to the pool with a bounded window; yield results in submission order."""
+    window = deque()
+    max_in_flight = max(1, workers) * 2
+    for batch in batches:
+        window.append(pool.submit(func, batch, *args))
+        if len(window) >= max_in_flight:
+            yield window.popleft().result()
+    while window:
+        yield window.popleft().result()
+
+
+def polygon_area(points: np.ndarray) -> float:
+    x, y = points[:, 0], points[:, 1]
+    return float(0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+
+def write_classes_file(output_dir, names):
+    path = os.path.join(output_dir, CLASSES_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({'nc': len(names), 'names': list(names)}, f, allow_unicode=True, sort_keys=False)
+    return path
+
+
+def format_row(class_id: int, coords) -> str:
+    return f"{class_id} " + " ".join(f"{v:.6f}" for v in coords)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# COCO → YOLO
+# ─────────────────────────────────────────────────────────────────────────────
+
+def coco_annotations_to_rows(job, class_index: dict, task: str):
+    """
+    Worker: convert a (annotations, {image_id: (width, height)}) batch to YOLO rows.
+
+    Returns ([(image_id, row), ...], n_skipped). Crowd annotations (RLE) and
+    annotations without a usable box/polygon are skipped; in segment mode an
+    annotation without a polygon is written as its box outline.
+    """
+    batch, sizes = job
+    rows, skipped = [], 0
+    for ann in batch:
+        image_id = ann.get('image_id')
+        class_id = class_index.get(ann.get('category_id'))
+        size = sizes.get(image_id)
+        if ann.get('iscrowd') or class_id is None or size is None:
+            skipped += 1
+            continue
+        width, height = size
+
+        if task == 'segment':
+            polygons = ann.get('segmentation')
+            parts = [np.asarray(p, dtype=np.float64).reshape(-1, 2)
+                     for p in (polygons if isinstance(polygons, list) else [])
+                     if isinstance(p, list) and len(p) >= 6 and len(p) % 2 == 0]
+            if parts:
+                # YOLO rows hold one polygon: keep the part with the largest area
+                polygon = max(parts, key=polygon_area)
+                points = np.clip(polygon / (width, height), 0, 1)
+                rows.append((image_id, format_row(class_id, points.ravel())))
+                continue
+            # No usable polygon (e.g. a bbox-only annotation): use the box outline instead
+
+        x, y, w, h = ann.get('bbox', (0, 0, 0, 0))
+        if w <= 0 or h <= 0:
+            skipped += 1
+            continue
+        x1, x2 = max(x, 0) / width, min(x + w, width) / width
+        y1, y2 = max(y, 0) / height, min(y + h, height) / height
+        if task == 'segment':
+            rows.append((image_id, format_row(class_id, (x1, y1, x2, y1, x2, y2, x1, y2))))
+        else:
+            rows.append((image_id, format_row(class_id, ((x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1))))
+    return rows, skipped
+
+
+def coco_to_yolo(json_path, output_dir, task: str = 'detect', workers: int = NUM_WORKERS) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Pass 1: image table + categories (annotations are walked but not kept)
+    images, categories = {}, []
+    with JsonStreamReader(json_path) as reader:
+        for key, item in reader.iter_arrays(('images', 'categories')):
+            if key == 'images':
+                stem = os.path.splitext(os.path.basename(item['file_name']))[0]
+                images[item['id']] = (stem, item['width'], item['height'])
+            else:
+                categories.append(item)
+    categories.sort(key=lambda c: c['id'])
+    class_index = {c['id']: i for i, c in enumerate(categories)}
+    print(f"Images: {len(images)}   Categories: {len(categories)}")
+
+    stems = [stem.lower() for stem, _, _ in images.values()]
+    if len(set(stems)) != len(stems):
+        print(f"Warning: {len(stems) - len(set(stems))} images share a file stem; their labels are merged")
+
+    # Pass 2: stream annotations in batches to the workers
+    written = set()      # label files (lowercase stems) created in this run
+    buffer, buffered = {}, 0
+    n_rows = n_skipped = n_annotations = 0
+
+    def write_rows(stem, rows):
+        mode = 'a' if stem.lower() in written else 'w'
+        with open(os.path.join(output_dir, stem + '.txt'), mode, encoding='utf-8') as f:
+            f.write("\n".join(rows) + "\n")
+
+    def flush():
+        nonlocal buffered
+        per_file = {}
+        for image_id, rows in buffer.items():
+            per_file.setdefault(images[image_id][0], []).extend(rows)
+        with ThreadPoolExecutor(max_workers=IO_THREADS) as io_pool:
+            list(io_pool.map(lambda item: write_rows(*item), per_file.items()))
+        written.update(stem.lower() for stem in per_file)
+        buffer.clear()
+        buffered = 0
+
+    def annotation_batches(reader):
+        nonlocal n_annotations
+        batch = []
+        for _, ann in reader.iter_arrays(('annotations',)):
+            batch.append(ann)
+            if len(batch) >= ANNOTATION_BATCH:
+                n_annotations += len(batch)
+                yield batch, {i: images[i][1:] for i in {a.get('image_id') for a in batch} if i in images}
+                batch = []
+        if batch:
+            n_annotations += len(batch)
+            yield batch, {i: images[i][1:] for i in {a.get('image_id') for a in batch} if i in images}
+
+    start = time.perf_counter()
+    with JsonStreamReader(json_path) as reader, make_pool(workers) as pool:
+        for rows, skipped in run_ordered(pool, workers, coco_annotations_to_rows,
+                                         annotation_batches(reader), class_index, task):
+            n_skipped += skipped
+            n_rows += len(rows)
+            for image_id, row in rows:
+                buffer.setdefault(image_id, []).append(row)
+            buffered += len(rows)
+            if buffered >= FLUSH_ROWS:
+                flush()
+                print(f"   {n_rows} rows written ({time.perf_counter() - start:.0f}s)")
+    flush()
+
+    # Images without annotations get an empty label file (background images)
+    for stem, _, _ in images.values():
+        if stem.lower() not in written:
+            open(os.path.join(output_dir, stem + '.txt'), 'w').close()
+
+    names = [c.get('name', str(c['id'])) for c in categories]
+    classes_path = write_classes_file(output_dir, names)
+    return {'images': len(images), 'annotations': n_annotations, 'rows': n_rows,
+            'skipped': n_skipped, 'classes_file': classes_path}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# YOLO → COCO
+# ─────────────────────────────────────────────────────────────────────────────
+
+def yolo_files_to_coco(batch):
+    """
+    Worker: read image sizes + YOLO labels.
+
+    Returns [(file_name, width, height, [(class_id, bbox, segmentation, area), ...]), ...]
+    with absolute pixel coordinates; images without a readable size are returned with
+    width None.
+    """
+    records = []
+    for image_path, label_path in batch:
+        file_name = os.path.basename(image_path)
+        size = image_size(image_path)
+        if size is None:
+            records.append((file_name, None, None, []))
+            continue
+        width, height = size
+        objects = []
+        if label_path is not None:
+            labels = read_label_file(label_path)
+            scale = np.array([width, height], dtype=np.float64)
+            for i in range(len(labels)):
+                xc, yc, w, h = labels.boxes[i].astype(np.float64) * (width, height, width, height)
+                bbox = [round(xc - w / 2, 2), round(yc - h / 2, 2), round(w, 2), round(h, 2)]
+                polygon = labels.polygon(i)
+                if len(polygon):
+                    points = polygon.astype(np.float64) * scale
+                    segmentation = [np.round(points.ravel(), 2).tolist()]
+                    area = polygon_area(points)
+                else:
+                    # Box outline as polygon: COCO tools (annToMask/annToRLE) need a segmentation
+                    x1, y1, x2, y2 = bbox[0], bbox[1], bbox[0] + bbox[2], bbox[1] + bbox[3]
+                    segmentation = [[round(v, 2) for v in (x1, y1, x2, y1, x2, y2, x1, y2)]]
+                    area = w * h
+                objects.append((int(labels.class_ids[i]), bbox, segmentation, round(area, 2)))
+        records.append((file_name, width, height, objects))
+    return records
+
+
+def yolo_to_coco(images_dir, labels_dir, class_names, output_json, workers: int = NUM_WORKERS) -> dict:
+    pairs = list_image_label_pairs(images_dir, labels_dir)
+    categories = [{'id': i + 1, 'name': name, 'supercategory': 'none'} for i, name in enumerate(class_names)]
+    n_images = n_annotations = n_unreadable = 0
+
+    output_dir = os.path.dirname(os.path.abspath(output_json))
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = output_json + '.tmp'
+    # Annotations are spooled to disk so images and annotations can both be streamed
+    with open(tmp_path, 'w', encoding='utf-8') as out, \
+            tempfile.TemporaryFile('w+', encoding='utf-8', dir=output_dir) as spool, \
+            make_pool(workers) as pool:
+        out.write('{"info":' + json.dumps({'description': 'Converted from YOLO labels',
+                                           'date_created': time.strftime('%Y-%m-%d')}))
+        out.write(',\n"licenses":[],\n"categories":' + json.dumps(categories) + ',\n"images":[\n')
+        image_writer, ann_writer = JsonArrayWriter(out), JsonArrayWriter(spool)
+
+        for records in run_ordered(pool, workers, yolo_files_to_coco, batched(pairs, FILE_BATCH)):
+            for file_name, width, height, objects in records:
+                if width is None:
+                    n_unreadable += 1
+                    continue
+                n_images += 1
+                image_writer.write({'id': n_images, 'file_name': file_name, 'width': width, 'height': height})
+                for class_id, bbox, segmentation, area in objects:
+                    n_annotations += 1
+                    ann_writer.write({'id': n_annotations, 'image_id': n_images, 'category_id': class_id + 1,
+                                      'bbox': bbox, 'area': area, 'segmentation': segmentation, 'iscrowd': 0})
+
+        out.write('\n],\n"annotations":[\n')
+        spool.seek(0)
+        shutil.copyfileobj(spool, out)
+        out.write('\n]}\n')
+    os.replace(tmp_path, output_json)
+    return {'images': n_images, 'annotations': n_annotations, 'unreadable_images': n_unreadable}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# YOLO ↔ Pascal VOC
+# ─────────────────────────────────────────────────────────────────────────────
+
+def yolo_files_to_voc(batch, class_names, output_dir):
+    """Worker: write one VOC XML per image. Returns (written, objects, unreadable)."""
+    written = n_objects = unreadable = 0
+    for image_path, label_path in batch:
+        size = image_size(image_path)
+        if size is None:
+            unreadable += 1
+            continue
+        width, height = size
+        root = ET.Element('annotation')
+        ET.SubElement(root, 'folder').text = os.path.basename(os.path.dirname(image_path))
+        ET.SubElement(root, 'filename').text = os.path.basename(image_path)
+        size_el = ET.SubElement(root, 'size')
+        for tag, value in (('width', width), ('height', height), ('depth', 3)):
+            ET.SubElement(size_el, tag).text = str(value)
+        ET.SubElement(root, 'segmented').text = '0'
+
+        if label_path is not None:
+            labels = read_label_file(label_path)
+            xc, yc, w, h = labels.boxes.astype(np.float64).T
+            x1 = np.clip(np.rint((xc - w / 2) * width), 0, width).astype(int)
+            x2 = np.clip(np.rint((xc + w / 2) * width), 0, width).astype(int)
+            y1 = np.clip(np.rint((yc - h / 2) * height), 0, height).astype(int)
+            y2 = np.clip(np.rint((yc + h / 2) * height), 0, height).astype(int)
+            for c, a, b, cc, d in zip(labels.class_ids.tolist(), x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist()):
+                obj = ET.SubElement(root, 'object')
+                ET.SubElement(obj, 'name').text = class_names[c] if c < len(class_names) else str(c)
+                ET.SubElement(obj, 'difficult').text = '0'
+                box = ET.SubElement(obj, 'bndbox')
+                for tag, value in (('xmin', a), ('ymin', b), ('xmax', cc), ('ymax', d)):
+                    ET.SubElement(box, tag).text = str(value)
+                n_objects += 1
+
+        ET.indent(root)
+        stem = os.path.splitext(os.path.basename(image_path))[0]
+        ET.ElementTree(root).write(os.path.join(output_dir, stem + '.xml'), encoding='utf-8')
+        written += 1
+    return written, n_objects, unreadable
+
+
+def voc_files_to_boxes(batch):
+    """
+    Worker: parse VOC XML files.
+
+    Returns [(stem, [(name, xc, yc, w, h), ...] normalised) or (stem, None) on error].
+    """
+    results = []
+    for xml_path in batch:
+        stem = os.path.splitext(os.path.basename(xml_path))[0]
+        try:
+            root = ET.parse(xml_path).getroot()
+            width = float(root.findtext('size/width'))
+            height = float(root.findtext('size/height'))
+            boxes = []
+            for obj in root.iter('object'):
+                box = obj.find('bndbox')
+                x1, y1, x2, y2 = (float(box.findtext(t)) for t in ('xmin', 'ymin', 'xmax', 'ymax'))
+                x1, x2 = max(x1, 0) / width, min(x2, width) / width
+                y1, y2 = max(y1, 0) / height, min(y2, height) / height
+                if x2 > x1 and y2 > y1:
+                    boxes.append((obj.findtext('name', '').strip(), (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1))
+            results.append((stem, boxes))
+        except (ET.ParseError, OSError, TypeError, ValueError, AttributeError, ZeroDivisionError):
+            results.append((stem, None))
+    return results
+
+
+def yolo_to_voc(images_dir, labels_dir, class_names, output_dir, workers: int = NUM_WORKERS) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+    pairs = list_image_label_pairs(images_dir, labels_dir)
+    totals = np.zeros(3, dtype=np.int64)
+    with make_pool(workers) as pool:
+        for result in run_ordered(pool, workers, yolo_files_to_voc, batched(pairs, FILE_BATCH), class_names, output_dir):
+            totals += result
+    written, n_objects, unreadable = totals.tolist()
+    return {'files': written, 'objects': n_objects, 'unreadable_images': unreadable}
+
+
+def voc_to_yolo(xml_dir, output_dir, class_names=None, workers: int = NUM_WORKERS) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+    xml_files = [e.path for e in sorted(DirectoryCatalog(xml_dir, ['.xml']), key=lambda e: e.name)]
+    fixed_classes = class_names is not None
+    class_index = {name: i for i, name in enumerate(class_names or [])}
+    n_files = n_objects = n_unknown = n_errors = 0
+
+    with make_pool(workers) as pool:
+        for results in run_ordered(pool, workers, voc_files_to_boxes, batched(xml_files, FILE_BATCH)):
+            for stem, boxes in results:
+                if boxes is None:
+                    n_errors += 1
+                    continue
+                rows = []
+                for name, *coords in boxes:
+                    if name not in class_index:
+                        if fixed_classes:
+                            n_unknown += 1
+                            continue
+                        class_index[name] = len(class_index)  # new class, in order of appearance
+                    rows.append(format_row(class_index[name], coords))
+                with open(os.path.join(output_dir, stem + '.txt'), 'w', encoding='utf-8') as f:
+                    f.write("\n".join(rows) + ("\n" if rows else ""))
+                n_files += 1
+                n_objects += len(rows)
+
+    names = sorted(class_index, key=class_index.get)
+    classes_path = write_classes_file(output_dir, names)
+    return {'files': n_files, 'objects': n_objects, 'unknown_class_objects': n_unknown,
+            'unreadable_xml': n_errors, 'classes_file': classes_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert annotations between YOLO txt, COCO JSON and Pascal VOC XML',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Partner data (COCO) to YOLO bbox labels, or to YOLO segmentation labels
+  python convert_labels.py coco2yolo --json instances.json --output ./labels
+  python convert_labels.py coco2yolo --json instances.json --output ./labels --task segment
+
+  # YOLO labels (bbox and/or segmentation) to one COCO file
+  python convert_labels.py yolo2coco --images ./images --labels ./labels --yaml dataset.yaml --output instances.json
+
+  # YOLO to Pascal VOC XML and back
+  python convert_labels.py yolo2voc --images ./images --labels ./labels --yaml dataset.yaml --output ./xml
+  python convert_labels.py voc2yolo --xml ./xml --output ./labels --yaml dataset.yaml
+        """
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--workers', type=int, default=NUM_WORKERS,
+                        help=f'Worker processes (default: {NUM_WORKERS})')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('coco2yolo', parents=[common], help='COCO JSON -> YOLO txt')
+    p.add_argument('--json', required=True, help='COCO annotations file')
+    p.add_argument('--output', required=True, help='Output folder for the .txt labels')
+    p.add_argument('--task', choices=['detect', 'segment'], default='detect',
+                   help='Write bbox rows (detect) or polygon rows (segment) (default: detect)')
+
+    for name, help_text in (('yolo2coco', 'YOLO txt -> COCO JSON'), ('yolo2voc', 'YOLO txt -> Pascal VOC XML')):
+        p = sub.add_parser(name, parents=[common], help=help_text)
+        p.add_argument('--images', required=True, help='Images folder (sizes are read from the headers)')
+        p.add_argument('--labels', required=True, help='YOLO labels folder')
+        p.add_argument('--yaml', required=True, help='dataset.yaml with the class names')
+        p.add_argument('--output', required=True,
+                       help='Output .json file' if name == 'yolo2coco' else 'Output folder for the .xml files')
+
+    p = sub.add_parser('voc2yolo', parents=[common], help='Pascal VOC XML -> YOLO txt')
+    p.add_argument('--xml', required=True, help='Folder with VOC .xml files')
+    p.add_argument('--output', required=True, help='Output folder for the .txt labels')
+    p.add_argument('--yaml', help='dataset.yaml with the class names (default: classes in order of appearance)')
+
+    args = parser.parse_args()
+
+    for attr in ('json', 'images', 'labels', 'xml', 'yaml'):
+        path = getattr(args, attr, None)
+        if path and not os.path.exists(path):
+            print(f"Error: {attr} path does not exist: {path}")
+            sys.exit(1)
+
+    print("=" * 50)
+    print(f"Label Converter: {args.command}")
+    print("=" * 50)
+    start = time.perf_counter()
+
+    if args.command == 'coco2yolo':
+        result = coco_to_yolo(args.json, args.output, args.task, args.workers)
+    elif args.command == 'yolo2coco':
+        result = yolo_to_coco(args.images, args.labels, load_class_names(args.yaml), args.output, args.workers)
+    elif args.command == 'yolo2voc':
+        result = yolo_to_voc(args.images, args.labels, load_class_names(args.yaml), args.output, args.workers)
+    else:
+        names = load_class_names(args.yaml) if args.yaml else None
+        result = voc_to_yolo(args.xml, args.output, names, args.workers)
+
+    for key, value in result.items():
+        print(f"{key.replace('_', ' ').capitalize()}: {value}")
+    print(f"Output: {args.output}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
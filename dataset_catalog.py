@@ -0,0 +1,134 @@
+"""
+Dataset Directory Catalog
+
+Scans a folder once with os.scandir and builds a case-insensitive stem → file
+map, so pairing images with labels no longer needs an os.path.exists() probe
+per extension and per case. On SMB-mounted datasets every probe is a network
+round-trip; a catalog costs one directory listing.
+
+Stat results are cached on the entries (os.DirEntry caches them itself, and on
+Windows they come for free with the listing). Image sizes are read from the
+file headers (image_probe.py) on first use and cached per catalog as well;
+probe_sizes() fills them for the whole folder on a thread pool.
+
+Usage:
+    from dataset_catalog import get_catalog
+    images = get_catalog(images_dir, ['.jpg', '.jpeg', '.png'])
+    image_path = images.find("frame_0001")          # first match in extension order
+    size = images.find_entry("frame_0001").stat().st_size
+    width, height = images.image_size("frame_0001.jpg")
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from image_probe import image_size
+
+PROBE_THREADS = 16  # concurrent header reads in probe_sizes()
+
+
+class DirectoryCatalog:
+    """Single-pass listing of the files in one folder, indexed by lowercase stem."""
+
+    def __init__(self, folder, extensions=None):
+        self.folder = str(folder)
+        # Extension priority: position in the list (lower = preferred)
+        self.extensions = [e.lower() for e in extensions] if extensions else None
+        self._priority = {e: i for i, e in enumerate(self.extensions or [])}
+
+        self.entries: list[os.DirEntry] = []
+        self._by_stem: dict[str, list[os.DirEntry]] = {}
+        self._by_name: dict[str, os.DirEntry] = {}
+        self._sizes: dict[str, tuple[int, int] | None] = {}  # lowercase name -> (width, height)
+
+        if not os.path.isdir(self.folder):
+            return
+
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                stem, ext = os.path.splitext(entry.name)
+                if self.extensions is not None and ext.lower() not in self._priority:
+                    continue
+                if not entry.is_file():
+                    continue
+                self.entries.append(entry)
+                self._by_stem.setdefault(stem.lower(), []).append(entry)
+                self._by_name[entry.name.lower()] = entry
+
+        if self.extensions is not None:
+            for matches in self._by_stem.values():
+                if len(matches) > 1:
+                    matches.sort(key=lambda e: self._priority[os.path.splitext(e.name)[1].lower()])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __contains__(self, stem: str) -> bool:
+        return stem.lower() in self._by_stem
+
+    def stems(self) -> set[str]:
+        """All (lowercase) stems in the folder."""
+        return set(self._by_stem)
+
+    def entries_for(self, stem: str) -> list[os.DirEntry]:
+        """All files with this stem, preferred extension first."""
+        return self._by_stem.get(stem.lower(), [])
+
+    def find_entry(self, stem: str) -> os.DirEntry | None:
+        matches = self._by_stem.get(stem.lower())
+        return matches[0] if matches else None
+
+    def find(self, stem: str) -> str | None:
+        """Full path of the file with this stem (case-insensitive), or None."""
+        entry = self.find_entry(stem)
+        return entry.path if entry is not None else None
+
+    def get(self, name: str) -> os.DirEntry | None:
+        """Entry for an exact file name (case-insensitive), or None."""
+        return self._by_name.get(name.lower())
+
+    def image_size(self, name: str) -> tuple[int, int] | None:
+        """(width, height) of an image in this folder from its header, cached; None if unreadable."""
+        key = name.lower()
+        if key not in self._sizes:
+            entry = self._by_name.get(key)
+            self._sizes[key] = image_size(entry.path) if entry is not None else None
+        return self._sizes[key]
+
+    def probe_sizes(self, workers: int = PROBE_THREADS) -> dict[str, tuple[int, int] | None]:
+        """Probe all not yet cached image sizes concurrently; returns {file name: size}."""
+        missing = [e for e in self.entries if e.name.lower() not in self._sizes]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                for entry, size in zip(missing, pool.map(lambda e: image_size(e.path), missing)):
+                    self._sizes[entry.name.lower()] = size
+        return {e.name: self._sizes[e.name.lower()] for e in self.entries}
+
+
+_catalogs: dict[tuple, DirectoryCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(folder, extensions=None) -> DirectoryCatalog:
+    """
+    Return a cached catalog for folder (scanned on first use).
+
+    Catalogs are shared between threads; call clear_catalog_cache() when the
+    folder contents may have changed.
+    """
+    key = (os.path.normcase(os.path.abspath(str(folder))),
+           tuple(e.lower() for e in extensions) if extensions else None)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = DirectoryCatalog(folder, extensions)
+        return catalog
+
+
+def clear_catalog_cache() -> None:
+    with _catalogs_lock:
+        _catalogs.clear()
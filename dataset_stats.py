@@ -0,0 +1,399 @@
+"""
+YOLO Dataset Statistics
+
+Per-split overview of a dataset before a training run: class counts, images
+per class, objects per image, box width/height/size/aspect histograms and the
+image resolution distribution. Works on the train/test/valid layout used by
+yolo_dataset_filter.py (<split>/images + <split>/labels).
+
+The dataset is streamed in chunks: every image/label pair is reduced to a small
+per-file partial (class counts + fixed-bin box histograms + resolution) that is
+cached in an SQLite file in the dataset folder, keyed by mtime and size of both
+files. Re-runs only process new or changed files; the totals are summed from
+the cache row by row, so memory stays bounded for any dataset size.
+
+Output: dataset_stats.json and PNG plots per split (plots need matplotlib).
+
+Usage:
+    python dataset_stats.py <dataset_folder> [--subdirs train valid] [--no-plots]
+
+Example:
+    python dataset_stats.py ./my_dataset
+    python dataset_stats.py ./my_dataset --output ./stats
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np  # pip install numpy
+
+from dataset_catalog import DirectoryCatalog
+from image_probe import image_size
+from validate_yolo_dataset import find_dataset_yaml, load_class_names
+from yolo_labels import read_label_file
+
+# ===== DEFAULT CONFIGURATION =====
+DEFAULT_SUBDIRS = ['train', 'test', 'valid']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff', '.tif']
+STATS_CACHE_NAME = ".dataset_stats.sqlite"
+STATS_NAME = "dataset_stats.json"
+PLOTS_FOLDER = "stats_plots"
+CHUNK_SIZE = 512               # files processed (and committed to the cache) per step
+IO_THREADS = 8
+HIST_BINS = 50                 # bins per box histogram
+ASPECT_LOG2_RANGE = (-4.0, 4.0)  # box aspect ratio (w/h in pixels) histogram range, log2 scale
+TOP_RESOLUTIONS = 20           # most common resolutions listed in the JSON/plots
+# ===== END CONFIGURATION =====
+
+# Box histograms stored per file, in this order (each HIST_BINS bins)
+BOX_HISTOGRAMS = ["width", "height", "size", "aspect"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS file_stats (
+    image          TEXT PRIMARY KEY,
+    split          TEXT NOT NULL,
+    image_mtime_ns INTEGER NOT NULL,
+    image_size     INTEGER NOT NULL,
+    label_mtime_ns INTEGER NOT NULL,
+    label_size     INTEGER NOT NULL,
+    width          INTEGER,
+    height         INTEGER,
+    n_objects      INTEGER NOT NULL,
+    n_bad          INTEGER NOT NULL,
+    class_counts   BLOB NOT NULL,
+    box_hist       BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_file_stats_split ON file_stats(split);
+"""
+
+
+def histogram_edges() -> dict[str, np.ndarray]:
+    unit = np.linspace(0.0, 1.0, HIST_BINS + 1)
+    return {
+        "width": unit,
+        "height": unit,
+        "size": unit,  # sqrt(w * h), relative to the image
+        "aspect": np.linspace(*ASPECT_LOG2_RANGE, HIST_BINS + 1),
+    }
+
+
+def _cache_params() -> str:
+    return json.dumps({"bins": HIST_BINS, "aspect": list(ASPECT_LOG2_RANGE), "version": 1})
+
+
+def open_cache(dataset_folder) -> sqlite3.Connection:
+    """Open the stats cache; it is reset when the histogram settings changed."""
+    conn = sqlite3.connect(os.path.join(dataset_folder, STATS_CACHE_NAME))
+    conn.executescript(SCHEMA)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+    if row is None or row[0] != _cache_params():
+        with conn:
+            conn.execute("DELETE FROM file_stats")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('params', ?)", (_cache_params(),))
+    return conn
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-file partials
+# ─────────────────────────────────────────────────────────────────────────────
+
+def image_resolution(image_path) -> tuple[int | None, int | None]:
+    """(width, height) from the image header (see image_probe.py), (None, None) if unreadable."""
+    return image_size(image_path) or (None, None)
+
+
+def file_partial(image_path, label_path) -> tuple:
+    """Reduce one image/label pair to (width, height, n_objects, n_bad, class_counts, box_hist)."""
+    width, height = image_resolution(image_path)
+    class_counts = np.zeros(0, dtype=np.int64)
+    box_hist = np.zeros((len(BOX_HISTOGRAMS), HIST_BINS), dtype=np.int64)
+    n_objects = n_bad = 0
+
+    if label_path is not None:
+        try:
+            labels = read_label_file(label_path)
+        except OSError as e:
+            print(f"Error reading {label_path}: {e}")
+        else:
+            n_objects, n_bad = len(labels), labels.n_bad
+            valid = labels.class_ids >= 0
+            class_counts = np.bincount(labels.class_ids[valid].astype(np.int64))
+            w, h = labels.boxes[:, 2].astype(np.float64), labels.boxes[:, 3].astype(np.float64)
+            pixel_w = w * (width or 1)
+            pixel_h = h * (height or 1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                aspect = np.log2(pixel_w / pixel_h)
+            aspect = aspect[np.isfinite(aspect)]
+            edges = histogram_edges()
+            for i, (name, data) in enumerate(zip(BOX_HISTOGRAMS, (w, h, np.sqrt(np.abs(w * h)), aspect))):
+                # Out-of-range values are counted in the outer bins
+                box_hist[i] = np.histogram(np.clip(data, edges[name][0], edges[name][-1]), bins=edges[name])[0]
+
+    return width, height, n_objects, n_bad, class_counts.astype(np.int32).tobytes(), box_hist.astype(np.int32).tobytes()
+
+
+def _stat_key(entry) -> tuple[int, int]:
+    if entry is None:
+        return -1, -1
+    try:
+        st = entry.stat()
+    except OSError:
+        return -1, -1
+    return st.st_mtime_ns, st.st_size
+
+
+def list_split_files(split_dir) -> list[tuple[str, str | None, tuple]]:
+    """(image path, label path or None, cache key) for every image in <split>/images."""
+    images = DirectoryCatalog(os.path.join(split_dir, 'images'), IMAGE_EXTENSIONS)
+    labels = DirectoryCatalog(os.path.join(split_dir, 'labels'), ['.txt'])
+    pairs = []
+    for entry in sorted(images, key=lambda e: e.name):
+        label = labels.find_entry(os.path.splitext(entry.name)[0])
+        key = _stat_key(entry) + _stat_key(label)
+        pairs.append((entry.path, label.path if label is not None else None, key))
+    return pairs
+
+
+def update_split(conn, split, pairs, io_threads: int = IO_THREADS) -> tuple[int, int]:
+    """
+    Bring the cached partials of one split up to date.
+
+    Returns (processed, removed).
+    """
+    known = {
+        image: (im, isz, lm, lsz)
+        for image, im, isz, lm, lsz in conn.execute(
+            "SELECT image, image_mtime_ns, image_size, label_mtime_ns, label_size "
+            "FROM file_stats WHERE split = ?", (split,))
+    }
+    present = {image for image, _, _ in pairs}
+    removed = [image for image in known if image not in present]
+    with conn:
+        conn.executemany("DELETE FROM file_stats WHERE image = ?", [(image,) for image in removed])
+
+    processed = 0
+    with ThreadPoolExecutor(max_workers=max(1, io_threads)) as pool:
+        for start in range(0, len(pairs), CHUNK_SIZE):
+            chunk = []
+            for image, label, key in pairs[start:start + CHUNK_SIZE]:
+                if known.get(image) != key:
+                    chunk.append((image, label, key))
+            if not chunk:
+                continue
+            partials = pool.map(lambda item: file_partial(item[0], item[1]), chunk)
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO file_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(image, split, *key, *partial) for (image, _, key), partial in zip(chunk, partials)])
+            processed += len(chunk)
+            print(f"   {split}: {min(start + CHUNK_SIZE, len(pairs))}/{len(pairs)} files checked, {processed} processed")
+    return processed, len(removed)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Aggregation
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _add_padded(total: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    if len(counts) > len(total):
+        total = np.pad(total, (0, len(counts) - len(total)))
+    total[:len(counts)] += counts
+    return total
+
+
+def aggregate_split(conn, split) -> dict:
+    """Sum the cached partials of a split (streams over the cache rows)."""
+    class_counts = np.zeros(0, dtype=np.int64)
+    images_per_class = np.zeros(0, dtype=np.int64)
+    box_hist = np.zeros((len(BOX_HISTOGRAMS), HIST_BINS), dtype=np.int64)
+    objects_per_image = Counter()
+    resolutions = Counter()
+    n_images = n_objects = n_bad = n_labelled = n_unreadable = 0
+
+    rows = conn.execute(
+        "SELECT width, height, n_objects, n_bad, label_size, class_counts, box_hist "
+        "FROM file_stats WHERE split = ?", (split,))
+    for width, height, objects, bad, label_size, counts_blob, hist_blob in rows:
+        n_images += 1
+        n_objects += objects
+        n_bad += bad
+        n_labelled += label_size >= 0
+        objects_per_image[objects] += 1
+        if width is None:
+            n_unreadable += 1
+        else:
+            resolutions[(width, height)] += 1
+        counts = np.frombuffer(counts_blob, dtype=np.int32)
+        class_counts = _add_padded(class_counts, counts)
+        images_per_class = _add_padded(images_per_class, (counts > 0).astype(np.int64))
+        box_hist += np.frombuffer(hist_blob, dtype=np.int32).reshape(box_hist.shape)
+
+    # Mean/median from the histogram itself, no per-image list needed
+    counts_sorted = sorted(objects_per_image.items())
+    cumulative = np.cumsum([n for _, n in counts_sorted])
+    median = counts_sorted[int(np.searchsorted(cumulative, (n_images + 1) // 2))][0] if n_images else 0
+    edges = histogram_edges()
+    return {
+        "images": n_images,
+        "labelled_images": n_labelled,
+        "background_images": objects_per_image.get(0, 0),
+        "objects": n_objects,
+        "bad_label_lines": n_bad,
+        "unreadable_images": n_unreadable,
+        "class_counts": {str(c): int(n) for c, n in enumerate(class_counts.tolist()) if n},
+        "images_per_class": {str(c): int(n) for c, n in enumerate(images_per_class.tolist()) if n},
+        "objects_per_image": {
+            "histogram": {str(k): v for k, v in sorted(objects_per_image.items())},
+            "mean": n_objects / n_images if n_images else 0.0,
+            "median": median,
+            "max": counts_sorted[-1][0] if n_images else 0,
+        },
+        "box_histograms": {
+            name: {"edges": edges[name].round(4).tolist(), "counts": box_hist[i].tolist()}
+            for i, name in enumerate(BOX_HISTOGRAMS)
+        },
+        "resolutions": {
+            "distinct": len(resolutions),
+            "most_common": [{"width": w, "height": h, "images": n}
+                            for (w, h), n in resolutions.most_common(TOP_RESOLUTIONS)],
+        },
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Plots
+# ─────────────────────────────────────────────────────────────────────────────
+
+def write_plots(stats: dict, class_names, output_dir) -> list[str]:
+    """One PNG per split with class counts, objects per image, box histograms and resolutions."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not installed (pip install matplotlib), plots skipped")
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for split, s in stats["splits"].items():
+        fig, axes = plt.subplots(2, 3, figsize=(16, 9))
+        fig.suptitle(f"{split}: {s['images']} images, {s['objects']} objects")
+
+        ids = [int(c) for c in s["class_counts"]]
+        labels = [class_names[c] if class_names and c < len(class_names) else str(c) for c in ids]
+        axes[0, 0].bar(labels, list(s["class_counts"].values()))
+        axes[0, 0].set_title("Objects per class")
+        axes[0, 0].tick_params(axis='x', rotation=45)
+
+        hist = s["objects_per_image"]["histogram"]
+        axes[0, 1].bar([int(k) for k in hist], list(hist.values()))
+        axes[0, 1].set_title("Objects per image")
+
+        for ax, name in ((axes[0, 2], "size"), (axes[1, 0], "width"), (axes[1, 1], "aspect")):
+            h = s["box_histograms"][name]
+            edges = np.array(h["edges"])
+            ax.bar(edges[:-1], h["counts"], width=np.diff(edges), align='edge')
+            ax.set_title({"size": "Box size (sqrt area)", "width": "Box width",
+                          "aspect": "Box aspect (log2 w/h)"}[name])
+
+        res = s["resolutions"]["most_common"]
+        axes[1, 2].barh([f"{r['width']}x{r['height']}" for r in res][::-1], [r["images"] for r in res][::-1])
+        axes[1, 2].set_title("Image resolutions")
+
+        fig.tight_layout()
+        path = os.path.join(output_dir, f"{split}_stats.png")
+        fig.savefig(path, dpi=100)
+        plt.close(fig)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Class, box and resolution statistics per split of a YOLO dataset',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Stats for train/test/valid, written next to the dataset
+  python dataset_stats.py ./my_dataset
+
+  # Only the training split, JSON only
+  python dataset_stats.py ./my_dataset --subdirs train --no-plots
+
+  # Write the report and plots to another folder
+  python dataset_stats.py ./my_dataset --output ./stats
+        """
+    )
+    parser.add_argument('dataset_folder', help='Dataset folder with <split>/images and <split>/labels')
+    parser.add_argument('--subdirs', nargs='+', default=DEFAULT_SUBDIRS,
+                        help=f'Splits to include (default: {" ".join(DEFAULT_SUBDIRS)})')
+    parser.add_argument('--yaml', help='dataset.yaml with class names (default: dataset.yaml/data.yaml in the dataset folder)')
+    parser.add_argument('--output', help='Output folder for the JSON and plots (default: dataset folder)')
+    parser.add_argument('--no-plots', action='store_true', help='Only write the JSON report')
+    args = parser.parse_args()
+
+    folder = args.dataset_folder
+    if not os.path.isdir(folder):
+        print(f"Error: Dataset folder does not exist: {folder}")
+        sys.exit(1)
+
+    splits = [s for s in args.subdirs if os.path.isdir(os.path.join(folder, s, 'images'))]
+    if not splits:
+        print(f"Error: No <split>/images folders found in {folder}")
+        sys.exit(1)
+
+    yaml_path = args.yaml or find_dataset_yaml(folder)
+    class_names = load_class_names(yaml_path) if yaml_path else None
+
+    print("=" * 50)
+    print("YOLO Dataset Statistics")
+    print("=" * 50)
+    start = time.perf_counter()
+    conn = open_cache(folder)
+    stats = {"dataset": os.path.abspath(folder), "class_names": class_names, "splits": {}}
+    try:
+        for split in splits:
+            pairs = list_split_files(os.path.join(folder, split))
+            processed, removed = update_split(conn, split, pairs)
+            print(f"{split}: {len(pairs)} images, {processed} processed, "
+                  f"{len(pairs) - processed} cached, {removed} removed")
+            stats["splits"][split] = aggregate_split(conn, split)
+    finally:
+        conn.close()
+
+    output_dir = args.output or folder
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, STATS_NAME)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+
+    for split, s in stats["splits"].items():
+        print(f"\n{split}:")
+        print(f"  Images: {s['images']} ({s['background_images']} background)")
+        print(f"  Objects: {s['objects']} (mean {s['objects_per_image']['mean']:.1f} per image)")
+        for c, n in s["class_counts"].items():
+            name = class_names[int(c)] if class_names and int(c) < len(class_names) else c
+            print(f"    {name}: {n} objects in {s['images_per_class'].get(c, 0)} images")
+        common = s["resolutions"]["most_common"]
+        if common:
+            print(f"  Most common resolution: {common[0]['width']}x{common[0]['height']} "
+                  f"({common[0]['images']} images, {s['resolutions']['distinct']} distinct)")
+
+    plots = [] if args.no_plots else write_plots(stats, class_names, os.path.join(output_dir, PLOTS_FOLDER))
+    print(f"\nReport: {json_path}")
+    for path in plots:
+        print(f"Plot: {path}")
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
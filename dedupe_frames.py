@@ -0,0 +1,335 @@
+"""
+Near-Duplicate Frame Finder
+
+Static barn cameras produce thousands of nearly identical frames (see
+Take_screeshot_rtsp_IPcamera.py and extract_screenshots.py). This script
+computes a 64-bit perceptual hash (dHash or pHash) for every image in parallel,
+stores the hashes in a persistent index next to the images, and finds
+near-duplicates by Hamming distance.
+
+Frames are processed in file-name order (= capture order for the screenshot
+scripts): the first frame of a group is kept, later frames within
+--max-distance bits of a kept frame are marked as duplicates. Lookups use
+multi-index hashing (the 64-bit hash is split into chunks; two hashes within
+distance d share at least one identical chunk when there are more than d chunks)
+and a vectorized popcount, so the search stays fast for 100k+ frames.
+
+Only new or changed images are hashed again on a re-run (index keyed by path,
+mtime and size).
+
+Usage:
+    python dedupe_frames.py <images_folder> [--max-distance 4] [--action dry-run|move|delete]
+
+Example:
+    python dedupe_frames.py ./screenshots --recursive
+    python dedupe_frames.py ./screenshots --action move --move-to ./screenshots_duplicates
+"""
+
+import os
+import sys
+import csv
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2  # pip install opencv-python
+import numpy as np  # pip install numpy
+
+from file_transfer import transfer_files
+
+# ===== DEFAULT CONFIGURATION =====
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+HASH_INDEX_NAME = ".frame_hashes.sqlite"
+DEFAULT_METHOD = "dhash"          # "dhash" (fast) or "phash" (more robust to lighting changes)
+DEFAULT_MAX_DISTANCE = 4          # bits out of 64; 0 = identical hash only
+DEFAULT_WORKERS = os.cpu_count() or 1
+REPORT_NAME = "duplicates_report.csv"
+# ===== END CONFIGURATION =====
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Hashing
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Pack 64 booleans into a signed 64-bit int (fits an SQLite INTEGER)."""
+    value = int(np.packbits(bits.astype(np.uint8)).view('>u8')[0])
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def dhash(gray: np.ndarray) -> int:
+    """Difference hash: compare horizontally adjacent pixels of a 9x8 thumbnail."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray: np.ndarray) -> int:
+    """Perceptual hash: sign of the low-frequency 8x8 DCT block relative to its median."""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    return _bits_to_int(low > np.median(low.ravel()[1:]))  # median without the DC term
+
+
+HASH_FUNCTIONS = {"dhash": dhash, "phash": phash}
+
+
+def hash_image(path: str, method: str) -> int | None:
+    """Worker: hash one image (decoded at reduced size), None if it cannot be read."""
+    gray = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    return HASH_FUNCTIONS[method](gray)
+
+
+def _hash_chunk(paths: list[str], method: str) -> list[int | None]:
+    return [hash_image(p, method) for p in paths]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Persistent hash index
+# ─────────────────────────────────────────────────────────────────────────────
+
+def list_images(folder: str, recursive: bool) -> list[tuple[str, int, int]]:
+    """(path, mtime_ns, size) of every image, sorted by path, using os.scandir."""
+    found, stack = [], [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if recursive and not entry.name.startswith('.'):
+                            stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                        st = entry.stat()
+                        found.append((entry.path, st.st_mtime_ns, st.st_size))
+        except PermissionError:
+            continue
+    found.sort()
+    return found
+
+
+def load_hashes(folder: str, images: list[tuple[str, int, int]], method: str,
+                workers: int) -> dict[str, int]:
+    """Return {path: hash}, hashing only new/changed images and updating the index."""
+    conn = sqlite3.connect(os.path.join(folder, HASH_INDEX_NAME))
+    conn.execute("CREATE TABLE IF NOT EXISTS frames (path TEXT, method TEXT, mtime_ns INTEGER, "
+                 "size INTEGER, hash INTEGER, PRIMARY KEY (path, method))")
+    known = {path: (mtime_ns, size, h) for path, mtime_ns, size, h in conn.execute(
+        "SELECT path, mtime_ns, size, hash FROM frames WHERE method = ?", (method,))}
+
+    hashes, todo = {}, []
+    for path, mtime_ns, size in images:
+        rec = known.get(path)
+        if rec is not None and rec[:2] == (mtime_ns, size):
+            hashes[path] = rec[2]
+        else:
+            todo.append((path, mtime_ns, size))
+
+    print(f"Hashes cached: {len(hashes)}   To compute: {len(todo)}")
+    if todo:
+        chunk = 256
+        paths = [p for p, _, _ in todo]
+        chunks = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+        if workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = [h for part in pool.map(_hash_chunk, chunks, [method] * len(chunks)) for h in part]
+        else:
+            results = [h for part in chunks for h in _hash_chunk(part, method)]
+
+        rows = []
+        for (path, mtime_ns, size), h in zip(todo, results):
+            if h is None:
+                print(f"Warning: cannot read {path}, skipped")
+                continue
+            hashes[path] = h
+            rows.append((path, method, mtime_ns, size, h))
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO frames VALUES (?, ?, ?, ?, ?)", rows)
+
+    # Forget images that no longer exist
+    gone = [(p, method) for p in known if p not in hashes]
+    with conn:
+        conn.executemany("DELETE FROM frames WHERE path = ? AND method = ?", gone)
+    conn.close()
+    return hashes
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Near-duplicate search
+# ─────────────────────────────────────────────────────────────────────────────
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Vectorized number of set bits of a uint64 array."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class NearDuplicateIndex:
+    """
+    Multi-index hashing over 64-bit hashes.
+
+    The hash is split into max_distance + 1 chunks, so any hash within
+    max_distance shares at least one chunk exactly (pigeonhole). Candidates from
+    the chunk buckets are verified with a vectorized popcount. Very large
+    distances (chunks under 4 bits) fall back to a brute-force popcount scan.
+    """
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        n_chunks = max_distance + 1
+        self.n_chunks = n_chunks if n_chunks <= 16 else None
+        self.hashes: list[int] = []
+        self.buckets = [dict() for _ in range(self.n_chunks or 0)]
+
+        # (shift, mask) per chunk; the remainder bits are spread over the first chunks
+        self._fields, shift = [], 0
+        for i in range(self.n_chunks or 0):
+            bits = 64 // n_chunks + (1 if i < 64 % n_chunks else 0)
+            self._fields.append((shift, (1 << bits) - 1))
+            shift += bits
+
+    def _chunks(self, h: int):
+        return [(h >> shift) & mask for shift, mask in self._fields]
+
+    def query(self, h: int) -> int | None:
+        """Id of the closest stored hash within max_distance, or None."""
+        if not self.hashes:
+            return None
+        if self.n_chunks is None:
+            candidates = np.arange(len(self.hashes))
+        else:
+            ids = set()
+            for bucket, chunk in zip(self.buckets, self._chunks(h)):
+                ids.update(bucket.get(chunk, ()))
+            if not ids:
+                return None
+            candidates = np.fromiter(ids, dtype=np.int64)
+        stored = np.fromiter((self.hashes[i] for i in candidates.tolist()),
+                             dtype=np.uint64, count=len(candidates))
+        dist = popcount64(stored ^ np.uint64(h))
+        best = int(np.argmin(dist))
+        return int(candidates[best]) if dist[best] <= self.max_distance else None
+
+    def add(self, h: int) -> int:
+        idx = len(self.hashes)
+        self.hashes.append(h)
+        if self.n_chunks is not None:
+            for bucket, chunk in zip(self.buckets, self._chunks(h)):
+                bucket.setdefault(chunk, []).append(idx)
+        return idx
+
+
+def find_duplicates(paths: list[str], hashes: dict[str, int],
+                    max_distance: int) -> list[tuple[str, str, int]]:
+    """Return (duplicate_path, kept_path, distance) in processing order (first frame is kept)."""
+    index = NearDuplicateIndex(max_distance)
+    kept_paths, duplicates = [], []
+    for path in paths:
+        h = hashes[path] & ((1 << 64) - 1)  # unsigned
+        match = index.query(h)
+        if match is None:
+            index.add(h)
+            kept_paths.append(path)
+        else:
+            distance = bin(h ^ index.hashes[match]).count("1")
+            duplicates.append((path, kept_paths[match], distance))
+    return duplicates
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Main
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Find and remove near-duplicate frames with perceptual hashes',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Dry run: only write duplicates_report.csv
+  python dedupe_frames.py ./screenshots
+
+  # Include subfolders and use pHash with a tighter threshold
+  python dedupe_frames.py ./screenshots --recursive --method phash --max-distance 2
+
+  # Move duplicates away (reversible) or delete them
+  python dedupe_frames.py ./screenshots --action move --move-to ./duplicates
+  python dedupe_frames.py ./screenshots --action delete
+        """
+    )
+    parser.add_argument('images_folder', help='Folder with captured frames')
+    parser.add_argument('--recursive', action='store_true', help='Also scan subfolders')
+    parser.add_argument('--method', choices=sorted(HASH_FUNCTIONS), default=DEFAULT_METHOD,
+                        help=f'Perceptual hash (default: {DEFAULT_METHOD})')
+    parser.add_argument('--max-distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help=f'Max Hamming distance (bits) for a near-duplicate (default: {DEFAULT_MAX_DISTANCE})')
+    parser.add_argument('--action', choices=['dry-run', 'move', 'delete'], default='dry-run',
+                        help='What to do with duplicates (default: dry-run)')
+    parser.add_argument('--move-to', help='Target folder for --action move')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Hashing processes (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--no-confirm', action='store_true', help='Skip confirmation prompt')
+    args = parser.parse_args()
+
+    folder = args.images_folder
+    if not os.path.isdir(folder):
+        print(f"Error: Folder does not exist: {folder}")
+        sys.exit(1)
+    if args.action == 'move' and not args.move_to:
+        print("Error: --action move needs --move-to")
+        sys.exit(1)
+
+    images = list_images(folder, args.recursive)
+    print("=" * 50)
+    print("Near-Duplicate Frame Finder")
+    print("=" * 50)
+    print(f"Images found: {len(images)}")
+    if not images:
+        return
+
+    hashes = load_hashes(folder, images, args.method, args.workers)
+    paths = [p for p, _, _ in images if p in hashes]
+    duplicates = find_duplicates(paths, hashes, args.max_distance)
+
+    report_path = os.path.join(folder, REPORT_NAME)
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['duplicate', 'kept', 'distance'])
+        writer.writerows(duplicates)
+
+    print(f"Method: {args.method}   Max distance: {args.max_distance}")
+    print(f"Unique frames: {len(paths) - len(duplicates)}")
+    print(f"Near-duplicates: {len(duplicates)}")
+    print(f"Report: {report_path}")
+    print("=" * 50)
+
+    if not duplicates or args.action == 'dry-run':
+        return
+
+    if not args.no_confirm:
+        confirm = input(f"Do you want to {args.action} {len(duplicates)} duplicate frames? (yes/no): ")
+        if confirm.lower() not in ['yes', 'y']:
+            print("Operation cancelled. No files were changed.")
+            return
+
+    if args.action == 'move':
+        jobs = [(dup, os.path.join(args.move_to, os.path.relpath(dup, folder))) for dup, _, _ in duplicates]
+        report = transfer_files(jobs, mode="move", desc="Moving")
+        for src, _, error in report.failures:
+            print(f"Error moving {src}: {error}")
+        print(f"Moved: {report.n_done} frames to {args.move_to}")
+    else:
+        removed = 0
+        for dup, _, _ in duplicates:
+            try:
+                os.remove(dup)
+                removed += 1
+            except OSError as e:
+                print(f"Error removing {dup}: {e}")
+        print(f"Removed: {removed} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Export & Benchmark
+
+Exports a YOLO .pt model to several formats and tells whether each export was worth it:
+
+  * agreement  - boxes of the export vs. the .pt model on a sample image folder
+                 (share of .pt boxes matched with the same class and IoU >= MATCH_IOU,
+                 mean IoU of the matches, largest confidence difference)
+  * latency    - p50/p90/p99 per batch and throughput (images/s) for every batch size
+                 and imgsz, end to end through YOLO.predict (pre- and postprocessing included)
+
+Formats: torchscript, onnx, openvino, engine (TensorRT). TensorRT is skipped on machines
+without a CUDA GPU. With --cpu-pipeline the onnx/openvino exports are also timed through
+our own NumPy pipeline (cpu_inference.py).
+
+Every imgsz gets its own export folder, so exports of different sizes do not overwrite
+each other. The report is written as JSON and Markdown to the output folder.
+
+Usage:
+    python export_benchmark.py model.pt --images path/to/sample_images
+    python export_benchmark.py model.pt --images frames/ --formats onnx openvino --imgsz 480 640 --batch-sizes 1 8
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+import cv2
+import numpy as np  # pip install numpy
+
+from cpu_inference import CpuDetector, box_iou_one
+from inference_cache import Detections
+
+FORMATS = ["torchscript", "onnx", "openvino", "engine"]
+CPU_PIPELINE_FORMATS = {"onnx": "onnxruntime", "openvino": "openvino"}
+
+DEFAULT_OUTPUT = "export_benchmark"
+NUM_IMAGES = 32         # sample images used for agreement and timing
+WARMUP_RUNS = 3
+TIMED_RUNS = 20
+CONF = 0.25
+MATCH_IOU = 0.5         # a box counts as matched above this IoU (same class)
+AGREE_MATCH_RATE = 0.95
+AGREE_MEAN_IOU = 0.9
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def cuda_available() -> bool:
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def load_sample_images(folder, limit=NUM_IMAGES):
+    paths = sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                   if f.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    images = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            print(f"Warning: could not read {path}")
+            continue
+        images.append(img)
+    return images
+
+
+def run_model(model, images, imgsz, batch, device):
+    """Detections for all images, in batches."""
+    out = []
+    for start in range(0, len(images), batch):
+        chunk = images[start:start + batch]
+        results = model.predict(chunk, imgsz=imgsz, conf=CONF, device=device, verbose=False)
+        out += [Detections.from_result(r) for r in results]
+    return out
+
+
+def agreement(reference, candidate) -> dict:
+    """Compare per-image detections of an export with the .pt reference."""
+    n_ref = n_matched = 0
+    ious, conf_diffs = [], []
+    n_extra = 0
+    for ref, det in zip(reference, candidate):
+        n_ref += len(ref)
+        used = np.zeros(len(det), bool)
+        for box, score, cls in zip(ref.xyxy, ref.scores, ref.classes):
+            same = (det.classes == cls) & ~used
+            if not same.any():
+                continue
+            idx = np.flatnonzero(same)
+            iou = box_iou_one(box, det.xyxy[idx])
+            best = int(iou.argmax())
+            if iou[best] >= MATCH_IOU:
+                used[idx[best]] = True
+                n_matched += 1
+                ious.append(float(iou[best]))
+                conf_diffs.append(abs(float(score) - float(det.scores[idx[best]])))
+        n_extra += int((~used).sum())
+    match_rate = n_matched / n_ref if n_ref else 1.0
+    mean_iou = float(np.mean(ious)) if ious else (1.0 if n_ref == 0 else 0.0)
+    return {
+        "reference_boxes": n_ref,
+        "matched": n_matched,
+        "extra_boxes": n_extra,
+        "match_rate": round(match_rate, 4),
+        "mean_iou": round(mean_iou, 4),
+        "max_conf_diff": round(max(conf_diffs), 4) if conf_diffs else 0.0,
+        "agrees": match_rate >= AGREE_MATCH_RATE and mean_iou >= AGREE_MEAN_IOU,
+    }
+
+
+def time_model(predict, images, batch, warmup=WARMUP_RUNS, runs=TIMED_RUNS) -> dict:
+    """Latency percentiles per batch (ms) and throughput for one batch size."""
+    batches = [[images[(start + i) % len(images)] for i in range(batch)]
+               for start in range(0, batch * (warmup + runs), batch)]
+    for chunk in batches[:warmup]:
+        predict(chunk)
+    times = []
+    for chunk in batches[warmup:]:
+        t0 = time.perf_counter()
+        predict(chunk)
+        times.append((time.perf_counter() - t0) * 1000)
+    times = np.array(times)
+    return {
+        "batch": batch,
+        "p50_ms": round(float(np.percentile(times, 50)), 2),
+        "p90_ms": round(float(np.percentile(times, 90)), 2),
+        "p99_ms": round(float(np.percentile(times, 99)), 2),
+        "ms_per_image": round(float(times.mean()) / batch, 2),
+        "images_per_s": round(float(batch * len(times) / (times.sum() / 1000)), 1),
+    }
+
+
+def export_format(model_path, fmt, imgsz, export_dir, device, half, workspace, max_batch):
+    """Export a copy of the model in export_dir; returns (path, seconds)."""
+    from ultralytics import YOLO
+
+    os.makedirs(export_dir, exist_ok=True)
+    local_pt = os.path.join(export_dir, os.path.basename(model_path))
+    if not os.path.exists(local_pt):
+        shutil.copy2(model_path, local_pt)
+
+    kwargs = {"format": fmt, "imgsz": imgsz, "device": device}
+    if fmt in ("onnx", "openvino"):
+        kwargs.update(dynamic=True, batch=max_batch, simplify=True)
+    elif fmt == "engine":
+        kwargs.update(dynamic=True, batch=max_batch, half=half, workspace=workspace)
+    t0 = time.perf_counter()
+    path = YOLO(local_pt).export(**kwargs)
+    return str(path), time.perf_counter() - t0
+
+
+def path_size_mb(path) -> float:
+    if os.path.isdir(path):
+        total = sum(os.path.getsize(os.path.join(root, f))
+                    for root, _, files in os.walk(path) for f in files)
+    else:
+        total = os.path.getsize(path)
+    return round(total / 1024 / 1024, 1)
+
+
+def benchmark(args) -> dict:
+    from ultralytics import YOLO
+
+    gpu = cuda_available()
+    device = args.device or ("0" if gpu else "cpu")
+    images = load_sample_images(args.images, args.num_images)
+    if not images:
+        raise SystemExit(f"Error: no readable images in {args.images}")
+    max_batch = max(args.batch_sizes)
+
+    report = {
+        "model": os.path.abspath(args.model),
+        "device": device,
+        "cuda": gpu,
+        "num_images": len(images),
+        "conf": CONF,
+        "results": [],
+    }
+
+    for imgsz in args.imgsz:
+        print(f"\n=== imgsz {imgsz} ===")
+        reference_model = YOLO(args.model)
+        reference = run_model(reference_model, images, imgsz, max_batch, device)
+        pt_timings = [time_model(lambda chunk: reference_model.predict(
+                          chunk, imgsz=imgsz, conf=CONF, device=device, verbose=False), images, b)
+                      for b in args.batch_sizes]
+        report["results"].append({"format": "pytorch", "imgsz": imgsz, "status": "ok",
+                                  "size_mb": path_size_mb(args.model), "timings": pt_timings})
+        print(f"pytorch     : {pt_timings[0]['ms_per_image']} ms/image (batch {pt_timings[0]['batch']})")
+
+        export_dir = os.path.join(args.output, "exports", f"imgsz{imgsz}")
+        for fmt in args.formats:
+            entry = {"format": fmt, "imgsz": imgsz}
+            report["results"].append(entry)
+            if fmt == "engine" and not gpu:
+                entry["status"] = "skipped: TensorRT needs a CUDA GPU"
+                print(f"{fmt:12s}: skipped (no CUDA GPU)")
+                continue
+            try:
+                path, seconds = export_format(args.model, fmt, imgsz, export_dir, device,
+                                              args.half and gpu, args.workspace, max_batch)
+                entry.update(path=path, export_s=round(seconds, 1), size_mb=path_size_mb(path))
+
+                model = YOLO(path, task="detect")
+                entry["agreement"] = agreement(reference, run_model(model, images, imgsz, max_batch, device))
+                entry["timings"] = [time_model(lambda chunk: model.predict(
+                                        chunk, imgsz=imgsz, conf=CONF, device=device, verbose=False), images, b)
+                                    for b in args.batch_sizes]
+                entry["status"] = "ok"
+                print(f"{fmt:12s}: {entry['timings'][0]['ms_per_image']} ms/image, "
+                      f"match rate {entry['agreement']['match_rate']:.1%}")
+            except Exception as e:
+                entry["status"] = f"failed: {e}"
+                print(f"{fmt:12s}: failed ({e})")
+                continue
+
+            runtime = CPU_PIPELINE_FORMATS.get(fmt)
+            if args.cpu_pipeline and runtime:
+                entry = {"format": f"{fmt} (cpu_inference)", "imgsz": imgsz, "path": path}
+                report["results"].append(entry)
+                try:
+                    detector = CpuDetector(path, runtime)
+                    predict = lambda chunk: detector.predict(chunk, imgsz=imgsz, conf=CONF)
+                    entry["agreement"] = agreement(
+                        reference, [d for start in range(0, len(images), max_batch)
+                                    for d in predict(images[start:start + max_batch])])
+                    entry["timings"] = [time_model(predict, images, b) for b in args.batch_sizes]
+                    entry["status"] = "ok"
+                    print(f"{entry['format']:12s}: {entry['timings'][0]['ms_per_image']} ms/image")
+                except Exception as e:
+                    entry["status"] = f"failed: {e}"
+                    print(f"{entry['format']:12s}: failed ({e})")
+
+    return report
+
+
+def write_markdown(report, path):
+    baseline = {(r["imgsz"], t["batch"]): t["ms_per_image"]
+                for r in report["results"] if r["format"] == "pytorch" for t in r["timings"]}
+    lines = [
+        "# Export benchmark",
+        "",
+        f"Model: `{report['model']}`  ",
+        f"Device: {report['device']} (CUDA: {'yes' if report['cuda'] else 'no'}), "
+        f"{report['num_images']} sample images, conf {report['conf']}",
+        "",
+        "| format | imgsz | size MB | match rate | mean IoU | max conf diff | batch | p50 ms | p90 ms | p99 ms | ms/image | images/s | speedup |",
+        "|---|---|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in report["results"]:
+        if r.get("status") != "ok":
+            lines.append(f"| {r['format']} | {r['imgsz']} | | | | | | | | | | | {r.get('status')} |")
+            continue
+        agree = r.get("agreement")
+        if agree:
+            quality = f"{agree['match_rate']:.1%} | {agree['mean_iou']} | {agree['max_conf_diff']}"
+        else:
+            quality = "reference | | "
+        for t in r["timings"]:
+            base = baseline.get((r["imgsz"], t["batch"]))
+            speedup = f"{base / t['ms_per_image']:.2f}x" if base and t["ms_per_image"] else ""
+            lines.append(
+                f"| {r['format']} | {r['imgsz']} | {r.get('size_mb', '')} | {quality} | "
+                f"{t['batch']} | {t['p50_ms']} | {t['p90_ms']} | {t['p99_ms']} | "
+                f"{t['ms_per_image']} | {t['images_per_s']} | {speedup} |")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export a YOLO model to several formats and benchmark agreement and speed",
+        epilog="Example: python export_benchmark.py model.pt --images samples/ --formats onnx openvino engine")
+    parser.add_argument("model", help="YOLO .pt model")
+    parser.add_argument("--images", required=True, help="Folder with sample images")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS,
+                        help="Export formats (default: all; engine is skipped without a CUDA GPU)")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640], help="Image sizes (default: 640)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8], help="Batch sizes (default: 1 8)")
+    parser.add_argument("--num-images", type=int, default=NUM_IMAGES,
+                        help=f"Sample images to use (default: {NUM_IMAGES})")
+    parser.add_argument("--device", help="Device, e.g. 0 or cpu (default: GPU 0 when available)")
+    parser.add_argument("--half", action="store_true", help="FP16 TensorRT engine")
+    parser.add_argument("--workspace", type=float, default=4, help="TensorRT workspace in GB (default: 4)")
+    parser.add_argument("--cpu-pipeline", action="store_true",
+                        help="Also time onnx/openvino through cpu_inference.py")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Output folder (default: {DEFAULT_OUTPUT})")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.model):
+        print(f"Error: Model not found: {args.model}")
+        sys.exit(1)
+    if not os.path.isdir(args.images):
+        print(f"Error: Image folder not found: {args.images}")
+        sys.exit(1)
+
+    os.makedirs(args.output, exist_ok=True)
+    report = benchmark(args)
+
+    json_path = os.path.join(args.output, "benchmark.json")
+    md_path = os.path.join(args.output, "benchmark.md")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    write_markdown(report, md_path)
+    print(f"\nReport written to {json_path} and {md_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+File Transfer Helpers
+
+Materializes dataset files in an output folder without necessarily copying the
+bytes. Supported modes:
+
+    copy     : full byte copy (shutil.copy2)
+    hardlink : new directory entry for the same file (no extra disk space)
+    reflink  : copy-on-write clone (Btrfs, XFS, APFS, ...) - independent file, no extra space
+    symlink  : symbolic link to the source (Windows needs developer mode/admin)
+    auto     : reflink → hardlink → copy, whichever works first
+
+Modes that cannot work for a given pair of paths (different devices, filesystem
+without clone support, no symlink permission) fall back to copy automatically.
+
+Note: a hardlinked or symlinked output is the *same* file as the source. Editing
+a label in the output folder also changes the original.
+
+The bulk transfer engine (transfer_files) runs many transfers on a bounded
+thread pool: destination folders are created once up front, failed transfers
+are retried, and an aggregate files/throughput/ETA line is reported while it
+runs. Parallel copying is several times faster than serial copying on NAS and
+NVMe storage.
+
+Usage:
+    from file_transfer import materialize, transfer_files
+    used_mode = materialize(src, dst, "hardlink")
+
+    report = transfer_files([(src1, dst1), (src2, dst2)], mode="copy")
+    print(report.n_done, report.failures)
+"""
+
+import os
+import sys
+import time
+import errno
+import shutil
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import NamedTuple
+
+LINK_MODES = ["copy", "hardlink", "reflink", "symlink", "auto"]
+TRANSFER_MODES = LINK_MODES + ["move"]
+
+# Bulk transfer defaults
+TRANSFER_WORKERS = 8        # concurrent transfers
+TRANSFER_RETRIES = 2        # extra attempts per file after a failure
+TRANSFER_RETRY_DELAY = 0.5  # seconds, doubled after every failed attempt
+REPORT_INTERVAL = 2.0       # seconds between progress lines
+
+# Linux FICLONE ioctl (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+
+def _same_device(src: str, dst: str) -> bool:
+    try:
+        return os.stat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    except OSError:
+        return False
+
+
+def _reflink(src: str, dst: str) -> None:
+    """Copy-on-write clone of src to dst. Raises OSError if unsupported."""
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+            try:
+                fcntl.ioctl(f_dst.fileno(), _FICLONE, f_src.fileno())
+            except OSError:
+                f_dst.close()
+                os.remove(dst)
+                raise
+        shutil.copystat(src, dst)
+    elif sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL("libc.dylib", use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dst)
+    else:
+        raise OSError(errno.EOPNOTSUPP, "reflink not supported on this platform", dst)
+
+
+def _remove_existing(dst: str) -> None:
+    if os.path.lexists(dst):
+        os.remove(dst)
+
+
+def materialize(src, dst, mode: str = "copy") -> str:
+    """
+    Make dst a copy/link of src according to mode. An existing dst is replaced.
+
+    Returns the mode that was actually used ("copy" after a fallback).
+    """
+    src, dst = str(src), str(dst)
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {mode} (choose from {', '.join(LINK_MODES)})")
+
+    candidates = ["reflink", "hardlink"] if mode == "auto" else [mode]
+    for candidate in candidates:
+        if candidate == "copy":
+            break
+        if candidate in ("hardlink", "reflink") and not _same_device(src, dst):
+            continue  # cross-device: links/clones are impossible
+        try:
+            _remove_existing(dst)
+            if candidate == "hardlink":
+                os.link(src, dst)
+            elif candidate == "reflink":
+                _reflink(src, dst)
+            elif candidate == "symlink":
+                os.symlink(os.path.abspath(src), dst)
+            return candidate
+        except (OSError, NotImplementedError):
+            continue
+
+    # Never write through a link left by a previous run (it would modify the source)
+    _remove_existing(dst)
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+class TransferReport(NamedTuple):
+    n_done: int
+    n_failed: int
+    n_bytes: int
+    seconds: float
+    modes: Counter                        # mode actually used -> count
+    failures: list[tuple[str, str, str]]  # (src, dst, error message)
+    done: set[str]                        # destination paths that succeeded
+
+
+def transfer_one(src, dst, mode: str = "copy", retries: int = TRANSFER_RETRIES) -> str:
+    """
+    Transfer a single file (copy/link via materialize, or move), with retries.
+
+    Returns the mode actually used; raises the last OSError when all attempts fail.
+    """
+    delay = TRANSFER_RETRY_DELAY
+    for attempt in range(retries + 1):
+        try:
+            if mode == "move":
+                shutil.move(str(src), str(dst))
+                return "move"
+            return materialize(src, dst, mode)
+        except FileNotFoundError:
+            raise  # retrying will not bring the source back
+        except OSError:
+            if attempt == retries:
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def transfer_files(jobs, mode: str = "copy", workers: int = TRANSFER_WORKERS,
+                   retries: int = TRANSFER_RETRIES, desc: str = "Transfer",
+                   verbose: bool = True) -> TransferReport:
+    """
+    Run many file transfers concurrently.
+
+    Args:
+        jobs: iterable of (src, dst) or (src, dst, mode) tuples; mode overrides the default
+        mode: default transfer mode (see TRANSFER_MODES)
+        workers: size of the thread pool
+        retries: extra attempts per file after a failure
+        desc: label used in the progress lines
+        verbose: print progress and the final throughput summary
+
+    Returns:
+        TransferReport with counts, bytes, failures and the set of finished destinations
+    """
+    jobs = [(str(j[0]), str(j[1]), j[2] if len(j) > 2 else mode) for j in jobs]
+    for _, _, job_mode in jobs:
+        if job_mode not in TRANSFER_MODES:
+            raise ValueError(f"Unknown transfer mode: {job_mode} (choose from {', '.join(TRANSFER_MODES)})")
+
+    # Create all destination folders once instead of per file
+    for folder in {os.path.dirname(os.path.abspath(dst)) for _, dst, _ in jobs}:
+        os.makedirs(folder, exist_ok=True)
+
+    total = len(jobs)
+    modes, failures, done = Counter(), [], set()
+    n_bytes = 0
+    start = last_report = time.monotonic()
+
+    def run(job):
+        src, dst, job_mode = job
+        try:
+            size = os.path.getsize(src)
+        except OSError:
+            size = 0
+        used = transfer_one(src, dst, job_mode, retries)
+        return used, size if used in ("copy", "move") else 0
+
+    def report_progress(final=False):
+        elapsed = max(time.monotonic() - start, 1e-6)
+        finished = len(done) + len(failures)
+        rate = finished / elapsed
+        eta = (total - finished) / rate if rate > 0 else 0
+        line = (f"   {desc}: {finished}/{total} files, {_format_bytes(n_bytes)} "
+                f"({_format_bytes(n_bytes / elapsed)}/s, {rate:.0f} files/s)")
+        if not final:
+            line += f", ETA {_format_eta(eta)}"
+        print(line)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {}
+        job_iter = iter(jobs)
+        max_in_flight = max(1, workers) * 4  # bounded queue, also for millions of files
+
+        while True:
+            while len(pending) < max_in_flight:
+                job = next(job_iter, None)
+                if job is None:
+                    break
+                pending[pool.submit(run, job)] = job
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                src, dst, _ = pending.pop(future)
+                try:
+                    used, size = future.result()
+                except Exception as e:
+                    failures.append((src, dst, str(e)))
+                    continue
+                modes[used] += 1
+                n_bytes += size
+                done.add(dst)
+
+            if verbose and time.monotonic() - last_report >= REPORT_INTERVAL:
+                last_report = time.monotonic()
+                report_progress()
+
+    seconds = time.monotonic() - start
+    if verbose and total:
+        report_progress(final=True)
+    return TransferReport(len(done), len(failures), n_bytes, seconds, modes, failures, done)
@@ -1,4 +1,7 @@
 import os
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # --- CONFIGURATIE ---
 BASE_PATH = r"."    # Verander dit naar je doelmap, bijv. "./src" of "C:/Projects/App"
@@ -6,60 +9,167 @@ FANCY_MODE = True  # True voor iconen, False voor strakke Industry Standard
 MAX_DEPTH = 2      # Hoe diep de boom moet gaan
 EXCLUDE = {'.git', 'node_modules', '__pycache__', '.venv', 'dist', '.DS_Store', '.vscode'}
 
+# Samenvattingsmodus: elke map krijgt het aantal bestanden en de totale grootte van
+# alles eronder, en mappen met meer dan SUMMARY_THRESHOLD bestanden (bijv. images/ en
+# labels/ van een dataset) worden ingeklapt tot één regel per extensie.
+# Submappen worden parallel gescand met SCAN_THREADS threads.
+SUMMARY_MODE = False
+SUMMARY_THRESHOLD = 20
+SCAN_THREADS = 16
+
+FILE_ICONS = {
+    '.py': "🐍 ", '.js': "📜 ", '.ts': "📘 ",
+    '.html': "🌐 ", '.css': "🎨 ", '.md': "📝 ",
+    '.json': "⚙️ ", '.env': "🔑 ", 'docker': "🐋 ",
+    'LICENSE': "⚖️ ", '.png': "🖼️ ", '.jpg': "🖼️ "
+}
+
 def get_icon(is_dir, name):
     if not FANCY_MODE:
         return ""
     if is_dir:
         return "📂 "
-    
+
     # Bestandspecifieke iconen
-    file_icons = {
-        '.py': "🐍 ", '.js': "📜 ", '.ts': "📘 ", 
-        '.html': "🌐 ", '.css': "🎨 ", '.md': "📝 ",
-        '.json': "⚙️ ", '.env': "🔑 ", 'docker': "🐋 ",
-        'LICENSE': "⚖️ ", '.png': "🖼️ ", '.jpg': "🖼️ "
-    }
-    
-    for ext, icon in file_icons.items():
+    for ext, icon in FILE_ICONS.items():
         if name.lower().endswith(ext) or name.lower() == ext.strip('.'):
             return icon
     return "📄 "
 
-def generate_tree(current_path, depth=0):
-    if depth > MAX_DEPTH:
-        return ""
-
-    output = ""
+def sorted_entries(current_path):
+    """Eén scandir per map; het type komt uit de DirEntry (geen extra isdir-aanroepen)."""
     try:
-        items = os.listdir(current_path)
-    except PermissionError:
-        return ""
-
+        with os.scandir(current_path) as it:
+            entries = [(e.is_dir(), e) for e in it if e.name not in EXCLUDE]
+    except (PermissionError, FileNotFoundError):
+        return []
     # Sorteren: mappen eerst, dan bestanden (alfabetisch)
-    items.sort(key=lambda x: (not os.path.isdir(os.path.join(current_path, x)), x.lower()))
+    entries.sort(key=lambda x: (not x[0], x[1].name.lower()))
+    return entries
+
+def iter_tree(current_path, depth=0):
+    """Levert de regels van de boom één voor één op (streaming, geen string-opbouw)."""
+    if depth > MAX_DEPTH:
+        return
 
-    # Filter de items die we willen negeren
-    filtered_items = [item for item in items if item not in EXCLUDE]
+    entries = sorted_entries(current_path)
+    for i, (is_dir, entry) in enumerate(entries):
+        is_last = (i == len(entries) - 1)
 
-    for i, item in enumerate(filtered_items):
-        path = os.path.join(current_path, item)
-        is_last = (i == len(filtered_items) - 1)
-        
         # Teken de boom-structuur symbolen
         connector = "└── " if is_last else "├── "
         prefix = "    " * depth
-        
-        icon = get_icon(os.path.isdir(path), item)
-        output += f"{prefix}{connector}{icon}{item}\n"
-        
-        if os.path.isdir(path):
-            output += generate_tree(path, depth + 1)
-            
-    return output
+
+        yield f"{prefix}{connector}{get_icon(is_dir, entry.name)}{entry.name}"
+
+        if is_dir:
+            yield from iter_tree(entry.path, depth + 1)
+
+def generate_tree(current_path, depth=0):
+    return "".join(line + "\n" for line in iter_tree(current_path, depth))
+
+# --- SAMENVATTINGSMODUS ---
+
+def format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+def scan_dir(path):
+    """Eén map scannen: (submappen, bestanden [(naam, grootte)])."""
+    subdirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name in EXCLUDE:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    else:
+                        files.append((entry.name, entry.stat(follow_symlinks=False).st_size))
+                except OSError:
+                    continue
+    except (PermissionError, FileNotFoundError):
+        pass
+    return subdirs, files
+
+def scan_tree(root):
+    """
+    Scant de hele boom met een threadpool: elke voltooide map zet zijn submappen in de rij.
+
+    Geeft {pad: (submappen, bestanden)} terug.
+    """
+    result = {}
+    with ThreadPoolExecutor(max_workers=SCAN_THREADS) as pool:
+        pending = {pool.submit(scan_dir, root): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                subdirs, files = future.result()
+                result[path] = (subdirs, files)
+                for sub in subdirs:
+                    pending[pool.submit(scan_dir, sub)] = sub
+    return result
+
+def subtree_totals(tree):
+    """(aantal bestanden, totale grootte) per map, inclusief alles eronder."""
+    totals = {}
+    # Diepste mappen eerst, zodat de submappen al opgeteld zijn
+    for path in sorted(tree, key=lambda p: p.count(os.sep), reverse=True):
+        subdirs, files = tree[path]
+        count = len(files) + sum(totals[s][0] for s in subdirs if s in totals)
+        size = sum(s for _, s in files) + sum(totals[s][1] for s in subdirs if s in totals)
+        totals[path] = (count, size)
+    return totals
+
+def iter_summary(tree, totals, current_path, depth=0):
+    if depth > MAX_DEPTH:
+        return
+    subdirs, files = tree.get(current_path, ([], []))
+    collapse = len(files) > SUMMARY_THRESHOLD
+
+    items = [(True, os.path.basename(s), s) for s in subdirs]
+    if collapse:
+        by_ext = Counter(os.path.splitext(name)[1].lower() or name for name, _ in files)
+        size_by_ext = Counter()
+        for name, size in files:
+            size_by_ext[os.path.splitext(name)[1].lower() or name] += size
+        lines = [f"… {n:,} {ext} bestanden ({format_size(size_by_ext[ext])})" for ext, n in by_ext.most_common()]
+    else:
+        lines = []
+        items += [(False, name, None) for name, _ in files]
+    items.sort(key=lambda x: (not x[0], x[1].lower()))
+
+    rows = items + [(None, line, None) for line in lines]
+    for i, (is_dir, name, path) in enumerate(rows):
+        connector = "└── " if i == len(rows) - 1 else "├── "
+        prefix = "    " * depth
+        if is_dir is None:
+            yield f"{prefix}{connector}{name}"
+        elif is_dir:
+            count, size = totals.get(path, (0, 0))
+            yield f"{prefix}{connector}{get_icon(True, name)}{name}/  ({count:,} bestanden, {format_size(size)})"
+            yield from iter_summary(tree, totals, path, depth + 1)
+        else:
+            yield f"{prefix}{connector}{get_icon(False, name)}{name}"
 
 if __name__ == "__main__":
     # Haal de naam van de startmap op voor de top van de boom
     root_name = os.path.basename(os.path.abspath(BASE_PATH))
-    print(f"```text\n{root_name}/")
-    print(generate_tree(BASE_PATH))
+    if SUMMARY_MODE:
+        tree = scan_tree(BASE_PATH)
+        totals = subtree_totals(tree)
+        count, size = totals.get(BASE_PATH, (0, 0))
+        print(f"```text\n{root_name}/  ({count:,} bestanden, {format_size(size)})")
+        lines = iter_summary(tree, totals, BASE_PATH)
+    else:
+        print(f"```text\n{root_name}/")
+        lines = iter_tree(BASE_PATH)
+    # Regels direct wegschrijven in plaats van eerst de hele boom op te bouwen
+    for line in lines:
+        sys.stdout.write(line + "\n")
     print("```")
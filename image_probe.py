@@ -0,0 +1,116 @@
+"""
+Image Size Probe
+
+Reads the width and height of an image from its file header, without decoding
+any pixels. Only a few hundred bytes are read (JPEG: the segment headers up to
+the first SOF marker), so probing 100k images takes seconds instead of the
+minutes a full decode needs.
+
+Supported: JPEG, PNG, BMP, WebP (lossy, lossless, extended) and GIF. Other
+formats (e.g. TIFF) fall back to a lazy PIL open in image_size().
+
+The size is the stored size; EXIF orientation is not applied (same as PIL's
+Image.size).
+
+Usage:
+    from image_probe import image_size
+    width, height = image_size("frame_0001.jpg") or (None, None)
+"""
+
+import struct
+
+try:
+    from PIL import Image  # pip install pillow
+except ImportError:
+    Image = None
+
+HEADER_BYTES = 32  # enough for PNG, BMP, WebP and GIF
+
+# JPEG start-of-frame markers (all SOFn except DHT, JPG and DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(f) -> tuple[int, int] | None:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':  # garbage between segments
+            byte = f.read(1)
+        while byte == b'\xff':           # fill bytes
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue                     # markers without a length field
+        if marker == 0xD9:
+            return None                  # end of image before a frame header
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in _SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return (width, height) if width and height else None
+        f.seek(length - 2, 1)
+
+
+def _header_size(head: bytes) -> tuple[int, int] | None:
+    """Size from the first HEADER_BYTES of a PNG, BMP, WebP or GIF file."""
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+
+    if head.startswith(b'BM') and len(head) >= 26:
+        header_size = struct.unpack('<I', head[14:18])[0]
+        if header_size == 12:  # OS/2 BITMAPCOREHEADER
+            return struct.unpack('<HH', head[18:22])
+        width, height = struct.unpack('<ii', head[18:26])
+        return abs(width), abs(height)  # negative height = top-down bitmap
+
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        chunk = head[12:16]
+        if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+            width, height = struct.unpack('<HH', head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L' and head[20] == 0x2F:
+            b0, b1, b2, b3 = head[21:25]
+            width = 1 + (((b1 & 0x3F) << 8) | b0)
+            height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+            return width, height
+        if chunk == b'VP8X':
+            width = 1 + int.from_bytes(head[24:27], 'little')
+            height = 1 + int.from_bytes(head[27:30], 'little')
+            return width, height
+        return None
+
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', head[6:10])
+
+    return None
+
+
+def probe_image_size(path) -> tuple[int, int] | None:
+    """(width, height) from the file header, or None for unknown/truncated files."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(HEADER_BYTES)
+            if head.startswith(b'\xff\xd8'):
+                return _jpeg_size(f)
+            return _header_size(head)
+    except (OSError, struct.error, IndexError):
+        return None
+
+
+def image_size(path) -> tuple[int, int] | None:
+    """Header probe, with a lazy PIL open as fallback for other formats."""
+    size = probe_image_size(path)
+    if size is not None or Image is None:
+        return size
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except (OSError, Image.DecompressionBombError):
+        return None
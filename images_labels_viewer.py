@@ -14,11 +14,24 @@ import customtkinter as ctk
 import yaml
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 
+from dataset_catalog import DirectoryCatalog, get_catalog
+from label_index import dataset_root, open_index
+from label_pack import update_pack
+from yolo_labels import read_label_file
+
 # ── Vaste weergave-instellingen ───────────────────────────────────────────────
 MASK_ALPHA      = 0.35
 BBOX_THICKNESS  = 2
 SHOW_LABEL_TEXT = True
 
+# Klasse-scan via de persistente label-index (.label_index.sqlite naast de labelmap)
+# in plaats van alle labelbestanden te lezen.
+USE_LABEL_INDEX = False
+
+# Klasse-scan via een gepackt <labelmap>.labelpack bestand (zie label_pack.py),
+# zonder elk labelbestand apart te openen.
+USE_LABEL_PACK = False
+
 # Kleuren per klasse (RGB). Worden cyclisch hergebruikt als er meer klassen zijn.
 CLASS_COLORS = [
     (255,  80,  80),
@@ -52,12 +65,20 @@ def color_for_class(cls: int) -> tuple[int, int, int]:
     return CLASS_COLORS[cls % len(CLASS_COLORS)]
 
 
+def format_size(size: tuple[int, int] | None) -> str:
+    return f"{size[0]}×{size[1]}" if size else "?×?"
+
+
 def find_image_label_pairs(images_dir: str, labels_dir: str) -> list[tuple[Path, Path]]:
     pairs, no_label = [], []
     img_dir, lbl_dir = Path(images_dir), Path(labels_dir)
 
-    all_images = sorted(p for p in img_dir.iterdir()
-                        if p.suffix.lower() in IMAGE_EXTS)
+    # Eén scan per map in plaats van een exists()-aanroep per afbeelding
+    images = get_catalog(img_dir, sorted(IMAGE_EXTS))
+    labels = DirectoryCatalog(lbl_dir, [".txt"])
+    all_images = sorted(Path(e.path) for e in images)
+    # Resoluties uit de bestandsheaders (zonder decoderen), gecachet in de catalogus
+    sizes = images.probe_sizes()
 
     print(f"\n{'─'*55}")
     print(f"  Afbeeldingenmap : {img_dir.resolve()}")
@@ -65,13 +86,14 @@ def find_image_label_pairs(images_dir: str, labels_dir: str) -> list[tuple[Path,
     print(f"{'─'*55}")
 
     for img_path in all_images:
-        lbl_path = lbl_dir / (img_path.stem + ".txt")
-        if lbl_path.exists():
+        lbl_entry = labels.find_entry(img_path.stem)
+        if lbl_entry is not None:
+            lbl_path = Path(lbl_entry.path)
             pairs.append((img_path, lbl_path))
-            print(f"  ✓  {img_path.name:40s} → {lbl_path.name}")
+            print(f"  ✓  {img_path.name:40s} {format_size(sizes.get(img_path.name)):>11s} → {lbl_path.name}")
         else:
             no_label.append(img_path)
-            print(f"  ✗  {img_path.name:40s} → GEEN LABEL GEVONDEN")
+            print(f"  ✗  {img_path.name:40s} {format_size(sizes.get(img_path.name)):>11s} → GEEN LABEL GEVONDEN")
 
     print(f"{'─'*55}")
     print(f"  Gematcht : {len(pairs)}   Zonder label : {len(no_label)}")
@@ -80,25 +102,16 @@ def find_image_label_pairs(images_dir: str, labels_dir: str) -> list[tuple[Path,
 
 
 def parse_label(lbl_path: Path) -> list[dict]:
+    labels = read_label_file(lbl_path)
+    n_points = labels.num_points
     annotations = []
-    with open(lbl_path) as f:
-        for line in f:
-            vals = line.strip().split()
-            if not vals:
-                continue
-            cls  = int(vals[0])
-            nums = list(map(float, vals[1:]))
-            if len(nums) >= 8:
-                polygon = [(nums[i], nums[i + 1]) for i in range(0, len(nums), 2)]
-                xs = [p[0] for p in polygon]
-                ys = [p[1] for p in polygon]
-                cx = (min(xs) + max(xs)) / 2
-                cy = (min(ys) + max(ys)) / 2
-                w  = max(xs) - min(xs)
-                h  = max(ys) - min(ys)
-                annotations.append({"cls": cls, "bbox": (cx, cy, w, h), "polygon": polygon})
-            elif len(nums) == 4:
-                annotations.append({"cls": cls, "bbox": tuple(nums), "polygon": None})
+    for i, (cls, bbox) in enumerate(zip(labels.class_ids.tolist(),
+                                        labels.boxes.tolist())):
+        if n_points[i] >= 4:
+            polygon = [tuple(p) for p in labels.polygon(i).tolist()]
+            annotations.append({"cls": cls, "bbox": tuple(bbox), "polygon": polygon})
+        elif n_points[i] == 0:
+            annotations.append({"cls": cls, "bbox": tuple(bbox), "polygon": None})
     return annotations
 
 
@@ -402,7 +415,7 @@ class LabelViewer(ctk.CTk):
         self.lbl_info.configure(
             text=f"{img_path.name}   │   {len(self.annotations)} objecten  "
                  f"({n_seg} seg, {n_bbox} bbox)   │   "
-                 f"{self.orig_img.width}×{self.orig_img.height}")
+                 f"{format_size(self.orig_img.size)}")
         self.btn_prev.configure(
             state="normal" if self.index > 0 else "disabled")
         self.btn_next.configure(
@@ -474,11 +487,19 @@ def main():
 
     # Als er geen yaml was: genereer nummers als klasse-namen
     if not class_names:
-        max_cls = max(
-            ann["cls"]
-            for _, lp in pairs
-            for ann in parse_label(lp)
-        )
+        if USE_LABEL_INDEX:
+            lbl_dir = Path(cfg["labels"])
+            with open_index(dataset_root(lbl_dir.resolve())) as index:
+                index.refresh(lbl_dir)
+                max_cls = index.max_class_id(lbl_dir) or 0
+        elif USE_LABEL_PACK:
+            max_cls = update_pack(cfg["labels"]).max_class_id() or 0
+        else:
+            max_cls = max(
+                (ann["cls"]
+                 for _, lp in pairs
+                 for ann in parse_label(lp)),
+                default=0)
         class_names = [str(i) for i in range(max_cls + 1)]
         print(f"Geen yaml opgegeven – klasse-id's als naam: {class_names}")
 
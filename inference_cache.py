@@ -0,0 +1,328 @@
+"""
+Inference Result Cache
+
+Persistent SQLite cache of YOLO detections. Entries are content-addressed: the key is
+a hash of the model weights, the image bytes and the inference parameters that change
+the boxes (imgsz, iou, classes, ...). Renaming or moving an image keeps its entry,
+while retraining the model or changing imgsz gives new ones.
+
+Detections are stored without a confidence cutoff (the model runs with RAW_CONF), so
+changing the confidence threshold of a script is a pure lookup. Filtering the cached
+boxes at conf=t gives the same boxes as running the model with conf=t. NMS only lets
+a box suppress boxes with a lower score, so the boxes above t are unaffected by the
+extra low-score boxes.
+
+File hashes are memoised by (path, mtime, size), so images are only re-read when they
+change. The cache is capped at MAX_CACHE_MB and evicts the least recently used entries.
+Only boxes are cached (no masks or keypoints).
+
+Usage:
+    python inference_cache.py [--cache PATH] [--clear]     # show/clear the cache
+
+    from inference_cache import InferenceCache
+    with InferenceCache("model.pt") as cache:
+        for path, det in zip(paths, cache.predict(model, paths, conf=0.6)):
+            print(path, len(det), det.max_conf)
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+import numpy as np  # pip install numpy
+
+# Default cache location and size limit
+INFERENCE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "yolo_inference_cache.sqlite")
+MAX_CACHE_MB = 1024
+
+# Confidence used for the cached model run (ultralytics' own validation default)
+RAW_CONF = 0.001
+
+# Images per model call on cache misses
+BATCH_SIZE = 16
+
+HASH_CHUNK = 1 << 20
+CACHE_VERSION = 1
+ROW_OVERHEAD = 96  # approximate bytes per row besides the detections blob
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path     TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    digest   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key       TEXT PRIMARY KEY,
+    height    INTEGER NOT NULL,
+    width     INTEGER NOT NULL,
+    data      BLOB NOT NULL,
+    nbytes    INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used);
+"""
+
+
+class Detections:
+    """Boxes of one image: xyxy (N, 4) in pixels, scores (N,), classes (N,)."""
+
+    __slots__ = ("xyxy", "scores", "classes", "orig_shape")
+
+    def __init__(self, xyxy, scores, classes, orig_shape):
+        self.xyxy = xyxy
+        self.scores = scores
+        self.classes = classes
+        self.orig_shape = orig_shape  # (height, width)
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def max_conf(self) -> float:
+        return float(self.scores.max()) if len(self.scores) else 0.0
+
+    def above(self, conf) -> "Detections":
+        """Detections with a score of at least conf."""
+        keep = self.scores >= conf
+        return Detections(self.xyxy[keep], self.scores[keep], self.classes[keep], self.orig_shape)
+
+    @classmethod
+    def from_result(cls, result) -> "Detections":
+        """Convert an ultralytics Results object (boxes only); Detections pass through."""
+        if isinstance(result, Detections):
+            return result
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                       np.zeros(0, np.int32), tuple(result.orig_shape))
+        data = boxes.data.cpu().numpy()  # one copy: x1 y1 x2 y2 conf cls (+ track id)
+        return cls(data[:, :4].astype(np.float32), data[:, 4].astype(np.float32),
+                   data[:, 5].astype(np.int32), tuple(result.orig_shape))
+
+    def to_blob(self) -> bytes:
+        rows = np.empty((len(self), 6), np.float32)
+        rows[:, :4] = self.xyxy
+        rows[:, 4] = self.scores
+        rows[:, 5] = self.classes
+        return rows.tobytes()
+
+    @classmethod
+    def from_blob(cls, blob, orig_shape) -> "Detections":
+        rows = np.frombuffer(blob, np.float32).reshape(-1, 6)
+        return cls(rows[:, :4], rows[:, 4], rows[:, 5].astype(np.int32), orig_shape)
+
+
+class InferenceCache:
+    """
+    Cache for one model and one set of inference parameters.
+
+    Thread-safe: all database access goes through one lock, so worker threads can
+    share a cache. Extra predict parameters that change the boxes (e.g. agnostic_nms,
+    max_det) go in **params and become part of the key. Without imgsz, predict() uses
+    the size the model was trained/exported at and the key holds that size. The backend
+    (see cpu_inference.py) is part of the key too, but is not passed to predict().
+    """
+
+    def __init__(self, weights_path, imgsz=None, iou=0.7, classes=None, backend="pytorch",
+                 cache_path=INFERENCE_CACHE_PATH, max_mb=MAX_CACHE_MB, **params):
+        self.cache_path = str(cache_path)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._touched = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # one small commit per new image stays cheap
+        self._check_version()
+        self._total = self.conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+
+        self.params = {"imgsz": imgsz, "iou": iou, "classes": sorted(classes) if classes else None, **params}
+        key_params = dict(self.params)
+        if imgsz is None:
+            # predict() then uses the size the model was trained/exported at
+            from cpu_inference import model_imgsz
+            key_params["imgsz"] = model_imgsz(weights_path)
+        weights_hash = self.file_hash(weights_path)
+        params_json = json.dumps(key_params, sort_keys=True)
+        self._prefix = hashlib.blake2b(
+            f"{weights_hash}|{backend}|{params_json}".encode(), digest_size=16).hexdigest()
+
+    def _check_version(self):
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is not None and row[0] != str(CACHE_VERSION):
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS results; DROP TABLE IF EXISTS file_hashes; DROP TABLE IF EXISTS meta;")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self.conn.close()
+
+    # ── keys ───────────────────────────────────────────────────────────────────
+
+    def file_hash(self, path) -> str:
+        """Content hash of a file, memoised by (path, mtime, size)."""
+        path = os.path.normcase(os.path.abspath(str(path)))
+        st = os.stat(path)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT mtime_ns, size, digest FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[:2] == (st.st_mtime_ns, st.st_size):
+            return row[2]
+
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                              (path, st.st_mtime_ns, st.st_size, digest))
+        return digest
+
+    def image_key(self, path) -> str:
+        """Cache key of an image for this model and these parameters."""
+        return f"{self._prefix}:{self.file_hash(path)}"
+
+    def predict_kwargs(self) -> dict:
+        """Arguments for model.predict() that produce cacheable (unfiltered) results."""
+        params = {k: v for k, v in self.params.items() if k != "imgsz" or v is not None}
+        return {"conf": RAW_CONF, "verbose": False, **params}
+
+    # ── lookup / store ─────────────────────────────────────────────────────────
+
+    def get(self, key) -> Detections | None:
+        """All cached detections (no conf cutoff) for a key, or None on a miss."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT height, width, data FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+        height, width, data = row
+        return Detections.from_blob(data, (height, width))
+
+    def put(self, key, detections: Detections):
+        blob = detections.to_blob()
+        nbytes = len(blob) + ROW_OVERHEAD
+        height, width = detections.orig_shape[:2]
+        with self._lock, self.conn:
+            old = self.conn.execute("SELECT nbytes FROM results WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, height, width, blob, nbytes, time.time()))
+            self._total += nbytes - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _flush_touched(self):
+        if self._touched:
+            with self.conn:
+                self.conn.executemany("UPDATE results SET last_used = ? WHERE key = ?",
+                                      [(t, key) for key, t in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at 90% of its limit."""
+        self._flush_touched()
+        target = self.max_bytes * 0.9
+        doomed = []
+        for key, nbytes in self.conn.execute("SELECT key, nbytes FROM results ORDER BY last_used"):
+            if self._total <= target:
+                break
+            doomed.append((key,))
+            self._total -= nbytes
+        self.conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+    # ── high level ─────────────────────────────────────────────────────────────
+
+    def predict(self, model, paths, conf=0.25, batch_size=BATCH_SIZE) -> list[Detections]:
+        """
+        Detections with a score of at least conf for each image path.
+
+        Cached images are a lookup; the others go through the model in batches and
+        are stored with all their boxes.
+        """
+        paths = [str(p) for p in paths]
+        keys = [self.image_key(p) for p in paths]
+        found = [self.get(k) for k in keys]
+
+        missing = [i for i, det in enumerate(found) if det is None]
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            results = model.predict(source=[paths[i] for i in chunk], **self.predict_kwargs())
+            for i, result in zip(chunk, results):
+                found[i] = Detections.from_result(result)
+                self.put(keys[i], found[i])
+
+        return [det.above(conf) for det in found]
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results").fetchone()
+        return {"entries": n, "mb": total / 1024 / 1024, "max_mb": self.max_bytes / 1024 / 1024,
+                "hits": self.hits, "misses": self.misses}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show or clear the YOLO inference result cache",
+        epilog="Example: python inference_cache.py --clear")
+    parser.add_argument("--cache", default=INFERENCE_CACHE_PATH,
+                        help=f"Cache file (default: {INFERENCE_CACHE_PATH})")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached results")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.cache):
+        print(f"No cache at {args.cache}")
+        sys.exit(0)
+
+    conn = sqlite3.connect(args.cache)
+    try:
+        if args.clear:
+            with conn:
+                conn.execute("DELETE FROM results")
+                conn.execute("DELETE FROM file_hashes")
+            conn.execute("VACUUM")
+            print(f"Cleared {args.cache}")
+            return
+        n, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results").fetchone()
+        n_models = conn.execute(
+            "SELECT COUNT(DISTINCT substr(key, 1, instr(key, ':') - 1)) FROM results").fetchone()[0]
+        print(f"Cache: {args.cache}")
+        print(f"  {n} results for {n_models} model/parameter combinations, {total / 1024 / 1024:.1f} MB")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
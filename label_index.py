@@ -0,0 +1,264 @@
+"""
+YOLO Label Index
+
+Persistent SQLite index over YOLO label folders. For every label file it stores
+the class histogram, box count and box-area statistics, keyed by path, mtime
+and size. A refresh only re-parses files that changed since the last run, so
+queries like "which files contain class 3" no longer need to read the dataset.
+
+The index file lives in the dataset root (LABEL_INDEX_NAME) and can hold any
+number of label folders (e.g. train/labels, valid/labels, test/labels). Scripts
+that only know a labels folder find that root with dataset_root(), so all tools
+share one index per dataset.
+
+Usage:
+    python label_index.py <dataset_folder> [--classes 0 3]
+
+    from label_index import dataset_root, open_index
+    with open_index(dataset_root(labels_dir)) as index:
+        index.refresh(labels_dir)
+        paths = index.files_with_classes(labels_dir, [3])
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+
+import numpy as np  # pip install numpy
+
+from yolo_labels import parse_label_text
+
+# Name of the index file inside the dataset folder
+LABEL_INDEX_NAME = ".label_index.sqlite"
+
+# Split folders between the dataset root and a labels folder (<root>/<split>/labels)
+SPLIT_NAMES = ("train", "valid", "val", "test")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS label_files (
+    path        TEXT PRIMARY KEY,
+    dir         TEXT NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    has_content INTEGER NOT NULL,
+    n_boxes     INTEGER NOT NULL,
+    n_bad       INTEGER NOT NULL,
+    area_min    REAL,
+    area_max    REAL,
+    area_sum    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_label_files_dir ON label_files(dir);
+
+CREATE TABLE IF NOT EXISTS label_classes (
+    path     TEXT NOT NULL,
+    class_id INTEGER NOT NULL,
+    count    INTEGER NOT NULL,
+    PRIMARY KEY (path, class_id)
+);
+CREATE INDEX IF NOT EXISTS idx_label_classes_class ON label_classes(class_id);
+"""
+
+
+def index_key(path) -> str:
+    """Normalised absolute path as stored in the index (files and folders)."""
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def summarize_label_text(text: str) -> dict:
+    """Parse label text and return the per-file summary stored in the index."""
+    labels = parse_label_text(text)
+    areas = labels.boxes[:, 2] * labels.boxes[:, 3]
+    classes, counts = np.unique(labels.class_ids, return_counts=True)
+    return {
+        "has_content": bool(text.strip()),
+        "n_boxes": len(labels),
+        "n_bad": labels.n_bad,
+        "area_min": float(areas.min()) if len(areas) else None,
+        "area_max": float(areas.max()) if len(areas) else None,
+        "area_sum": float(areas.sum()),
+        "class_hist": dict(zip(classes.tolist(), counts.tolist())),
+    }
+
+
+class LabelIndex:
+    """SQLite-backed label index. Use open_index() to create one for a dataset folder."""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # ── refresh ────────────────────────────────────────────────────────────────
+
+    def refresh(self, labels_dir) -> tuple[int, int]:
+        """
+        Bring the index up to date with a label folder.
+
+        Only files whose mtime or size changed are re-parsed; rows of files that
+        no longer exist are removed. Returns (parsed, removed).
+        """
+        labels_dir = index_key(labels_dir)
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in self.conn.execute(
+                "SELECT path, mtime_ns, size FROM label_files WHERE dir = ?", (labels_dir,))
+        }
+
+        changed = []
+        seen = set()
+        if os.path.isdir(labels_dir):
+            with os.scandir(labels_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".txt") or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    path = os.path.normcase(entry.path)
+                    seen.add(path)
+                    if known.get(path) != (st.st_mtime_ns, st.st_size):
+                        changed.append((path, st.st_mtime_ns, st.st_size))
+
+        removed = [path for path in known if path not in seen]
+
+        with self.conn:
+            for path in removed:
+                self._delete(path)
+            for path, mtime_ns, size in changed:
+                try:
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        summary = summarize_label_text(f.read())
+                except OSError as e:
+                    print(f"Error reading {path}: {e}")
+                    continue
+                self._delete(path)
+                self.conn.execute(
+                    "INSERT INTO label_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, labels_dir, mtime_ns, size, summary["has_content"],
+                     summary["n_boxes"], summary["n_bad"], summary["area_min"],
+                     summary["area_max"], summary["area_sum"]))
+                self.conn.executemany(
+                    "INSERT INTO label_classes VALUES (?, ?, ?)",
+                    [(path, cls, n) for cls, n in summary["class_hist"].items()])
+
+        return len(changed), len(removed)
+
+    def _delete(self, path):
+        self.conn.execute("DELETE FROM label_files WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM label_classes WHERE path = ?", (path,))
+
+    # ── queries ────────────────────────────────────────────────────────────────
+
+    def files_with_classes(self, labels_dir, class_ids) -> set[str]:
+        """Return the paths in labels_dir that contain at least one of class_ids."""
+        class_ids = [int(c) for c in class_ids]
+        if not class_ids:
+            return set()
+        marks = ",".join("?" * len(class_ids))
+        rows = self.conn.execute(
+            f"SELECT DISTINCT c.path FROM label_classes c "
+            f"JOIN label_files f ON f.path = c.path "
+            f"WHERE f.dir = ? AND c.class_id IN ({marks})",
+            (index_key(labels_dir), *class_ids))
+        return {path for (path,) in rows}
+
+    def files_with_content(self, labels_dir) -> set[str]:
+        """Return the paths in labels_dir that are not empty/whitespace-only."""
+        rows = self.conn.execute(
+            "SELECT path FROM label_files WHERE dir = ? AND has_content = 1",
+            (index_key(labels_dir),))
+        return {path for (path,) in rows}
+
+    def class_histogram(self, labels_dir=None) -> dict[int, int]:
+        """Total object count per class, for one label folder or the whole index."""
+        if labels_dir is None:
+            rows = self.conn.execute(
+                "SELECT class_id, SUM(count) FROM label_classes GROUP BY class_id")
+        else:
+            rows = self.conn.execute(
+                "SELECT c.class_id, SUM(c.count) FROM label_classes c "
+                "JOIN label_files f ON f.path = c.path WHERE f.dir = ? "
+                "GROUP BY c.class_id", (index_key(labels_dir),))
+        return dict(sorted(rows))
+
+    def max_class_id(self, labels_dir=None) -> int | None:
+        hist = self.class_histogram(labels_dir)
+        return max(hist) if hist else None
+
+    def file_stats(self, label_path) -> dict | None:
+        """Stored summary of a single label file, or None if it is not indexed."""
+        path = index_key(label_path)
+        row = self.conn.execute(
+            "SELECT has_content, n_boxes, n_bad, area_min, area_max, area_sum "
+            "FROM label_files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        has_content, n_boxes, n_bad, area_min, area_max, area_sum = row
+        classes = self.conn.execute(
+            "SELECT class_id, count FROM label_classes WHERE path = ?", (path,))
+        return {
+            "has_content": bool(has_content),
+            "n_boxes": n_boxes,
+            "n_bad": n_bad,
+            "area_min": area_min,
+            "area_max": area_max,
+            "area_mean": area_sum / n_boxes if n_boxes else None,
+            "class_hist": dict(classes),
+        }
+
+
+def dataset_root(labels_dir) -> str:
+    """
+    Dataset root (where the label index lives) of a labels folder.
+
+    <root>/<split>/labels -> <root> for the SPLIT_NAMES, or any split folder once the
+    root holds an index; otherwise the labels folder's parent (<root>/labels -> <root>).
+    """
+    parent = os.path.dirname(os.path.abspath(str(labels_dir)))
+    grandparent = os.path.dirname(parent)
+    if os.path.basename(parent).lower() in SPLIT_NAMES \
+            or os.path.isfile(os.path.join(grandparent, LABEL_INDEX_NAME)):
+        return grandparent
+    return parent
+
+
+def open_index(dataset_folder) -> LabelIndex:
+    """Open (or create) the label index stored in a dataset root (see dataset_root())."""
+    return LabelIndex(os.path.join(str(dataset_folder), LABEL_INDEX_NAME))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build/refresh the label index of a YOLO dataset and print a class summary")
+    parser.add_argument("dataset_folder", help="Dataset root (index is stored here)")
+    parser.add_argument("--subdirs", nargs="+", default=["train", "test", "valid"],
+                        help="Subdirectories with a labels/ folder (default: train test valid)")
+    parser.add_argument("--classes", type=int, nargs="+",
+                        help="Also list how many files contain these class ids")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dataset_folder):
+        print(f"Error: Dataset folder does not exist: {args.dataset_folder}")
+        sys.exit(1)
+
+    with open_index(args.dataset_folder) as index:
+        for subdir in args.subdirs:
+            labels_dir = os.path.join(args.dataset_folder, subdir, "labels")
+            parsed, removed = index.refresh(labels_dir)
+            print(f"{subdir:6s}: {parsed} parsed, {removed} removed")
+            print(f"        classes: {index.class_histogram(labels_dir)}")
+            if args.classes:
+                n = len(index.files_with_classes(labels_dir, args.classes))
+                print(f"        files with classes {args.classes}: {n}")
+
+
+if __name__ == "__main__":
+    main()
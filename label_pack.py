@@ -0,0 +1,253 @@
+"""
+YOLO Label Pack
+
+Packs a complete YOLO labels folder into one memory-mapped columnar file, so
+whole-dataset scans need no per-file open(). On network shares and Windows
+disks opening hundreds of thousands of tiny files costs more than parsing them.
+
+File layout (<labels_folder>.labelpack, next to the labels folder):
+    magic "YOLOPACK" | uint32 version | uint64 header length | JSON header | arrays
+
+    JSON header : file table (names, mtime_ns, size) + array table (dtype, shape, offset)
+    arrays      : file_rows     int64   (F + 1,)  rows of file i: file_rows[i]:file_rows[i + 1]
+                  file_n_bad    int32   (F,)      unparsable lines per file
+                  file_content  uint8   (F,)      1 if the file is not empty/whitespace-only
+                  class_ids     int16   (N,)
+                  boxes         float32 (N, 4)
+                  poly_offsets  int64   (N + 1,)  global offsets into poly_coords
+                  poly_coords   float32 (M,)
+
+Re-packing is incremental: rows of files whose mtime and size did not change
+are copied from the previous pack, only new/changed files are parsed. The new
+pack is written to a temp file and swapped in atomically.
+
+Usage:
+    python label_pack.py <labels_folder> [<labels_folder> ...]
+
+    from label_pack import update_pack
+    pack = update_pack(labels_dir)
+    for name in pack.files_with_classes([0, 3]): ...
+"""
+
+import os
+import sys
+import json
+import struct
+import argparse
+
+import numpy as np  # pip install numpy
+
+from yolo_labels import LabelArrays, parse_label_text
+
+PACK_SUFFIX = ".labelpack"
+PACK_MAGIC = b"YOLOPACK"
+PACK_VERSION = 2  # bump when parse_label_text changes, so old packs are rebuilt
+ALIGNMENT = 64
+
+ARRAY_NAMES = ["file_rows", "file_n_bad", "file_content",
+               "class_ids", "boxes", "poly_offsets", "poly_coords"]
+
+
+def default_pack_path(labels_dir) -> str:
+    """Pack file next to the labels folder, e.g. train/labels -> train/labels.labelpack"""
+    return os.path.abspath(str(labels_dir)).rstrip("\\/") + PACK_SUFFIX
+
+
+class LabelPack:
+    """Read-only, memory-mapped view of a .labelpack file."""
+
+    def __init__(self, pack_path):
+        self.pack_path = str(pack_path)
+        raw = np.memmap(self.pack_path, dtype=np.uint8, mode="r")
+        if raw[:len(PACK_MAGIC)].tobytes() != PACK_MAGIC:
+            raise ValueError(f"Not a label pack: {self.pack_path}")
+        version, header_len = struct.unpack_from("<IQ", raw, len(PACK_MAGIC))
+        if version != PACK_VERSION:
+            raise ValueError(f"Unsupported label pack version {version}: {self.pack_path}")
+        header_start = len(PACK_MAGIC) + 12
+        header = json.loads(raw[header_start:header_start + header_len].tobytes())
+
+        self.names = header["names"]
+        self.mtime_ns = header["mtime_ns"]
+        self.sizes = header["sizes"]
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            count = int(np.prod(shape))
+            arr = raw[offset:offset + count * np.dtype(dtype).itemsize].view(dtype)
+            setattr(self, name, arr.reshape(shape))
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def index_of(self, name: str) -> int | None:
+        if self._positions is None:
+            self._positions = {n: i for i, n in enumerate(self.names)}
+        return self._positions.get(name)
+
+    def labels(self, i: int) -> LabelArrays:
+        """LabelArrays of the i-th file in the file table (views into the pack)."""
+        r0, r1 = int(self.file_rows[i]), int(self.file_rows[i + 1])
+        p0, p1 = int(self.poly_offsets[r0]), int(self.poly_offsets[r1])
+        return LabelArrays(
+            class_ids=self.class_ids[r0:r1],
+            boxes=self.boxes[r0:r1],
+            poly_coords=self.poly_coords[p0:p1],
+            poly_offsets=self.poly_offsets[r0:r1 + 1] - p0,
+            n_bad=int(self.file_n_bad[i]),
+        )
+
+    def row_file_index(self) -> np.ndarray:
+        """File index of every row, for vectorized per-file reductions."""
+        return np.repeat(np.arange(len(self.names)), np.diff(self.file_rows))
+
+    def files_with_classes(self, class_ids) -> list[str]:
+        """Names of the files that contain at least one of class_ids."""
+        hit = np.isin(self.class_ids, np.asarray(class_ids, dtype=np.int16))
+        files = np.unique(self.row_file_index()[hit])
+        return [self.names[i] for i in files.tolist()]
+
+    def files_with_content(self) -> list[str]:
+        """Names of the files that are not empty/whitespace-only."""
+        return [self.names[i] for i in np.flatnonzero(self.file_content).tolist()]
+
+    def max_class_id(self) -> int | None:
+        return int(self.class_ids.max()) if len(self.class_ids) else None
+
+
+def _scan_label_files(labels_dir) -> list[tuple[str, int, int]]:
+    """(name, mtime_ns, size) of every .txt file in labels_dir, sorted by name."""
+    files = []
+    with os.scandir(labels_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".txt") and entry.is_file():
+                st = entry.stat()
+                files.append((entry.name, st.st_mtime_ns, st.st_size))
+    files.sort()
+    return files
+
+
+def write_pack(pack_path, names, mtime_ns, sizes, arrays: dict) -> None:
+    """Write a pack file atomically (temp file + os.replace)."""
+    descriptors = {}
+    offset = 0
+    for name in ARRAY_NAMES:
+        arr = np.ascontiguousarray(arrays[name])
+        descriptors[name] = [arr.dtype.str, list(arr.shape), offset]
+        offset += -(-arr.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = {"names": names, "mtime_ns": mtime_ns, "sizes": sizes, "arrays": descriptors}
+    # Array offsets are relative to the data start; fix them up once the header size is known
+    prefix_len = len(PACK_MAGIC) + 12
+    header_bytes = json.dumps(header).encode("utf-8")
+    slack = 24 * len(ARRAY_NAMES)  # room for the offsets growing by a few digits
+    data_start = -(-(prefix_len + len(header_bytes) + slack) // ALIGNMENT) * ALIGNMENT
+    for desc in descriptors.values():
+        desc[2] += data_start
+    header_bytes = json.dumps(header).encode("utf-8")
+    assert prefix_len + len(header_bytes) <= data_start
+
+    tmp_path = str(pack_path) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(struct.pack("<IQ", PACK_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name in ARRAY_NAMES:
+            arr = np.ascontiguousarray(arrays[name])
+            f.seek(descriptors[name][2])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, pack_path)
+
+
+def _global_poly_offsets(parts: list[LabelArrays]) -> np.ndarray:
+    """Rebase each file's local polygon offsets onto the global coordinate buffer."""
+    # In a helper so no loop variable outlives it holding a view into the old memory map
+    poly_offsets = [np.zeros(1, dtype=np.int64)]
+    coord_base = 0
+    for labels in parts:
+        poly_offsets.append(labels.poly_offsets[1:] + coord_base)
+        coord_base += int(labels.poly_offsets[-1])
+    return np.concatenate(poly_offsets)
+
+
+def pack_labels_dir(labels_dir, pack_path=None) -> tuple[int, int]:
+    """
+    (Re-)pack a labels folder. Unchanged files are taken from the existing pack.
+
+    Returns (parsed, reused).
+    """
+    pack_path = pack_path or default_pack_path(labels_dir)
+    files = _scan_label_files(labels_dir)
+
+    old = None
+    if os.path.exists(pack_path):
+        try:
+            old = LabelPack(pack_path)
+        except (ValueError, OSError) as e:
+            print(f"  Existing pack ignored ({e})")
+
+    parts = []  # LabelArrays + has_content per file, in file-table order
+    parsed = reused = 0
+    for name, mtime_ns, size in files:
+        i = old.index_of(name) if old is not None else None
+        if i is not None and old.mtime_ns[i] == mtime_ns and old.sizes[i] == size:
+            parts.append((old.labels(i), bool(old.file_content[i])))
+            reused += 1
+            continue
+        try:
+            with open(os.path.join(labels_dir, name), "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError as e:
+            print(f"  Error reading {name}: {e}")
+            text = ""
+        parts.append((parse_label_text(text), bool(text.strip())))
+        parsed += 1
+
+    rows_per_file = [len(labels) for labels, _ in parts]
+    file_rows = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum(rows_per_file, out=file_rows[1:])
+
+    poly_offsets = _global_poly_offsets([labels for labels, _ in parts])
+    arrays = {
+        "file_rows": file_rows,
+        "file_n_bad": np.array([labels.n_bad for labels, _ in parts], dtype=np.int32),
+        "file_content": np.array([c for _, c in parts], dtype=np.uint8),
+        "class_ids": np.concatenate([np.zeros(0, np.int16)] + [l.class_ids for l, _ in parts]),
+        "boxes": np.concatenate([np.zeros((0, 4), np.float32)] + [l.boxes for l, _ in parts]),
+        "poly_offsets": poly_offsets,
+        "poly_coords": np.concatenate([np.zeros(0, np.float32)] + [l.poly_coords for l, _ in parts]),
+    }
+    names = [name for name, _, _ in files]
+    mtimes = [m for _, m, _ in files]
+    sizes = [s for _, _, s in files]
+
+    parts.clear()  # drop the views into the old pack, then the pack itself,
+    del old        # so the memory map is released before the file is replaced (Windows)
+    write_pack(pack_path, names, mtimes, sizes, arrays)
+    return parsed, reused
+
+
+def update_pack(labels_dir, pack_path=None) -> LabelPack:
+    """Incrementally re-pack a labels folder and open the result."""
+    pack_path = pack_path or default_pack_path(labels_dir)
+    parsed, reused = pack_labels_dir(labels_dir, pack_path)
+    print(f"  Label pack {os.path.basename(pack_path)}: {parsed} parsed, {reused} reused")
+    return LabelPack(pack_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pack YOLO label folders into memory-mapped .labelpack files")
+    parser.add_argument("labels_folders", nargs="+", help="Folder(s) with YOLO .txt labels")
+    args = parser.parse_args()
+
+    for labels_dir in args.labels_folders:
+        if not os.path.isdir(labels_dir):
+            print(f"Error: Labels folder does not exist: {labels_dir}")
+            sys.exit(1)
+        pack = update_pack(labels_dir)
+        print(f"  {len(pack)} files, {len(pack.class_ids)} objects -> {pack.pack_path}")
+
+
+if __name__ == "__main__":
+    main()
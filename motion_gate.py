@@ -0,0 +1,109 @@
+"""
+Motion Gate
+
+Cheap pre-filter for static cameras: decides per frame whether the detector needs to
+run. The frame is downscaled to GATE_WIDTH pixels wide, converted to grayscale and
+blurred, then compared with a running-average background (cv2.accumulateWeighted).
+The model runs when more than MIN_CHANGED_FRACTION of the pixels differ by more than
+PIXEL_THRESHOLD grey levels, or when HEARTBEAT seconds have passed since the last
+inference (so slow changes and animals lying still are still checked regularly).
+
+The gate costs well under a millisecond per frame, against tens to hundreds of
+milliseconds for a YOLO model on a CPU.
+
+Usage:
+    from motion_gate import MotionGate
+    gate = MotionGate()
+    if gate.check(frame):
+        results = model.predict(frame)
+    print(gate.summary())
+"""
+
+import time
+
+import cv2
+import numpy as np  # pip install numpy
+
+GATE_WIDTH = 160              # width of the downscaled comparison frame
+BLUR_KERNEL = 5               # Gaussian blur against sensor noise / compression artefacts
+BACKGROUND_ALPHA = 0.05       # background learning rate per frame (higher = adapts faster)
+PIXEL_THRESHOLD = 25          # grey-level difference that counts as a changed pixel
+MIN_CHANGED_FRACTION = 0.005  # share of changed pixels that triggers the model (0.5%)
+HEARTBEAT = 30                # seconds; run the model at least this often (0 = never forced)
+
+
+class MotionGate:
+    """Running-background motion detector with a heartbeat; one instance per camera."""
+
+    def __init__(self, width=GATE_WIDTH, pixel_threshold=PIXEL_THRESHOLD,
+                 min_changed_fraction=MIN_CHANGED_FRACTION, alpha=BACKGROUND_ALPHA,
+                 heartbeat=HEARTBEAT):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.alpha = alpha
+        self.heartbeat = heartbeat
+        self._background = None
+        self._last_pass = 0.0
+
+        self.frames = 0
+        self.motion = 0
+        self.heartbeats = 0
+        self.last_changed_fraction = 0.0
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        height = max(1, round(h * self.width / w))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (BLUR_KERNEL, BLUR_KERNEL), 0)
+
+    def check(self, frame, now=None) -> bool:
+        """True when the model should run on this frame."""
+        now = time.monotonic() if now is None else now
+        gray = self._small_gray(frame)
+        self.frames += 1
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._last_pass = now
+            self.motion += 1  # first frame: nothing to compare with yet
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+        self.last_changed_fraction = changed / diff.size
+        cv2.accumulateWeighted(gray, self._background, self.alpha)
+
+        if self.last_changed_fraction >= self.min_changed_fraction:
+            self.motion += 1
+        elif self.heartbeat and now - self._last_pass >= self.heartbeat:
+            self.heartbeats += 1
+        else:
+            return False
+        self._last_pass = now
+        return True
+
+    @property
+    def passed(self) -> int:
+        return self.motion + self.heartbeats
+
+    @property
+    def skipped(self) -> int:
+        return self.frames - self.passed
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "motion": self.motion,
+            "heartbeats": self.heartbeats,
+            "skipped": self.skipped,
+            "hit_rate": round(self.passed / self.frames, 4) if self.frames else 0.0,
+            "saved": round(self.skipped / self.frames, 4) if self.frames else 0.0,
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"gate: {s['frames']} frames, {s['motion']} motion + {s['heartbeats']} heartbeat "
+                f"-> model on {s['hit_rate']:.1%}, {s['skipped']} inferences saved ({s['saved']:.1%})")
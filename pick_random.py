@@ -1,34 +1,219 @@
 import os
+import math
 import random
-import shutil
+
+from file_transfer import transfer_files
+from yolo_labels import read_label_file
 
 # === Settings ===
 NUM_IMAGES = 5  # How many images do you want to copy?
 SOURCE_FOLDER = r"C:\path\to\source"
 DEST_FOLDER = r"C:\path\to\destination"
 
+RECURSIVE = True   # Also pick from subfolders of SOURCE_FOLDER
+SEED = None        # Set to a number (e.g. 42) to pick the same images on every run
+
+# Copy the YOLO label (.txt) with every image. Images go to DEST_FOLDER/images and
+# labels to DEST_FOLDER/labels. Labels are looked up in LABELS_FOLDER when set,
+# otherwise in the matching "labels" folder of an "images" folder, or next to the image.
+COPY_LABELS = True
+LABELS_FOLDER = None
+
+# Stratified sampling: pick images per class (from the YOLO labels) in turns,
+# rarest class first, so rare classes are guaranteed to appear in the subset.
+# Images without objects form their own group when INCLUDE_BACKGROUND is True.
+STRATIFY_BY_CLASS = False
+INCLUDE_BACKGROUND = True
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')
+
+
 # === Script ===
-def copy_random_images(source, destination, num):
-    # Create destination folder if it doesn't exist
-    os.makedirs(destination, exist_ok=True)
+def iter_images(folder, recursive=True):
+    """Yield image paths with os.scandir (streaming, no full listing in memory)."""
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                        yield entry.path
+        except OSError as e:
+            print(f"Error reading folder {current}: {e}")
+
+
+class Reservoir:
+    """
+    Uniform random sample of k items from a stream of unknown length (Algorithm L).
+
+    Memory is O(k); after the reservoir is full only ~k*log(n/k) random numbers
+    are drawn instead of one per item.
+    """
+
+    def __init__(self, k, rng):
+        self.k = k
+        self.rng = rng
+        self.items = []
+        self.seen = 0
+        self._w = 1.0
+        self._next = 0
+
+    def _advance(self):
+        self._w *= math.exp(math.log(self.rng.random()) / self.k)
+        self._next += int(math.log(self.rng.random()) / math.log(1 - self._w)) + 1
+
+    def add(self, item):
+        if self.k <= 0:
+            return
+        if len(self.items) < self.k:
+            self.items.append(item)
+            if len(self.items) == self.k:
+                self._next = self.seen
+                self._advance()
+        elif self.seen == self._next:
+            self.items[self.rng.randrange(self.k)] = item
+            self._advance()
+        self.seen += 1
+
+
+def find_label(image_path, labels_folder=None):
+    """Path of the YOLO label of an image, or None."""
+    folder, name = os.path.split(image_path)
+    label_name = os.path.splitext(name)[0] + '.txt'
+    candidates = []
+    if labels_folder:
+        candidates.append(os.path.join(labels_folder, label_name))
+    parent, last = os.path.split(folder)
+    if last.lower() == 'images':
+        candidates.append(os.path.join(parent, 'labels', label_name))
+    candidates.append(os.path.join(folder, label_name))
+    return next((c for c in candidates if os.path.isfile(c)), None)
 
-    # Filter only image files
-    extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')
-    images = [f for f in os.listdir(source) if f.lower().endswith(extensions)]
 
-    if not images:
+def image_classes(image_path, labels_folder=None):
+    """Set of class ids in the image's label (empty for background images or missing labels)."""
+    label = find_label(image_path, labels_folder)
+    if label is None:
+        return set()
+    try:
+        return set(read_label_file(label).class_ids.tolist())
+    except OSError as e:
+        print(f"Error reading {label}: {e}")
+        return set()
+
+
+def sample_uniform(images, num, rng):
+    reservoir = Reservoir(num, rng)
+    for path in images:
+        reservoir.add(path)
+    return reservoir.items, reservoir.seen
+
+
+def sample_stratified(images, num, rng, labels_folder=None, include_background=True):
+    """
+    One reservoir per class (O(num * classes) memory), then take images from the
+    classes in turns, the class with the fewest images first.
+    """
+    reservoirs = {}
+    seen = 0
+    for path in images:
+        seen += 1
+        classes = image_classes(path, labels_folder)
+        if not classes:
+            if not include_background:
+                continue
+            classes = {None}  # background group
+        for cls in classes:
+            reservoir = reservoirs.get(cls)
+            if reservoir is None:
+                reservoir = reservoirs[cls] = Reservoir(num, rng)
+            reservoir.add(path)
+
+    order = sorted(reservoirs, key=lambda c: (reservoirs[c].seen, -1 if c is None else c))
+    pools = {c: list(reservoirs[c].items) for c in order}
+    for pool in pools.values():
+        rng.shuffle(pool)
+
+    chosen, chosen_set = [], set()
+    per_class = {c: 0 for c in order}
+    while len(chosen) < num and any(pools.values()):
+        for cls in order:
+            pool = pools[cls]
+            while pool and pool[-1] in chosen_set:
+                pool.pop()
+            if pool and len(chosen) < num:
+                path = pool.pop()
+                chosen.append(path)
+                chosen_set.add(path)
+                per_class[cls] += 1
+
+    for cls in order:
+        name = "background" if cls is None else f"class {cls}"
+        print(f"  {name}: {reservoirs[cls].seen} images, {per_class[cls]} picked")
+    return chosen, seen
+
+
+def unique_name(path, used):
+    """File name in the flat destination folder; prefix the parent folder on a collision."""
+    name = os.path.basename(path)
+    if name.lower() in used:
+        parent = os.path.basename(os.path.dirname(path))
+        stem, ext = os.path.splitext(name)
+        name = f"{parent}_{stem}{ext}"
+        counter = 1
+        while name.lower() in used:
+            name = f"{parent}_{stem}_{counter}{ext}"
+            counter += 1
+    used.add(name.lower())
+    return name
+
+
+def copy_random_images(source, destination, num, recursive=RECURSIVE, seed=SEED,
+                       copy_labels=COPY_LABELS, labels_folder=LABELS_FOLDER,
+                       stratify=STRATIFY_BY_CLASS, include_background=INCLUDE_BACKGROUND):
+    rng = random.Random(seed)
+    images = iter_images(source, recursive)
+
+    # Pick a random subset while streaming over the folder
+    if stratify:
+        chosen, seen = sample_stratified(images, num, rng, labels_folder, include_background)
+    else:
+        chosen, seen = sample_uniform(images, num, rng)
+
+    if not chosen:
         print("No images found in the source folder.")
         return
+    print(f"Scanned {seen} images, picked {len(chosen)}")
+
+    # Copy files (concurrently)
+    image_dest = os.path.join(destination, 'images') if copy_labels else destination
+    label_dest = os.path.join(destination, 'labels')
+    os.makedirs(image_dest, exist_ok=True)
 
-    # Pick a random subset
-    num = min(num, len(images))
-    chosen = random.sample(images, num)
+    jobs, image_dsts, used, n_missing = [], set(), set(), 0
+    for path in sorted(chosen):
+        name = unique_name(path, used)
+        jobs.append((path, os.path.join(image_dest, name)))
+        image_dsts.add(jobs[-1][1])
+        if copy_labels:
+            label = find_label(path, labels_folder)
+            if label is None:
+                n_missing += 1
+                continue
+            jobs.append((label, os.path.join(label_dest, os.path.splitext(name)[0] + '.txt')))
 
-    # Copy files
-    for name in chosen:
-        shutil.copy(os.path.join(source, name), os.path.join(destination, name))
+    report = transfer_files(jobs)
+    for src, dst, error in report.failures:
+        print(f"Error copying {os.path.basename(src)}: {error}")
 
-    print(f"{num} images copied to {destination}")
+    n_images = len(image_dsts & report.done)
+    print(f"{n_images} images copied to {image_dest}")
+    if copy_labels:
+        print(f"{report.n_done - n_images} labels copied to {label_dest} ({n_missing} images without label)")
 
 if __name__ == "__main__":
     copy_random_images(SOURCE_FOLDER, DEST_FOLDER, NUM_IMAGES)
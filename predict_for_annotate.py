@@ -1,12 +1,20 @@
-from ultralytics import YOLO
 import os
 from pathlib import Path
 import cv2
 import shutil
 import glob
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from cpu_inference import load_model
+from inference_cache import InferenceCache, Detections
 
 # Load trained model
-model = YOLO("your_model.pt")  # Replace with your model file
+model_path = "your_model.pt"  # Replace with your model file
+backend = "pytorch"  # "pytorch", or "onnxruntime" / "openvino" on PCs without a GPU (see cpu_inference.py)
+model = load_model(model_path, backend)
 
 # Set parameters
 source_folder = Path(r"path/to/input/folder")  # Replace with your input folder
@@ -16,48 +24,141 @@ conf_threshold = 0.75  # Adjust confidence threshold as needed
 output_folder = Path(r"path/to/output/folder")  # Replace with your output folder
 output_folder.mkdir(parents=True, exist_ok=True)
 
+# Batching / prefetching
+batch_size = 16        # Images per model.predict call (lower this if the GPU runs out of memory)
+decode_threads = 4     # Threads that read and decode images ahead of the model
+prefetch_batches = 2   # How many batches are decoded ahead (limits memory use)
+move_files = False     # True: move images to the output folder instead of copying
+
+# Cache all detections per image (see inference_cache.py): a re-run over the same
+# images, even with another conf_threshold, only looks up the stored boxes
+use_cache = False
+cache = InferenceCache(model_path, backend=backend) if use_cache else None
+
 # Get all image files
 image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.bmp']
-image_files = []
+image_files = set()
 for ext in image_extensions:
-    image_files.extend(source_folder.glob(ext))
-    image_files.extend(source_folder.glob(ext.upper()))
+    # set: on Windows the upper-case glob matches the same files again
+    image_files.update(source_folder.glob(ext))
+    image_files.update(source_folder.glob(ext.upper()))
+image_files = sorted(image_files)
 
 print(f"Found {len(image_files)} images to process\n")
 
-# Process images one by one
-saved_count = 0
-skipped_count = 0
-
-for img_path in image_files:
-    # Run prediction on single image
-    results = model.predict(
-        source=str(img_path),
-        show=False,
-        save=False,
-        conf=conf_threshold,
-        verbose=False
-    )
-    
-    result = results[0]
-    
-    # Check if there are any detections
-    if len(result.boxes) > 0:
-        # Copy image to output folder (change to shutil.move() to move instead)
-        destination_path = output_folder / img_path.name
-        
-        if img_path.exists():
-            shutil.copy2(str(img_path), str(destination_path))  # Use shutil.move() to move files
-            saved_count += 1
-            print(f"Copied: {img_path.name} - {len(result.boxes)} detections")
+
+def load_image(img_path):
+    """
+    Read and decode one image (runs on the decode threads; cv2 releases the GIL).
+
+    Returns (path, cache key, cached detections, image); cached images are not decoded.
+    """
+    key = None
+    if cache is not None:
+        try:
+            key = cache.image_key(img_path)
+        except OSError:
+            return img_path, None, None, None
+        detections = cache.get(key)
+        if detections is not None:
+            return img_path, key, detections, None
+    return img_path, key, None, cv2.imread(str(img_path))
+
+
+def prefetch_batches_of(paths, pool):
+    """Yield batches of (path, image) while the next batches are already being decoded."""
+    window = deque()
+    paths = iter(paths)
+    for path in paths:
+        window.append(pool.submit(load_image, path))
+        if len(window) >= batch_size * (prefetch_batches + 1):
+            break
+    while window:
+        batch = []
+        while window and len(batch) < batch_size:
+            batch.append(window.popleft().result())
+            next_path = next(paths, None)
+            if next_path is not None:
+                window.append(pool.submit(load_image, next_path))
+        yield batch
+
+
+def writer(jobs, counts):
+    """Copy/move images with detections and print the per-image log lines, in order."""
+    transfer = shutil.move if move_files else shutil.copy2
+    action = "Moved" if move_files else "Copied"
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        img_path, n_boxes = job
+        if n_boxes is None:
+            counts["skipped"] += 1
+            print(f"Warning: {img_path.name} could not be read")
+        elif n_boxes > 0:
+            destination_path = output_folder / img_path.name
+            if img_path.exists():
+                try:
+                    transfer(str(img_path), str(destination_path))
+                    counts["saved"] += 1
+                    print(f"{action}: {img_path.name} - {n_boxes} detections")
+                except OSError as e:
+                    print(f"Error: {img_path.name} - {e}")
+            else:
+                print(f"Warning: {img_path.name} doesn't exist")
         else:
-            print(f"Warning: {img_path.name} doesn't exist")
-    else:
-        skipped_count += 1
-        print(f"Skipped: {img_path.name} - No detections above conf={conf_threshold}")
+            counts["skipped"] += 1
+            print(f"Skipped: {img_path.name} - No detections above conf={conf_threshold}")
+
+
+# Process images in batches: decode threads -> model -> writer thread
+counts = {"saved": 0, "skipped": 0}
+jobs = queue.Queue(maxsize=batch_size * 4)
+writer_thread = threading.Thread(target=writer, args=(jobs, counts), daemon=True)
+writer_thread.start()
+
+try:
+    with ThreadPoolExecutor(max_workers=decode_threads) as pool:
+        for batch in prefetch_batches_of(image_files, pool):
+            n_boxes = {path: len(det.above(conf_threshold))
+                       for path, _, det, _ in batch if det is not None}
+            to_predict = [(path, key, img) for path, key, det, img in batch
+                          if det is None and img is not None]
+
+            # Run prediction on the whole batch in one call
+            if to_predict:
+                if cache is not None:
+                    # No conf cutoff, so every box can be stored
+                    results = model.predict(source=[img for _, _, img in to_predict], **cache.predict_kwargs())
+                else:
+                    results = model.predict(
+                        source=[img for _, _, img in to_predict],
+                        show=False,
+                        save=False,
+                        conf=conf_threshold,
+                        verbose=False
+                    )
+                for (path, key, _), result in zip(to_predict, results):
+                    if cache is not None:
+                        detections = Detections.from_result(result)
+                        cache.put(key, detections)
+                        n_boxes[path] = len(detections.above(conf_threshold))
+                    else:
+                        n_boxes[path] = len(Detections.from_result(result))
+
+            for path, _, _, _ in batch:
+                jobs.put((path, n_boxes.get(path)))
+finally:
+    jobs.put(None)
+    writer_thread.join()
+    if cache is not None:
+        stats = cache.stats()
+        cache.close()
 
 print(f"\n{'='*60}")
-print(f"Total images copied: {saved_count}")
+print(f"Total images {'moved' if move_files else 'copied'}: {counts['saved']}")
 print(f"Images processed: {len(image_files)}")
-print(f"Images skipped: {skipped_count}")
+print(f"Images skipped: {counts['skipped']}")
 print(f"Output folder: {output_folder}")
+if cache is not None:
+    print(f"Inference cache: {stats['hits']} hits, {stats['misses']} misses ({stats['mb']:.1f} MB)")
@@ -0,0 +1,349 @@
+"""
+INT8 Post-Training Quantization
+
+Builds a static INT8 version of a YOLO model for the CPU backends of cpu_inference.py
+and reports what it costs in accuracy and what it gains in speed.
+
+Steps:
+  1. Calibration set: CALIB_SIZE images from the train split, picked per class in turns
+     (rarest class first) with pick_random's stratified reservoir sampler, so rare
+     classes are represented in the activation ranges.
+  2. Export the FP32 model (cpu_inference.export_model) and quantize it:
+       onnxruntime - onnxruntime.quantization.quantize_static (QDQ, per-channel weights).
+                     The box-decoding part of the Detect head (DFL, concat, sigmoid,
+                     multiplications) stays in float, since it mixes pixel coordinates
+                     and scores in one tensor.
+       openvino    - nncf.quantize with the same head subgraph left in float.
+  3. Evaluate FP32 and INT8 on the valid split (mAP50 and mAP50-95, own NumPy
+     implementation with 101-point interpolation) and time both (p50 per image).
+
+Calibration and evaluation use the same letterbox preprocessing as inference.
+
+Dataset layout: <dataset>/<split>/images and <dataset>/<split>/labels.
+
+Usage:
+    python quantize_model.py model.pt path/to/dataset --backend onnxruntime
+    python quantize_model.py model.pt path/to/dataset --backend openvino --calib-size 500
+"""
+
+import os
+import re
+import sys
+import json
+import random
+import shutil
+import argparse
+
+import cv2
+import numpy as np  # pip install numpy
+
+from cpu_inference import CpuDetector, export_model, model_imgsz, preprocess
+from export_benchmark import time_model
+from pick_random import iter_images, sample_stratified, find_label
+from yolo_labels import read_label_file
+
+CALIB_SIZE = 300        # calibration images
+CALIB_BATCH = 1         # images per calibration step
+VAL_LIMIT = 500         # valid images used for mAP (0 = all)
+SEED = 0
+IMGSZ = 640
+
+# Validation-style prediction settings for mAP
+EVAL_CONF = 0.001
+EVAL_IOU = 0.7
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+TIMING_BATCHES = [1]
+
+
+# ── calibration set ────────────────────────────────────────────────────────────
+
+def calibration_images(dataset, split, num, seed=SEED) -> list[str]:
+    """Class-stratified random subset of a split's images (see pick_random.py)."""
+    images_dir = os.path.join(dataset, split, "images")
+    if not os.path.isdir(images_dir):
+        raise SystemExit(f"Error: no images folder for split '{split}': {images_dir}")
+    print(f"Picking {num} calibration images from {images_dir} (stratified by class):")
+    chosen, seen = sample_stratified(iter_images(images_dir), num, random.Random(seed))
+    print(f"Picked {len(chosen)} of {seen} images")
+    return sorted(chosen)
+
+
+def iter_calibration_batches(paths, imgsz, batch=CALIB_BATCH):
+    """Letterboxed float32 batches, read lazily (only one batch in memory)."""
+    for start in range(0, len(paths), batch):
+        images = [img for img in (cv2.imread(p) for p in paths[start:start + batch]) if img is not None]
+        if images:
+            yield preprocess(images, imgsz)[0]
+
+
+# ── quantization ───────────────────────────────────────────────────────────────
+
+def head_decode_names(nodes, conv_type="Conv") -> list[str]:
+    """
+    Names of the Detect head nodes (the last model.N module) that decode boxes and scores.
+
+    nodes are (name, op type) pairs. ONNX node names look like /model.22/dfl/Conv,
+    OpenVINO names like /model.22/Mul or __module.model.22.dfl.conv/aten::_convolution.
+    """
+    pattern = re.compile(r"model\.(\d+)[/.]")
+    indices = [int(m.group(1)) for name, _ in nodes if (m := pattern.search(name))]
+    if not indices:
+        return []
+    head = re.compile(rf"model\.{max(indices)}[/.]")
+    return [name for name, op_type in nodes
+            if head.search(name) and (op_type != conv_type or "dfl" in name)]
+
+
+def head_decode_nodes(onnx_model) -> list[str]:
+    """Head decoding nodes of an ONNX model (kept out of quantize_static)."""
+    return head_decode_names([(node.name, node.op_type) for node in onnx_model.graph.node])
+
+
+def quantize_onnx(fp32_path, calib_paths, imgsz) -> str:
+    import onnx  # pip install onnx
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.batches = iter_calibration_batches(calib_paths, imgsz)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {self.input_name: batch}
+
+    int8_path = os.path.splitext(fp32_path)[0] + "_int8.onnx"
+    prepared = os.path.splitext(fp32_path)[0] + "_prep.onnx"
+    try:
+        quant_pre_process(fp32_path, prepared)
+    except Exception as e:  # shape inference is an optimisation, not a requirement
+        print(f"Warning: pre-processing failed, quantizing the plain export ({e})")
+        shutil.copy2(fp32_path, prepared)
+
+    source = onnx.load(prepared)
+    input_name = source.graph.input[0].name
+    excluded = head_decode_nodes(source)
+    print(f"Quantizing {fp32_path} ({len(excluded)} head nodes kept in float)...")
+    quantize_static(prepared, int8_path, Reader(input_name),
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=True,
+                    calibrate_method=CalibrationMethod.MinMax,
+                    nodes_to_exclude=excluded)
+    os.remove(prepared)
+
+    # Keep the export metadata (class names, imgsz) for CpuDetector
+    quantized = onnx.load(int8_path)
+    if not quantized.metadata_props:
+        onnx.helper.set_model_props(quantized, {p.key: p.value for p in onnx.load(fp32_path).metadata_props})
+        onnx.save(quantized, int8_path)
+    return int8_path
+
+
+def quantize_openvino(fp32_dir, calib_paths, imgsz) -> str:
+    import nncf  # pip install nncf
+    import openvino as ov  # pip install openvino
+
+    xml = next(os.path.join(fp32_dir, f) for f in os.listdir(fp32_dir) if f.endswith(".xml"))
+    core = ov.Core()
+    model = core.read_model(xml)
+
+    # Same idea as for ONNX: leave the box/score decoding of the head in float. Only the
+    # head's own ops by name; ignoring op types would also hit every SiLU of the backbone.
+    ops = [(op.get_friendly_name(), op.get_type_name()) for op in model.get_ops()
+           if op.get_type_name() not in ("Constant", "Parameter", "Result")]
+    head_ops = head_decode_names(ops, conv_type="Convolution")
+    ignored = nncf.IgnoredScope(names=head_ops, validate=False)
+    dataset = nncf.Dataset(list(iter_calibration_batches(calib_paths, imgsz)))
+    print(f"Quantizing {fp32_dir} with NNCF ({len(head_ops)} head ops kept in float)...")
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(calib_paths), ignored_scope=ignored)
+
+    int8_dir = fp32_dir.rstrip("/\\").replace("_openvino_model", "") + "_int8_openvino_model"
+    os.makedirs(int8_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(int8_dir, os.path.basename(xml)), compress_to_fp16=False)
+    metadata = os.path.join(fp32_dir, "metadata.yaml")
+    if os.path.isfile(metadata):
+        shutil.copy2(metadata, int8_dir)
+    return int8_dir
+
+
+# ── evaluation ─────────────────────────────────────────────────────────────────
+
+def box_iou_matrix(a, b):
+    """IoU of every box in a (N, 4) with every box in b (M, 4), xyxy."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_predictions(gt_xyxy, gt_cls, det):
+    """(num_pred, len(IOU_THRESHOLDS)) true-positive matrix, one gt per prediction."""
+    tp = np.zeros((len(det), len(IOU_THRESHOLDS)), bool)
+    if len(det) == 0 or len(gt_cls) == 0:
+        return tp
+    iou = box_iou_matrix(gt_xyxy, det.xyxy) * (gt_cls[:, None] == det.classes[None, :])
+    for t, threshold in enumerate(IOU_THRESHOLDS):
+        gt_idx, pred_idx = np.nonzero(iou >= threshold)
+        if not len(gt_idx):
+            continue
+        order = np.argsort(-iou[gt_idx, pred_idx])
+        gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+        _, first = np.unique(pred_idx, return_index=True)
+        gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+        _, first = np.unique(gt_idx, return_index=True)
+        tp[pred_idx[first], t] = True
+    return tp
+
+
+def average_precision(recall, precision) -> float:
+    """101-point interpolated AP (COCO style)."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    trapezoid = getattr(np, "trapezoid", None) or np.trapz  # np.trapz was renamed in NumPy 2.0
+    return float(trapezoid(np.interp(x, mrec, mpre), x))
+
+
+def mean_average_precision(tp, conf, pred_cls, target_cls) -> dict:
+    order = np.argsort(-conf)
+    tp, pred_cls = tp[order], pred_cls[order]
+    aps = []
+    for cls in np.unique(target_cls):
+        is_cls = pred_cls == cls
+        n_gt = int((target_cls == cls).sum())
+        if not is_cls.any():
+            aps.append(np.zeros(len(IOU_THRESHOLDS)))
+            continue
+        tpc = np.cumsum(tp[is_cls], axis=0)
+        fpc = np.cumsum(~tp[is_cls], axis=0)
+        recall = tpc / (n_gt + 1e-16)
+        precision = tpc / (tpc + fpc)
+        aps.append([average_precision(recall[:, t], precision[:, t]) for t in range(len(IOU_THRESHOLDS))])
+    aps = np.array(aps) if aps else np.zeros((0, len(IOU_THRESHOLDS)))
+    return {"mAP50": round(float(aps[:, 0].mean()), 4) if len(aps) else 0.0,
+            "mAP50-95": round(float(aps.mean()), 4) if len(aps) else 0.0}
+
+
+def evaluate(detector, val_images, imgsz) -> dict:
+    tps, confs, pred_classes, target_classes = [], [], [], []
+    for path in val_images:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+        label = find_label(path)
+        labels = read_label_file(label) if label else None
+        if labels is not None and len(labels):
+            xywh = labels.boxes * np.array([w, h, w, h], np.float32)
+            gt_xyxy = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+            gt_cls = labels.class_ids.astype(np.int32)
+        else:
+            gt_xyxy, gt_cls = np.zeros((0, 4), np.float32), np.zeros(0, np.int32)
+
+        det = detector.predict([img], conf=EVAL_CONF, iou=EVAL_IOU, imgsz=imgsz)[0]
+        tps.append(match_predictions(gt_xyxy, gt_cls, det))
+        confs.append(det.scores)
+        pred_classes.append(det.classes)
+        target_classes.append(gt_cls)
+
+    if not tps:
+        return {"mAP50": 0.0, "mAP50-95": 0.0}
+    return mean_average_precision(np.concatenate(tps), np.concatenate(confs),
+                                  np.concatenate(pred_classes), np.concatenate(target_classes))
+
+
+def model_size_mb(path) -> float:
+    if os.path.isdir(path):
+        return round(sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1024 / 1024, 1)
+    return round(os.path.getsize(path) / 1024 / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Static INT8 quantization of a YOLO model with a class-stratified calibration set",
+        epilog="Example: python quantize_model.py model.pt datasets/cows --backend openvino")
+    parser.add_argument("model", help="YOLO .pt model")
+    parser.add_argument("dataset", help="Dataset folder with <split>/images and <split>/labels")
+    parser.add_argument("--backend", choices=["onnxruntime", "openvino"], default="onnxruntime")
+    parser.add_argument("--imgsz", type=int, help="Image size (default: the size the model was trained at)")
+    parser.add_argument("--calib-size", type=int, default=CALIB_SIZE,
+                        help=f"Calibration images (default: {CALIB_SIZE})")
+    parser.add_argument("--calib-split", default="train", help="Split for calibration (default: train)")
+    parser.add_argument("--val-split", default="valid", help="Split for mAP (default: valid)")
+    parser.add_argument("--val-limit", type=int, default=VAL_LIMIT,
+                        help=f"Max. valid images for mAP, 0 = all (default: {VAL_LIMIT})")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.model):
+        print(f"Error: Model not found: {args.model}")
+        sys.exit(1)
+
+    args.imgsz = args.imgsz or model_imgsz(args.model) or IMGSZ
+
+    calib = calibration_images(args.dataset, args.calib_split, args.calib_size, args.seed)
+    if not calib:
+        print("Error: no calibration images found")
+        sys.exit(1)
+
+    fp32_path = export_model(args.model, args.backend, args.imgsz)
+    if args.backend == "onnxruntime":
+        int8_path = quantize_onnx(fp32_path, calib, args.imgsz)
+    else:
+        int8_path = quantize_openvino(fp32_path, calib, args.imgsz)
+    print(f"INT8 model: {int8_path}")
+
+    val_dir = os.path.join(args.dataset, args.val_split, "images")
+    val_images = sorted(iter_images(val_dir))
+    if not val_images:
+        print(f"Error: no validation images found in {val_dir}")
+        sys.exit(1)
+    if args.val_limit:
+        val_images = random.Random(args.seed).sample(val_images, min(args.val_limit, len(val_images)))
+    timing_images = [img for img in (cv2.imread(p) for p in val_images[:16]) if img is not None]
+
+    report = {"model": os.path.abspath(args.model), "backend": args.backend, "imgsz": args.imgsz,
+              "calibration_images": len(calib), "val_images": len(val_images), "results": {}}
+    for name, path in (("fp32", fp32_path), ("int8", int8_path)):
+        detector = CpuDetector(path, args.backend)
+        print(f"Evaluating {name} on {len(val_images)} {args.val_split} images...")
+        metrics = evaluate(detector, val_images, args.imgsz)
+        if timing_images:
+            timings = [time_model(lambda chunk: detector.predict(chunk, imgsz=args.imgsz), timing_images, b)
+                       for b in TIMING_BATCHES]
+            metrics["p50_ms"] = timings[0]["p50_ms"]
+            metrics["ms_per_image"] = timings[0]["ms_per_image"]
+        metrics["size_mb"] = model_size_mb(path)
+        metrics["path"] = path
+        report["results"][name] = metrics
+
+    fp32, int8 = report["results"]["fp32"], report["results"]["int8"]
+    report["map50_drift"] = round(int8["mAP50"] - fp32["mAP50"], 4)
+    report["map50_95_drift"] = round(int8["mAP50-95"] - fp32["mAP50-95"], 4)
+    if fp32.get("ms_per_image") and int8.get("ms_per_image"):
+        report["speedup"] = round(fp32["ms_per_image"] / int8["ms_per_image"], 2)
+
+    print(f"\n{'':6s} {'mAP50':>8s} {'mAP50-95':>9s} {'ms/img':>8s} {'MB':>7s}")
+    for name in ("fp32", "int8"):
+        r = report["results"][name]
+        print(f"{name:6s} {r['mAP50']:8.4f} {r['mAP50-95']:9.4f} {r.get('ms_per_image', 0):8.1f} {r['size_mb']:7.1f}")
+    print(f"Drift: mAP50 {report['map50_drift']:+.4f}, mAP50-95 {report['map50_95_drift']:+.4f}"
+          + (f", speed-up {report['speedup']}x" if "speedup" in report else ""))
+
+    report_path = os.path.splitext(int8_path.rstrip("/\\"))[0] + "_report.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
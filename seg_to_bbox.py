@@ -1,8 +1,15 @@
 import os
-import glob
-import shutil
+import json
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import numpy as np  # pip install numpy
 from tqdm import tqdm  # pip install tqdm
 
+from dataset_catalog import get_catalog
+from file_transfer import transfer_one
+from label_pack import LabelPack, update_pack
+from yolo_labels import LabelArrays, format_bbox_lines, parse_label_text
+
 # ==========================================
 # GLOBAL SETTINGS
 # ==========================================
@@ -11,12 +18,30 @@ from tqdm import tqdm  # pip install tqdm
 # Set to False to only convert the label files (faster, no image disk usage).
 COPY_IMAGES = True
 
-# Supported image extensions (checked in this order, both lower- and uppercase).
+# Supported image extensions (preferred in this order, matched case-insensitively).
 IMG_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp']
 
 # Minimum number of polygon points required (YOLO needs at least 3 points = 7 values).
 MIN_POLYGON_POINTS = 3  # → len(parts) must be >= 1 + MIN_POLYGON_POINTS * 2
 
+# Set to True to read the source labels from a packed <src_labels>.labelpack file
+# (see label_pack.py) instead of opening every .txt file. The pack is refreshed
+# incrementally before each run; only new/changed label files are read.
+READ_FROM_PACK = False
+
+# Parallel conversion: label files are handed out in chunks of CHUNK_SIZE to
+# NUM_WORKERS processes. Set NUM_WORKERS to 1 to convert in this process only.
+# Label writes and image copies run on a separate pool of IO_THREADS threads.
+NUM_WORKERS = os.cpu_count() or 1
+CHUNK_SIZE  = 256
+IO_THREADS  = 8
+
+# Incremental mode: a manifest next to dst_labels (<dst_labels>.manifest.json) records
+# the source mtime, size and content hash plus the conversion parameters. Re-runs skip
+# unchanged files, convert only new/modified ones and remove outputs of deleted sources.
+INCREMENTAL     = True
+MANIFEST_SUFFIX = ".manifest.json"
+
 # ==========================================
 # DATASETS
 # ==========================================
@@ -63,62 +88,198 @@ DATASETS = [
 # FUNCTIONS
 # ==========================================
 
-def convert_segmentation_to_bbox(line: str) -> str | None:
+def convert_labels_to_bbox(labels: LabelArrays,
+                           min_points: int = MIN_POLYGON_POINTS) -> tuple[np.ndarray, np.ndarray, int]:
     """
-    Convert a YOLO segmentation line to a YOLO bounding-box line.
+    Convert parsed YOLO segmentation rows to YOLO bounding boxes.
+
+    Input  : LabelArrays from yolo_labels (polygons in a flat coordinate buffer)
+    Output : (class_ids, boxes, n_skipped) with boxes as x_center y_center width height
+             (normalised, clamped 0-1)
+
+    Rows with fewer than min_points points (including plain bbox rows) and
+    unparsable lines are skipped and counted in n_skipped.
+    """
+    keep = labels.num_points >= min_points
+    n_skipped = labels.n_bad + int((~keep).sum())
+
+    # Boxes are already derived from the polygon extremes by the parser
+    # (one segmented min/max over all polygons of the file).
+    # Clamp to [0, 1] to guard against tiny floating-point overshoots
+    boxes = np.clip(labels.boxes[keep], 0.0, 1.0)
+    return labels.class_ids[keep], boxes, n_skipped
+
 
-    Input  : <class_id> x1 y1 x2 y2 x3 y3 ...   (normalised 0-1)
-    Output : <class_id> x_center y_center width height  (normalised, clamped 0-1)
+def convert_segmentation_to_bbox(line: str) -> str | None:
+    """
+    Convert a single YOLO segmentation line to a YOLO bounding-box line.
 
     Returns None for empty/comment lines or lines with too few points.
     """
-    line = line.strip()
-    if not line or line.startswith('#'):
+    class_ids, boxes, _ = convert_labels_to_bbox(parse_label_text(line))
+    if len(class_ids) == 0:
         return None
+    return format_bbox_lines(class_ids, boxes).rstrip("\n")
 
-    parts = line.split()
-    min_values = 1 + MIN_POLYGON_POINTS * 2  # class_id + at least N (x,y) pairs
 
-    if len(parts) < min_values:
-        return None
+def find_image_file(base_name: str, search_folder: str) -> str | None:
+    """Return the full path of the image matching base_name, or None if not found."""
+    return get_catalog(search_folder, IMG_EXTENSIONS).find(base_name)
 
-    class_id = parts[0]
 
-    try:
-        coords = [float(v) for v in parts[1:]]
-    except ValueError:
-        return None  # non-numeric value in the line
+_worker_packs: dict[str, LabelPack] = {}
 
-    # Split into x and y lists
-    x_coords = coords[0::2]
-    y_coords = coords[1::2]
 
-    # Bounding box from extremes
-    x_min, x_max = min(x_coords), max(x_coords)
-    y_min, y_max = min(y_coords), max(y_coords)
+def convert_label_chunk(chunk: list[tuple[int, str, str | None]], pack_path: str | None,
+                        min_points: int) -> list[tuple[str, str | None, int, int, str | None]]:
+    """
+    Worker: convert a chunk of (file_index, label_path, previous_sha1) items.
 
-    x_center = (x_min + x_max) / 2.0
-    y_center = (y_min + y_max) / 2.0
-    width    = x_max - x_min
-    height   = y_max - y_min
+    Labels are read from the pack at pack_path when given, otherwise from disk.
+    Files whose content hash equals previous_sha1 are not converted again.
+    Returns (label_path, bbox_text, n_boxes, n_skipped, sha1) per file, with
+    bbox_text None for unchanged files; writing is left to the caller's I/O pool.
+    """
+    pack = None
+    if pack_path:
+        pack = _worker_packs.get(pack_path)
+        if pack is None:
+            pack = _worker_packs[pack_path] = LabelPack(pack_path)
+
+    results = []
+    for file_index, txt_file, previous_sha1 in chunk:
+        sha1 = None
+        if pack is not None:
+            labels = pack.labels(file_index)
+        else:
+            with open(txt_file, 'rb') as f:
+                data = f.read()
+            sha1 = hashlib.sha1(data).hexdigest()
+            if sha1 == previous_sha1:
+                results.append((txt_file, None, 0, 0, sha1))
+                continue
+            labels = parse_label_text(data.decode('utf-8', errors='replace'))
+        class_ids, boxes, n_skipped = convert_labels_to_bbox(labels, min_points)
+        results.append((txt_file, format_bbox_lines(class_ids, boxes), len(class_ids), n_skipped, sha1))
+    return results
+
+
+def write_label_and_copy_image(txt_file: str, bbox_text: str | None, dst_labels_dir: str,
+                               src_images_dir: str, dst_images_dir: str, copy_images: bool,
+                               previous: dict | None = None,
+                               dst_image_names: set[str] | None = None) -> dict | None:
+    """
+    I/O task: write one converted label and optionally copy its image.
 
-    # Clamp to [0, 1] to guard against tiny floating-point overshoots
-    x_center = max(0.0, min(1.0, x_center))
-    y_center = max(0.0, min(1.0, y_center))
-    width    = max(0.0, min(1.0, width))
-    height   = max(0.0, min(1.0, height))
+    bbox_text None leaves the existing output label untouched. When `previous`
+    (the manifest entry) shows the same source image with an unchanged mtime/size
+    and the copy still exists in dst_image_names, the copy is skipped.
 
-    return f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}"
+    Returns the image record {"image", "image_mtime_ns", "image_size", "copied"},
+    {} when the image was not found, or None when not copying images.
+    """
+    filename = os.path.basename(txt_file)
+    if bbox_text is not None:
+        with open(os.path.join(dst_labels_dir, filename), 'w', encoding='utf-8') as f_out:
+            f_out.write(bbox_text)  # includes trailing newline
 
+    if not copy_images:
+        return None
 
-def find_image_file(base_name: str, search_folder: str) -> str | None:
-    """Return the full path of the image matching base_name, or None if not found."""
-    for ext in IMG_EXTENSIONS:
-        for variant in [ext, ext.upper()]:
-            path = os.path.join(search_folder, base_name + variant)
-            if os.path.exists(path):
-                return path
-    return None
+    previous = previous or {}
+    src_img = None
+    if previous.get("image"):
+        entry = get_catalog(src_images_dir, IMG_EXTENSIONS).get(previous["image"])
+        try:
+            st = entry.stat()
+            src_img = entry.path
+            if (dst_image_names is not None and previous["image"] in dst_image_names
+                    and (st.st_mtime_ns, st.st_size) == (previous.get("image_mtime_ns"),
+                                                         previous.get("image_size"))):
+                return {"image": previous["image"], "image_mtime_ns": st.st_mtime_ns,
+                        "image_size": st.st_size, "copied": False}
+        except (AttributeError, OSError):  # image gone since the previous run
+            pass
+
+    if src_img is None:
+        src_img = find_image_file(os.path.splitext(filename)[0], src_images_dir)
+    if not src_img:
+        return {}
+    image_name = os.path.basename(src_img)
+    transfer_one(src_img, os.path.join(dst_images_dir, image_name), "copy")  # with retries
+    st = os.stat(src_img)
+    return {"image": image_name, "image_mtime_ns": st.st_mtime_ns,
+            "image_size": st.st_size, "copied": True}
+
+
+# ==========================================
+# MANIFEST (incremental mode)
+# ==========================================
+
+def manifest_path_for(dst_labels_dir: str) -> str:
+    """Manifest file next to the output labels folder, e.g. yolo_labels.manifest.json"""
+    return os.path.abspath(dst_labels_dir).rstrip("\\/") + MANIFEST_SUFFIX
+
+
+def conversion_params(copy_images: bool, src_images_dir: str) -> dict:
+    """Parameters that invalidate every output when they change."""
+    return {
+        "version": 1,
+        "min_polygon_points": MIN_POLYGON_POINTS,
+        "copy_images": copy_images,
+        "src_images": os.path.abspath(src_images_dir) if copy_images else None,
+    }
+
+
+def load_manifest(path: str, params: dict) -> dict:
+    """Return the manifest's file entries, or {} if missing/unreadable/different params."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("params") != params:
+        print("  Conversion parameters changed → full rebuild.")
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(path: str, params: dict, files: dict) -> None:
+    """Write the manifest atomically (temp file + os.replace)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"params": params, "files": files}, f)
+    os.replace(tmp_path, path)
+
+
+def list_label_files(src_labels_dir: str) -> dict[str, tuple[int, int]]:
+    """{filename: (mtime_ns, size)} of every .txt file, with one directory scan."""
+    files = {}
+    with os.scandir(src_labels_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".txt") and entry.is_file():
+                st = entry.stat()
+                files[entry.name] = (st.st_mtime_ns, st.st_size)
+    return dict(sorted(files.items()))
+
+
+def list_file_names(folder: str) -> set[str]:
+    if not os.path.isdir(folder):
+        return set()
+    with os.scandir(folder) as it:
+        return {entry.name for entry in it}
+
+
+def remove_outputs(entry: dict, name: str, dst_labels_dir: str, dst_images_dir: str) -> None:
+    """Delete the outputs of a source label that no longer exists."""
+    paths = [os.path.join(dst_labels_dir, name)]
+    if entry.get("image"):
+        paths.append(os.path.join(dst_images_dir, entry["image"]))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
 
 def process_dataset(config: dict, set_index: int, copy_images: bool) -> None:
@@ -154,60 +315,139 @@ def process_dataset(config: dict, set_index: int, copy_images: bool) -> None:
     if copy_images:
         os.makedirs(dst_images_dir, exist_ok=True)
 
-    txt_files = glob.glob(os.path.join(src_labels_dir, "*.txt"))
+    pack = None
+    if READ_FROM_PACK:
+        pack = update_pack(src_labels_dir)
+        sources = {name: (mtime_ns, size)
+                   for name, mtime_ns, size in zip(pack.names, pack.mtime_ns, pack.sizes)}
+    else:
+        sources = list_label_files(src_labels_dir)
+    txt_files = [os.path.join(src_labels_dir, name) for name in sources]
     if not txt_files:
         print(f"  WARNING: No .txt files found in {src_labels_dir}")
         return
 
+    # --- Incremental mode: compare against the manifest of the previous run ---
+    params        = conversion_params(copy_images, src_images_dir)
+    manifest_path = manifest_path_for(dst_labels_dir)
+    previous      = load_manifest(manifest_path, params) if INCREMENTAL else {}
+    manifest      = {}
+
+    dst_label_names = list_file_names(dst_labels_dir) if previous else set()
+    dst_image_names = list_file_names(dst_images_dir) if previous and copy_images else None
+
     count_labels_ok    = 0
     count_labels_empty = 0  # files that had no valid lines after conversion
+    count_labels_same  = 0  # unchanged since the previous run (not converted)
     count_img_copied   = 0
+    count_img_same     = 0
     count_img_missing  = 0
     count_lines_bad    = 0
-
-    for txt_file in tqdm(txt_files, desc=f"  Set {set_index + 1}", unit="file"):
-        filename      = os.path.basename(txt_file)
-        file_basename = os.path.splitext(filename)[0]
-
-        # --- Convert labels ---
-        new_lines = []
-        with open(txt_file, 'r', encoding='utf-8', errors='replace') as f:
-            for line in f:
-                bbox_line = convert_segmentation_to_bbox(line)
-                if bbox_line:
-                    new_lines.append(bbox_line)
-                elif line.strip() and not line.strip().startswith('#'):
-                    count_lines_bad += 1
-
-        dst_label_path = os.path.join(dst_labels_dir, filename)
-        with open(dst_label_path, 'w', encoding='utf-8') as f_out:
-            f_out.write("\n".join(new_lines))
-            if new_lines:
-                f_out.write("\n")  # trailing newline
-
-        if new_lines:
-            count_labels_ok += 1
+    count_removed      = 0
+
+    for name in set(previous) - set(sources):
+        remove_outputs(previous[name], name, dst_labels_dir, dst_images_dir)
+        count_removed += 1
+
+    items, unchanged = [], []
+    for file_index, (name, stat_key) in enumerate(sources.items()):
+        prev = previous.get(name)
+        if prev is not None and name in dst_label_names \
+                and (prev["mtime_ns"], prev["size"]) == stat_key:
+            unchanged.append(os.path.join(src_labels_dir, name))
         else:
-            count_labels_empty += 1
-
-        # --- Copy image (optional) ---
-        if copy_images:
-            src_img = find_image_file(file_basename, src_images_dir)
-            if src_img:
-                dst_img = os.path.join(dst_images_dir, os.path.basename(src_img))
-                shutil.copy2(src_img, dst_img)
-                count_img_copied += 1
-            else:
-                count_img_missing += 1
+            # Changed mtime/size: the worker re-hashes and skips if the content is the same
+            prev_sha1 = prev.get("sha1") if prev is not None and name in dst_label_names else None
+            items.append((file_index, os.path.join(src_labels_dir, name), prev_sha1))
+
+    pack_path = pack.pack_path if pack is not None else None
+    chunks    = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+
+    if NUM_WORKERS > 1 and len(chunks) > 1:
+        cpu_pool = ProcessPoolExecutor(max_workers=min(NUM_WORKERS, len(chunks)))
+    else:
+        cpu_pool = ThreadPoolExecutor(max_workers=1)  # convert in this process
+
+    def record(txt_file, image_record, sha1, converted):
+        name = os.path.basename(txt_file)
+        entry = dict(previous.get(name, {}))
+        entry["mtime_ns"], entry["size"] = sources[name]
+        if converted or sha1 is not None or "sha1" not in entry:
+            entry["sha1"] = sha1  # None when read from the pack (no content hash)
+        if image_record is not None:
+            for key in ("image", "image_mtime_ns", "image_size"):
+                entry.pop(key, None)
+            entry.update({k: v for k, v in image_record.items() if k != "copied"})
+        manifest[name] = entry
+
+    with cpu_pool, ThreadPoolExecutor(max_workers=IO_THREADS) as io_pool, \
+            tqdm(total=len(txt_files), desc=f"  Set {set_index + 1}", unit="file") as progress:
+        # --- Convert labels (CPU pool) ---
+        convert_jobs = {cpu_pool.submit(convert_label_chunk, chunk, pack_path, MIN_POLYGON_POINTS)
+                        for chunk in chunks}
+
+        # --- Write labels + copy images (I/O pool) ---
+        io_jobs = {}
+        for txt_file in unchanged:
+            count_labels_same += 1
+            io_jobs[io_pool.submit(
+                write_label_and_copy_image, txt_file, None, dst_labels_dir, src_images_dir,
+                dst_images_dir, copy_images, previous.get(os.path.basename(txt_file)),
+                dst_image_names)] = (txt_file, None, False)
+
+        # Handle converted chunks and finished writes as they come in, so the writes of the
+        # first chunks overlap with the conversion of the rest and the bar moves during it.
+        pending = convert_jobs | set(io_jobs)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for job in done:
+                if job in convert_jobs:
+                    for txt_file, bbox_text, n_boxes, n_skipped, sha1 in job.result():
+                        if bbox_text is None:
+                            count_labels_same += 1
+                        else:
+                            count_lines_bad += n_skipped
+                            if n_boxes:
+                                count_labels_ok += 1
+                            else:
+                                count_labels_empty += 1
+                        io_job = io_pool.submit(
+                            write_label_and_copy_image, txt_file, bbox_text, dst_labels_dir,
+                            src_images_dir, dst_images_dir, copy_images,
+                            previous.get(os.path.basename(txt_file)), dst_image_names)
+                        io_jobs[io_job] = (txt_file, sha1, bbox_text is not None)
+                        pending.add(io_job)
+                    continue
+
+                txt_file, sha1, converted = io_jobs.pop(job)
+                image_record = job.result()
+                record(txt_file, image_record, sha1, converted)
+                if image_record:
+                    if image_record["copied"]:
+                        count_img_copied += 1
+                    else:
+                        count_img_same += 1
+                elif image_record is not None:
+                    count_img_missing += 1
+                progress.update(1)
+
+    if INCREMENTAL:
+        save_manifest(manifest_path, params, manifest)
 
     # Summary
     print(f"\n  Results for Set {set_index + 1}:")
     print(f"    Labels converted  : {count_labels_ok}")
     print(f"    Labels empty/bad  : {count_labels_empty}  (written as empty file)")
+    if count_labels_same:
+        print(f"    Labels unchanged  : {count_labels_same}  (skipped, see manifest)")
+    if count_removed:
+        print(f"    Outputs removed   : {count_removed}  (source label deleted)")
     if count_lines_bad:
         print(f"    Lines skipped     : {count_lines_bad}  (too few polygon points)")
     if copy_images:
         print(f"    Images copied     : {count_img_copied}")
+        if count_img_same:
+            print(f"    Images unchanged  : {count_img_same}")
         if count_img_missing:
             print(f"    Images not found  : {count_img_missing}")
 
@@ -223,6 +463,7 @@ def main() -> None:
     print(f"\nSeg → BBox converter")
     print(f"Datasets configured : {total_sets}  |  Active : {len(active_sets)}")
     print(f"Copy images         : {COPY_IMAGES}")
+    print(f"Incremental         : {INCREMENTAL}")
 
     for i, config in enumerate(DATASETS):
         if config.get("active", True):
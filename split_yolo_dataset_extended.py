@@ -1,6 +1,13 @@
 import os
-import shutil
 import random
+import hashlib
+
+import yaml  # pip install pyyaml
+
+from dataset_catalog import DirectoryCatalog
+from file_transfer import transfer_files
+from label_index import dataset_root, index_key, open_index
+from yolo_labels import read_label_file
 
 # ==========================================
 # CONFIGURATION
@@ -36,13 +43,47 @@ TRAIN_RATIO = 0.70
 VALID_RATIO = 0.20
 TEST_RATIO  = 0.10  
 
+# Split method:
+# "hash"   : every image gets a fixed split from a stable hash (see HASH_KEY), so existing
+#            images never move between train/valid/test and validation never leaks across
+#            dataset versions. Only new (or changed) pairs are copied on a re-run.
+# "random" : reshuffle everything on every run (old behaviour).
+SPLIT_METHOD = "hash"
+HASH_KEY = "stem"   # "stem" (file name without extension) or "content" (image bytes, slower)
+HASH_SALT = ""      # change to draw a completely new (but again stable) split
+
+# 7. Label Index
+# Use the persistent label index (.label_index.sqlite in the dataset root, shared with
+# label_index.py) to check which null labels are empty and to find the class ids for
+# the dataset.yaml (lists mode) instead of reading every label file.
+USE_LABEL_INDEX = False
+
+# 8. Output Mode for images: "copy", "hardlink", "reflink", "symlink" or "auto"
+# hardlink/reflink/symlink use no extra disk space and are near-instant; they fall back
+# to a copy when source and output are on different drives. Labels are always copied,
+# so editing an output label never changes the original.
+OUTPUT_MODE = "copy"
+
+# 9. Split Output: "copy" or "lists"
+# "copy"  : copy/link images + labels into OUTPUT_TRAIN/VALID/TEST_FOLDER (see OUTPUT_MODE)
+# "lists" : only write train.txt / val.txt / test.txt with image paths plus a dataset.yaml
+#           into OUTPUT_LIST_FOLDER. Ultralytics trains straight from the original folders
+#           (labels are found by replacing /images/ with /labels/ in each image path).
+SPLIT_OUTPUT = "copy"
+OUTPUT_LIST_FOLDER = r"/path/to/output/split_lists"
+
+# Class names for the generated dataset.yaml (lists mode), e.g. ["cow", "calf"].
+# Leave empty to use the class ids found in the labels as names.
+CLASS_NAMES = []
+
 # ==========================================
 # END CONFIGURATION
 # ==========================================
 
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
+
 def get_image_label_pairs(images_dir, labels_dir, mode="main"):
     """Scans directories and pairs images with their label files."""
-    image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
     pairs = []
     
     if not os.path.exists(images_dir) or not os.path.exists(labels_dir):
@@ -51,20 +92,32 @@ def get_image_label_pairs(images_dir, labels_dir, mode="main"):
 
     print(f"   Scanning: {images_dir} (Mode: {mode})...")
     
-    files = os.listdir(images_dir)
+    # One scan per folder instead of an exists() call per image
+    images = DirectoryCatalog(images_dir, IMAGE_EXTENSIONS)
+    labels = DirectoryCatalog(labels_dir, ['.txt'])
     ignored_not_empty = 0
 
-    for filename in files:
-        name, ext = os.path.splitext(filename)
-        if ext.lower() not in image_extensions:
-            continue
+    labels_with_content = None
+    if mode == "null" and USE_LABEL_INDEX:
+        with open_index(dataset_root(labels_dir)) as index:
+            index.refresh(labels_dir)
+            labels_with_content = index.files_with_content(labels_dir)
 
-        image_path = os.path.join(images_dir, filename)
-        label_file = name + '.txt'
-        label_path = os.path.join(labels_dir, label_file)
+    for image_entry in images:
+        filename = image_entry.name
+        name = os.path.splitext(filename)[0]
+
+        image_path = image_entry.path
+        label_entry = labels.find_entry(name)
         
-        if os.path.exists(label_path):
-            if mode == "null":
+        if label_entry is not None:
+            label_file = label_entry.name
+            label_path = label_entry.path
+            if mode == "null" and labels_with_content is not None:
+                if index_key(label_path) in labels_with_content:
+                    ignored_not_empty += 1
+                    continue
+            elif mode == "null":
                 try:
                     with open(label_path, 'r') as f:
                         content = f.read().strip()
@@ -88,23 +141,166 @@ def get_image_label_pairs(images_dir, labels_dir, mode="main"):
                 
     return pairs
 
-def copy_files(data_list, dest_folder):
-    """Copies the files to the destination folders."""
-    if not data_list:
-        return
+def split_hash(item, purpose=""):
+    """
+    Stable value in [0, 1) for an image, based on HASH_KEY and HASH_SALT.
+
+    A different purpose gives an independent value for the same image.
+    """
+    h = hashlib.sha1((purpose + HASH_SALT).encode('utf-8'))
+    if HASH_KEY == "content":
+        with open(item['image_path'], 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    else:
+        h.update(os.path.splitext(item['filename'])[0].encode('utf-8'))
+    return int.from_bytes(h.digest()[:8], 'big') / 2**64
+
+def hash_split(all_data):
+    """Assigns every pair to train/valid/test by its stable hash and the configured ratios."""
+    train_set, valid_set, test_set = [], [], []
+    for item in all_data:
+        u = split_hash(item)
+        if u < TRAIN_RATIO:
+            train_set.append(item)
+        elif u < TRAIN_RATIO + VALID_RATIO:
+            valid_set.append(item)
+        else:
+            test_set.append(item)
+    return train_set, valid_set, test_set
+
+def is_up_to_date(src_path, dest_entry):
+    """True if dest_entry (from a previous run) has the same size and mtime as src_path."""
+    if dest_entry is None:
+        return False
+    try:
+        src_stat, dst_stat = os.stat(src_path), dest_entry.stat()
+    except OSError:
+        return False
+    return (src_stat.st_size, src_stat.st_mtime_ns) == (dst_stat.st_size, dst_stat.st_mtime_ns)
 
+def remove_stale_files(data_list, existing_images, existing_labels):
+    """Deletes images/labels of a previous run that are no longer assigned to this split."""
+    wanted_images = {item['filename'].lower() for item in data_list}
+    wanted_labels = {item['label_name'].lower() for item in data_list}
+
+    removed = []
+    for existing, wanted in ((existing_images, wanted_images), (existing_labels, wanted_labels)):
+        count = 0
+        for entry in existing:
+            if entry.name.lower() in wanted:
+                continue
+            try:
+                os.remove(entry.path)
+                count += 1
+            except OSError as e:
+                print(f"Error removing {entry.name}: {e}")
+        removed.append(count)
+    return tuple(removed)  # (images, labels)
+
+def copy_files(data_list, dest_folder, mode=OUTPUT_MODE):
+    """Copies (or links, see OUTPUT_MODE) the files to the destination folders."""
     img_dest = os.path.join(dest_folder, "images")
     lbl_dest = os.path.join(dest_folder, "labels")
     
-    os.makedirs(img_dest, exist_ok=True)
-    os.makedirs(lbl_dest, exist_ok=True)
+    # Files from a previous run with the same size/mtime are kept as they are
+    # (copy2 and links keep the source mtime), so a re-split only copies new data.
+    existing_images = DirectoryCatalog(img_dest, IMAGE_EXTENSIONS)
+    existing_labels = DirectoryCatalog(lbl_dest, ['.txt'])
+    
+    # Pairs that moved to another split (new ratios, HASH_SALT, "random") or whose source
+    # was deleted must go, otherwise they stay in this split and leak between train/valid.
+    removed_images, removed_labels = remove_stale_files(data_list, existing_images, existing_labels)
+    if removed_images or removed_labels:
+        print(f"      {removed_images} images and {removed_labels} labels removed (no longer in this split)")
+    if not data_list:
+        return
     
+    # All files go through the concurrent transfer engine (folders are created there)
+    jobs = []
+    up_to_date = 0
     for item in data_list:
+        image_ok = is_up_to_date(item['image_path'], existing_images.get(item['filename']))
+        label_ok = is_up_to_date(item['label_path'], existing_labels.get(item['label_name']))
+        if image_ok and label_ok:
+            up_to_date += 1
+            continue
+        if not image_ok:
+            jobs.append((item['image_path'], os.path.join(img_dest, item['filename']), mode))
+        if not label_ok:
+            jobs.append((item['label_path'], os.path.join(lbl_dest, item['label_name']), "copy"))
+    
+    if up_to_date:
+        print(f"      {up_to_date} pairs already up to date, {len(data_list) - up_to_date} to copy")
+    
+    report = transfer_files(jobs, desc=os.path.basename(os.path.normpath(dest_folder)))
+    for src, dst, error in report.failures:
+        print(f"Error copying {os.path.basename(src)}: {error}")
+
+def ultralytics_label_path(image_path):
+    """Label path Ultralytics derives from an image path (/images/ -> /labels/, ext -> .txt)."""
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    path = os.path.abspath(image_path)
+    if sa not in path:
+        return None
+    return sb.join(path.rsplit(sa, 1)).rsplit('.', 1)[0] + '.txt'
+
+def max_class_id(labels_dir):
+    """Highest class id in a labels folder, or None (via the label index if USE_LABEL_INDEX)."""
+    if USE_LABEL_INDEX:
+        with open_index(dataset_root(labels_dir)) as index:
+            index.refresh(labels_dir)
+            return index.max_class_id(labels_dir)
+    found = None
+    for entry in DirectoryCatalog(labels_dir, ['.txt']):
         try:
-            shutil.copy2(item['image_path'], os.path.join(img_dest, item['filename']))
-            shutil.copy2(item['label_path'], os.path.join(lbl_dest, item['label_name']))
-        except Exception as e:
-            print(f"Error copying {item['filename']}: {e}")
+            class_ids = read_label_file(entry.path).class_ids
+        except OSError as e:
+            print(f"Error reading {entry.name}: {e}")
+            continue
+        if len(class_ids):
+            found = max(found if found is not None else -1, int(class_ids.max()))
+    return found
+
+def class_names_from_labels(labels_dirs):
+    """Numeric class names 0..max class id found in the labels."""
+    max_cls = -1
+    for labels_dir in labels_dirs:
+        found = max_class_id(labels_dir)
+        if found is not None:
+            max_cls = max(max_cls, found)
+    return [str(i) for i in range(max_cls + 1)]
+
+def write_split_lists(splits, output_folder, source_labels_dirs):
+    """Writes train.txt / val.txt / test.txt and a dataset.yaml instead of copying files."""
+    os.makedirs(output_folder, exist_ok=True)
+
+    mismatched = 0
+    for list_name, data_list in splits.items():
+        with open(os.path.join(output_folder, list_name), 'w', encoding='utf-8') as f:
+            for item in data_list:
+                image_path = os.path.abspath(item['image_path'])
+                if ultralytics_label_path(image_path) != os.path.abspath(item['label_path']):
+                    mismatched += 1
+                f.write(image_path + '\n')
+        print(f"   -> {list_name}: {len(data_list)} images")
+
+    if mismatched:
+        print(f"   [!] WARNING: {mismatched} images are not in an 'images' folder with a sibling")
+        print("       'labels' folder; Ultralytics will not find their labels. Use SPLIT_OUTPUT = \"copy\".")
+
+    names = CLASS_NAMES or class_names_from_labels(source_labels_dirs)
+    dataset = {
+        'path': os.path.abspath(output_folder),
+        'train': 'train.txt',
+        'val': 'val.txt',
+        'test': 'test.txt',
+        'names': {i: name for i, name in enumerate(names)},
+    }
+    yaml_path = os.path.join(output_folder, 'dataset.yaml')
+    with open(yaml_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(dataset, f, sort_keys=False, allow_unicode=True)
+    print(f"   -> dataset.yaml written: {yaml_path}")
 
 def main():
     print("--- Start Dataset Splitter ---")
@@ -146,9 +342,15 @@ def main():
         null_pairs = get_image_label_pairs(NULL_IMAGES_FOLDER, NULL_LABELS_FOLDER, mode="null")
         
         if len(null_pairs) > NUM_NULL_IMAGES > 0:
-            random.shuffle(null_pairs)
+            if SPLIT_METHOD == "hash":
+                # Lowest hashes: adding more null images only swaps a few of the selection.
+                # Independent of the split hash, else every selected null lands in train.
+                null_pairs.sort(key=lambda item: split_hash(item, "null-selection:"))
+                print(f"   -> Selected {NUM_NULL_IMAGES} images (stable hash order).")
+            else:
+                random.shuffle(null_pairs)
+                print(f"   -> Randomly selected {NUM_NULL_IMAGES} images.")
             selected_nulls = null_pairs[:NUM_NULL_IMAGES]
-            print(f"   -> Randomly selected {NUM_NULL_IMAGES} images.")
         else:
             selected_nulls = null_pairs
             print(f"   -> Using all available images ({len(null_pairs)}).")
@@ -164,28 +366,43 @@ def main():
 
     print(f"\nTotal images to process: {len(all_data)}")
     
-    # Shuffle and Split
-    random.shuffle(all_data)
-    
-    total_count = len(all_data)
-    train_count = int(total_count * TRAIN_RATIO)
-    valid_count = int(total_count * VALID_RATIO)
-    
-    train_set = all_data[:train_count]
-    valid_set = all_data[train_count : train_count + valid_count]
-    test_set  = all_data[train_count + valid_count :]
-    
-    # 5. Execute Copy
-    print(f"\n[5/5] Copying files...")
-    
-    print(f"   -> Copying TRAIN set ({len(train_set)} images)...")
-    copy_files(train_set, OUTPUT_TRAIN_FOLDER)
-    
-    print(f"   -> Copying VALID set ({len(valid_set)} images)...")
-    copy_files(valid_set, OUTPUT_VALID_FOLDER)
+    if SPLIT_METHOD == "hash":
+        # Stable split: the same image always ends up in the same set
+        print(f"Split method: hash ({HASH_KEY})")
+        train_set, valid_set, test_set = hash_split(all_data)
+    else:
+        # Shuffle and Split
+        random.shuffle(all_data)
+        
+        total_count = len(all_data)
+        train_count = int(total_count * TRAIN_RATIO)
+        valid_count = int(total_count * VALID_RATIO)
+        
+        train_set = all_data[:train_count]
+        valid_set = all_data[train_count : train_count + valid_count]
+        test_set  = all_data[train_count + valid_count :]
     
-    print(f"   -> Copying TEST set ({len(test_set)} images)...")
-    copy_files(test_set, OUTPUT_TEST_FOLDER)
+    # 5. Execute Copy (or write list files)
+    if SPLIT_OUTPUT == "lists":
+        print(f"\n[5/5] Writing split lists to {OUTPUT_LIST_FOLDER}...")
+        labels_dirs = [MAIN_LABELS_FOLDER]
+        if USE_EXTRA_1:
+            labels_dirs.append(EXTRA_1_LABELS_FOLDER)
+        if USE_EXTRA_2:
+            labels_dirs.append(EXTRA_2_LABELS_FOLDER)
+        write_split_lists({'train.txt': train_set, 'val.txt': valid_set, 'test.txt': test_set},
+                          OUTPUT_LIST_FOLDER, labels_dirs)
+    else:
+        print(f"\n[5/5] Copying files (image mode: {OUTPUT_MODE})...")
+        
+        print(f"   -> Copying TRAIN set ({len(train_set)} images)...")
+        copy_files(train_set, OUTPUT_TRAIN_FOLDER)
+        
+        print(f"   -> Copying VALID set ({len(valid_set)} images)...")
+        copy_files(valid_set, OUTPUT_VALID_FOLDER)
+        
+        print(f"   -> Copying TEST set ({len(test_set)} images)...")
+        copy_files(test_set, OUTPUT_TEST_FOLDER)
     
     print("\n--- Summary ---")
     print(f"TRAIN set: {len(train_set)}")
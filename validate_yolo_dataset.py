@@ -0,0 +1,523 @@
+"""
+YOLO Dataset Validator
+
+Sync_yolo_dataset.py only checks that image and label stems match. This script
+checks the label *contents* before they break a training run:
+
+    non_numeric         line contains a value that is not a number
+    odd_coordinates     odd number of coordinates (x without y)
+    too_few_values      fewer than 4 coordinates (no bbox, no polygon)
+    bad_class_id        class id is negative or not an integer
+    class_out_of_range  class id >= number of `names` in dataset.yaml
+    out_of_bounds       coordinate (or bbox edge) outside [0, 1]
+    zero_area           bbox with width/height 0, or polygon with area 0
+    duplicate           same class and coordinates as an earlier row in the file
+
+All label files are loaded into flat NumPy arrays first; every check is then a
+vectorized mask over all rows of the whole dataset at once (segmented min/max
+and shoelace areas via reduceat, duplicates via np.unique per row length).
+
+Images next to the labels are header-probed (image_probe.py, no decoding):
+the report lists their resolutions and images without a readable header.
+
+The result is written to a JSON report. With --fix, out-of-bounds coordinates
+are clipped to [0, 1] and all other bad rows are removed; only affected files
+are rewritten (atomically), other lines and comments are kept as they are.
+
+Usage:
+    python validate_yolo_dataset.py <dataset_folder> [--yaml dataset.yaml] [--fix]
+
+Example:
+    python validate_yolo_dataset.py ./my_dataset
+    python validate_yolo_dataset.py ./my_dataset --fix --no-confirm
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np  # pip install numpy
+import yaml  # pip install pyyaml
+
+from dataset_catalog import DirectoryCatalog, get_catalog
+from yolo_labels import split_rows_with_lines
+
+# ===== DEFAULT CONFIGURATION =====
+DEFAULT_SUBDIRS = ['train', 'valid', 'test']
+YAML_NAMES = ['dataset.yaml', 'data.yaml']  # looked up in the dataset folder when --yaml is not given
+REPORT_NAME = "validation_report.json"
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff', '.tif']
+TOP_RESOLUTIONS = 10           # most common image resolutions listed per split
+IO_THREADS = 8                 # label files read concurrently
+COORD_TOLERANCE = 1e-6         # float32 rounding of values like 1.000000
+AREA_EPSILON = 1e-9            # smaller (normalised) areas count as zero
+DUPLICATE_DECIMALS = 6         # coordinates are compared at this precision
+# ===== END CONFIGURATION =====
+
+ISSUES = ["non_numeric", "odd_coordinates", "too_few_values", "bad_class_id",
+          "class_out_of_range", "out_of_bounds", "zero_area", "duplicate"]
+
+
+def load_class_names(yaml_path) -> list[str]:
+    """Class names from a YOLO dataset.yaml ('names' as list or dict)."""
+    with open(yaml_path, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f) or {}
+    names = data.get('names', [])
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names.keys())]
+    return list(names)
+
+
+def find_dataset_yaml(dataset_folder) -> str | None:
+    """dataset.yaml/data.yaml in the dataset folder, or None."""
+    for name in YAML_NAMES:
+        path = os.path.join(dataset_folder, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def find_label_dirs(dataset_folder, subdirs) -> list[tuple[str, str]]:
+    """(split name, labels folder) pairs; a dataset without splits has a single '.' split."""
+    label_dirs = []
+    for subdir in subdirs:
+        labels_dir = os.path.join(dataset_folder, subdir, 'labels')
+        if os.path.isdir(labels_dir):
+            label_dirs.append((subdir, labels_dir))
+    if not label_dirs and os.path.isdir(os.path.join(dataset_folder, 'labels')):
+        label_dirs.append(('.', os.path.join(dataset_folder, 'labels')))
+    return label_dirs
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Loading
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _read_rows(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return split_rows_with_lines(f.read())
+    except OSError as e:
+        return e
+
+
+def load_dataset_rows(label_dirs, io_threads: int = IO_THREADS) -> dict:
+    """
+    Read every label file of every split into flat, dataset-wide arrays.
+
+    Returns a dict with:
+        files       : list of (split, path)
+        row_file    : int32   (N,)  file index of each row
+        row_line    : int32   (N,)  1-based source line of each row
+        row_len     : int64   (N,)  values per row (class id included)
+        values      : float32 (V,)  all row values back to back
+        bad_lines   : list of (file index, line) with non-numeric values
+        unreadable  : list of (file index, error)
+    """
+    files = []
+    for split, labels_dir in label_dirs:
+        catalog = DirectoryCatalog(labels_dir, ['.txt'])
+        files.extend((split, entry.path) for entry in sorted(catalog, key=lambda e: e.name))
+
+    row_file, row_line, row_len, values = [], [], [], []
+    bad_lines, unreadable = [], []
+    with ThreadPoolExecutor(max_workers=max(1, io_threads)) as pool:
+        for i, result in enumerate(pool.map(_read_rows, [path for _, path in files])):
+            if isinstance(result, OSError):
+                unreadable.append((i, str(result)))
+                continue
+            lengths, file_values, line_numbers, file_bad = result
+            row_file.append(np.full(len(lengths), i, dtype=np.int32))
+            row_line.append(line_numbers.astype(np.int32))
+            row_len.append(lengths)
+            values.append(file_values)
+            bad_lines.extend((i, line) for line in file_bad)
+
+    return {
+        'files': files,
+        'row_file': np.concatenate([np.zeros(0, np.int32)] + row_file),
+        'row_line': np.concatenate([np.zeros(0, np.int32)] + row_line),
+        'row_len': np.concatenate([np.zeros(0, np.int64)] + row_len),
+        'values': np.concatenate([np.zeros(0, np.float32)] + values),
+        'bad_lines': bad_lines,
+        'unreadable': unreadable,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Vectorized checks
+# ─────────────────────────────────────────────────────────────────────────────
+
+def row_starts(row_len: np.ndarray) -> np.ndarray:
+    starts = np.zeros(len(row_len), dtype=np.int64)
+    np.cumsum(row_len[:-1], out=starts[1:])
+    return starts
+
+
+def _polygon_areas(values, starts, n_coords, is_poly) -> np.ndarray:
+    """Shoelace area of every polygon row at once (segmented sums)."""
+    areas = np.zeros(len(n_coords), dtype=np.float64)
+    if not is_poly.any():
+        return areas
+    lengths = n_coords[is_poly]
+    n_points = lengths // 2
+    offsets = np.cumsum(lengths) - lengths
+    gather = np.repeat(starts[is_poly] + 1 - offsets, lengths) + np.arange(lengths.sum())
+    coords = values[gather].astype(np.float64)
+    xs, ys = coords[0::2], coords[1::2]
+
+    point_starts = np.zeros(len(n_points), dtype=np.int64)
+    np.cumsum(n_points[:-1], out=point_starts[1:])
+    nxt = np.arange(1, len(xs) + 1)
+    nxt[point_starts + n_points - 1] = point_starts  # close every polygon
+    cross = xs * ys[nxt] - xs[nxt] * ys
+    areas[is_poly] = 0.5 * np.abs(np.add.reduceat(cross, point_starts))
+    return areas
+
+
+def _duplicate_rows(values, starts, row_len, row_file, candidates) -> np.ndarray:
+    """Rows equal (class + coordinates) to an earlier row of the same file."""
+    duplicate = np.zeros(len(row_len), dtype=bool)
+    scale = 10.0 ** DUPLICATE_DECIMALS
+    for length in np.unique(row_len[candidates]).tolist():
+        rows = np.flatnonzero(candidates & (row_len == length))
+        if len(rows) < 2:
+            continue
+        quantized = np.rint(values[starts[rows][:, None] + np.arange(length)] * scale).astype(np.int64)
+        keys = np.column_stack((row_file[rows].astype(np.int64), quantized))
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        duplicate[rows] = first[inverse.ravel()] != np.arange(len(rows))
+    return duplicate
+
+
+def check_rows(data: dict, num_classes: int | None) -> dict[str, np.ndarray]:
+    """Evaluate every check for every row; returns issue name -> boolean row mask."""
+    values, row_len, row_file = data['values'], data['row_len'], data['row_file']
+    n_rows = len(row_len)
+    starts = row_starts(row_len)
+    n_coords = row_len - 1
+
+    odd = n_coords % 2 == 1
+    too_few = ~odd & (n_coords < 4)
+    is_bbox = n_coords == 4
+    is_poly = ~odd & (n_coords >= 6)
+
+    classes = values[starts] if n_rows else np.zeros(0, dtype=np.float32)
+    bad_class = (classes < 0) | (classes != np.floor(classes))
+    if num_classes is not None:
+        out_of_range = ~bad_class & (classes >= num_classes)
+    else:
+        out_of_range = np.zeros(n_rows, dtype=bool)
+
+    # Segmented min/max over the coordinates of every row (class id excluded)
+    is_coord = np.ones(len(values), dtype=bool)
+    is_coord[starts] = False
+    coords = values[is_coord]
+    coord_starts = starts - np.arange(n_rows)
+    has_coords = n_coords > 0
+    row_min = np.zeros(n_rows, dtype=np.float32)
+    row_max = np.zeros(n_rows, dtype=np.float32)
+    if has_coords.any():
+        row_min[has_coords] = np.minimum.reduceat(coords, coord_starts[has_coords])
+        row_max[has_coords] = np.maximum.reduceat(coords, coord_starts[has_coords])
+    out_of_bounds = (row_min < -COORD_TOLERANCE) | (row_max > 1 + COORD_TOLERANCE)
+
+    zero_area = np.zeros(n_rows, dtype=bool)
+    if is_bbox.any():
+        x, y, w, h = values[starts[is_bbox][:, None] + 1 + np.arange(4)].T
+        edges_out = ((x - w / 2 < -COORD_TOLERANCE) | (x + w / 2 > 1 + COORD_TOLERANCE) |
+                     (y - h / 2 < -COORD_TOLERANCE) | (y + h / 2 > 1 + COORD_TOLERANCE))
+        out_of_bounds[is_bbox] |= edges_out
+        zero_area[is_bbox] = (w * h) <= AREA_EPSILON
+    zero_area |= is_poly & (_polygon_areas(values, starts, n_coords, is_poly) <= AREA_EPSILON)
+
+    duplicate = _duplicate_rows(values, starts, row_len, row_file, is_bbox | is_poly)
+
+    return {
+        'odd_coordinates': odd,
+        'too_few_values': too_few,
+        'bad_class_id': bad_class,
+        'class_out_of_range': out_of_range,
+        'out_of_bounds': out_of_bounds,
+        'zero_area': zero_area,
+        'duplicate': duplicate,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Auto-fix
+# ─────────────────────────────────────────────────────────────────────────────
+
+def clip_coordinates(data: dict) -> np.ndarray:
+    """Copy of the values with polygon points and bbox edges clipped to [0, 1]."""
+    values, row_len = data['values'].copy(), data['row_len']
+    starts = row_starts(row_len)
+    n_coords = row_len - 1
+    is_bbox = n_coords == 4
+
+    clip_mask = np.repeat(~is_bbox, row_len)
+    clip_mask[starts] = False  # never touch class ids
+    np.clip(values, 0.0, 1.0, out=values, where=clip_mask)
+
+    if is_bbox.any():
+        idx = starts[is_bbox][:, None] + 1 + np.arange(4)
+        x, y, w, h = values[idx].T
+        x1, x2 = np.clip(x - w / 2, 0, 1), np.clip(x + w / 2, 0, 1)
+        y1, y2 = np.clip(y - h / 2, 0, 1), np.clip(y + h / 2, 0, 1)
+        values[idx] = np.column_stack(((x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1))
+    return values
+
+
+def format_row(row_values: np.ndarray) -> str:
+    class_id, *coords = row_values.tolist()
+    return " ".join([str(int(class_id))] + [f"{v:.6f}" for v in coords])
+
+
+def write_text_atomic(path: str, text: str) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def fix_dataset(data: dict, masks: dict, num_classes: int | None) -> tuple[int, int, int]:
+    """
+    Rewrite every label file with issues: clip out-of-bounds rows, drop the rest.
+
+    Returns (files rewritten, rows clipped, rows removed).
+    """
+    fixed_values = clip_coordinates(data)
+    fixed = dict(data, values=fixed_values)
+    after = check_rows(fixed, num_classes)  # clipping can create zero-area boxes or duplicates
+    drop = np.zeros(len(data['row_len']), dtype=bool)
+    for issue, mask in after.items():
+        if issue != 'out_of_bounds':
+            drop |= mask
+    rewrite = masks['out_of_bounds'] & ~drop
+
+    any_issue = np.logical_or.reduce(list(masks.values())) if masks else drop
+    affected = set(np.unique(data['row_file'][any_issue]).tolist())
+    bad_lines_per_file = {}
+    for file_index, line in data['bad_lines']:
+        bad_lines_per_file.setdefault(file_index, set()).add(line)
+    affected.update(bad_lines_per_file)
+
+    starts = row_starts(data['row_len'])
+    order = np.argsort(data['row_file'], kind='stable')
+    row_file_sorted = data['row_file'][order]
+
+    n_files = n_clipped = n_removed = 0
+    for file_index in sorted(affected):
+        _, path = data['files'][file_index]
+        lo, hi = np.searchsorted(row_file_sorted, [file_index, file_index + 1])
+        rows = order[lo:hi]
+        actions = {}  # line number -> None (remove) or replacement text
+        for row in rows.tolist():
+            line = int(data['row_line'][row])
+            if drop[row]:
+                actions[line] = None
+            elif rewrite[row]:
+                actions[line] = format_row(fixed_values[starts[row]:starts[row] + data['row_len'][row]])
+        for line in bad_lines_per_file.get(file_index, ()):
+            actions[line] = None
+        if not actions:
+            continue
+
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+            out = []
+            for line_no, text in enumerate(lines, start=1):
+                if line_no not in actions:
+                    out.append(text)
+                elif actions[line_no] is not None:
+                    out.append(actions[line_no])
+            write_text_atomic(path, "\n".join(out) + ("\n" if out else ""))
+        except OSError as e:
+            print(f"Error fixing {path}: {e}")
+            continue
+
+        n_files += 1
+        n_removed += sum(1 for a in actions.values() if a is None)
+        n_clipped += sum(1 for a in actions.values() if a is not None)
+    return n_files, n_clipped, n_removed
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Images
+# ─────────────────────────────────────────────────────────────────────────────
+
+def check_images(label_dirs) -> dict:
+    """
+    Header-probe every image next to each labels folder (no decoding).
+
+    Images whose size cannot be read are usually truncated or not images at all.
+    """
+    result = {}
+    for split, labels_dir in label_dirs:
+        images_dir = os.path.join(os.path.dirname(labels_dir), 'images')
+        sizes = get_catalog(images_dir, IMAGE_EXTENSIONS).probe_sizes()
+        resolutions = Counter(size for size in sizes.values() if size is not None)
+        result[split] = {
+            'images': len(sizes),
+            'unreadable': sorted(name for name, size in sizes.items() if size is None),
+            'resolutions': [{'width': w, 'height': h, 'images': n}
+                            for (w, h), n in resolutions.most_common(TOP_RESOLUTIONS)],
+        }
+    return result
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Report
+# ─────────────────────────────────────────────────────────────────────────────
+
+def build_report(dataset_folder, data: dict, masks: dict, class_names, images: dict) -> dict:
+    files = data['files']
+    splits = {}
+    for split, _ in files:
+        splits.setdefault(split, {'files': 0, 'rows': 0, 'issues': {issue: 0 for issue in ISSUES}})
+    for split, _ in files:
+        splits[split]['files'] += 1
+    row_splits = np.array([split for split, _ in files], dtype=object)[data['row_file']] if files else []
+    for split in splits:
+        in_split = row_splits == split
+        splits[split]['rows'] = int(np.count_nonzero(in_split))
+        for issue, mask in masks.items():
+            splits[split]['issues'][issue] = int(np.count_nonzero(mask & in_split))
+    for file_index, _ in data['bad_lines']:
+        splits[files[file_index][0]]['issues']['non_numeric'] += 1
+
+    entries = []
+    for issue, mask in masks.items():
+        for row in np.flatnonzero(mask).tolist():
+            file_index = int(data['row_file'][row])
+            entries.append((file_index, int(data['row_line'][row]), issue))
+    entries.extend((file_index, line, 'non_numeric') for file_index, line in data['bad_lines'])
+    entries.sort()
+
+    totals = {issue: sum(s['issues'][issue] for s in splits.values()) for issue in ISSUES}
+    return {
+        'dataset': os.path.abspath(dataset_folder),
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'num_classes': len(class_names) if class_names is not None else None,
+        'files': len(files),
+        'rows': int(len(data['row_len'])),
+        'totals': totals,
+        'splits': splits,
+        'unreadable': [{'file': files[i][1], 'error': error} for i, error in data['unreadable']],
+        'images': images,
+        'issues': [
+            {'split': files[i][0], 'file': os.path.relpath(files[i][1], dataset_folder),
+             'line': line, 'issue': issue}
+            for i, line, issue in entries
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Validate YOLO label files (bounds, areas, class ids, polygons, duplicates)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check train/valid/test and write validation_report.json
+  python validate_yolo_dataset.py ./my_dataset
+
+  # Use class names from a specific yaml and another report location
+  python validate_yolo_dataset.py ./my_dataset --yaml ./data.yaml --report ./report.json
+
+  # Clip out-of-bounds coordinates and remove broken rows (rewrites label files)
+  python validate_yolo_dataset.py ./my_dataset --fix
+        """
+    )
+    parser.add_argument('dataset_folder', help='Dataset folder with train/valid/test (or images/labels)')
+    parser.add_argument('--yaml', help='dataset.yaml with class names (default: dataset.yaml/data.yaml in the dataset folder)')
+    parser.add_argument('--subdirs', nargs='+', default=DEFAULT_SUBDIRS,
+                        help=f'Splits to check (default: {" ".join(DEFAULT_SUBDIRS)})')
+    parser.add_argument('--report', help=f'Report path (default: <dataset_folder>/{REPORT_NAME})')
+    parser.add_argument('--fix', action='store_true', help='Fix the label files in place')
+    parser.add_argument('--no-confirm', action='store_true', help='Skip confirmation prompt for --fix')
+    args = parser.parse_args()
+
+    folder = args.dataset_folder
+    if not os.path.isdir(folder):
+        print(f"Error: Dataset folder does not exist: {folder}")
+        sys.exit(1)
+
+    label_dirs = find_label_dirs(folder, args.subdirs)
+    if not label_dirs:
+        print(f"Error: No labels folders found in {folder}")
+        sys.exit(1)
+
+    yaml_path = args.yaml or find_dataset_yaml(folder)
+    class_names = None
+    if yaml_path:
+        try:
+            class_names = load_class_names(yaml_path)
+        except (OSError, yaml.YAMLError) as e:
+            print(f"Error reading {yaml_path}: {e}")
+            sys.exit(1)
+
+    print("=" * 50)
+    print("YOLO Dataset Validator")
+    print("=" * 50)
+    print(f"Splits: {', '.join(split for split, _ in label_dirs)}")
+    if class_names is not None:
+        print(f"Classes: {len(class_names)} (from {yaml_path})")
+    else:
+        print("Classes: no dataset.yaml found, class range check skipped")
+
+    start = time.perf_counter()
+    data = load_dataset_rows(label_dirs)
+    loaded = time.perf_counter()
+    num_classes = len(class_names) if class_names is not None else None
+    masks = check_rows(data, num_classes)
+    checked = time.perf_counter()
+
+    images = check_images(label_dirs)
+    report = build_report(folder, data, masks, class_names, images)
+    report_path = args.report or os.path.join(folder, REPORT_NAME)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Label files: {report['files']}   Rows: {report['rows']}")
+    print(f"Loaded in {loaded - start:.2f}s, checked in {checked - loaded:.2f}s")
+    for issue in ISSUES:
+        if report['totals'][issue]:
+            print(f"  {issue:<20} {report['totals'][issue]}")
+    for item in report['unreadable']:
+        print(f"  Unreadable: {item['file']} ({item['error']})")
+    for split, info in images.items():
+        common = info['resolutions'][0] if info['resolutions'] else None
+        line = f"Images ({split}): {info['images']}"
+        if common:
+            line += f", most common {common['width']}x{common['height']} ({common['images']} images)"
+        if info['unreadable']:
+            line += f", {len(info['unreadable'])} without a readable header"
+        print(line)
+    total_issues = sum(report['totals'].values())
+    print(f"Issues: {total_issues}")
+    print(f"Report: {report_path}")
+    print("=" * 50)
+
+    if not args.fix or total_issues == 0:
+        return
+
+    if not args.no_confirm:
+        confirm = input(f"Do you want to fix {total_issues} issues in place? (yes/no): ")
+        if confirm.lower() not in ['yes', 'y']:
+            print("Operation cancelled. No files were changed.")
+            return
+
+    n_files, n_clipped, n_removed = fix_dataset(data, masks, num_classes)
+    print(f"Files rewritten: {n_files}")
+    print(f"Rows clipped: {n_clipped}")
+    print(f"Rows removed: {n_removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,18 @@ Useful for creating subsets of your dataset for specific training purposes.
 """
 
 import os
-import shutil
 import argparse
 from pathlib import Path
 import sys
 
+import numpy as np
+
+from dataset_catalog import get_catalog
+from file_transfer import LINK_MODES, transfer_files
+from label_index import index_key, open_index
+from label_pack import update_pack
+from yolo_labels import read_label_file
+
 # ===== DEFAULT CONFIGURATION PARAMETERS =====
 # These can be overridden via command line arguments or by editing this section
 
@@ -34,6 +41,19 @@ DEFAULT_FILTER_MODE = "classes"
 # Default target classes to filter (only used when filter_mode = "classes") example [0, 1, 3] classes 0, 1 and 3 filtered
 DEFAULT_TARGET_CLASSES = [0]
 
+# Use the persistent label index (.label_index.sqlite in the dataset folder) instead of
+# reading every label file. Only changed label files are re-parsed on each run.
+DEFAULT_USE_INDEX = False
+
+# Read labels from packed <labels>.labelpack files (see label_pack.py) instead of opening
+# every label file. The pack is re-packed incrementally before the filter runs.
+DEFAULT_USE_PACK = False
+
+# How filtered images are written: "copy", "hardlink", "reflink", "symlink" or "auto".
+# Links/clones use no extra disk space and fall back to a copy across drives.
+# Labels are always copied.
+DEFAULT_LINK_MODE = "copy"
+
 # ===== END CONFIGURATION =====
 
 
@@ -69,22 +89,8 @@ def check_label_has_target_classes(label_path, target_classes):
         bool: True if file contains target classes, False otherwise
     """
     try:
-        with open(label_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-            
-        for line in lines:
-            line = line.strip()
-            if line:  # Skip empty lines
-                parts = line.split()
-                if len(parts) >= 1:  # At least class_id must be present
-                    try:
-                        class_id = int(parts[0])
-                        if class_id in target_classes:
-                            return True
-                    except ValueError:
-                        # If class_id is not an integer, skip this line
-                        continue
-        return False
+        class_ids = read_label_file(label_path).class_ids
+        return bool(np.isin(class_ids, target_classes).any())
         
     except Exception as e:
         print(f"Error reading {label_path}: {e}")
@@ -134,18 +140,65 @@ def find_matching_image(label_path, images_dir):
         Path or None: Path to matching image file, or None if not found
     """
     label_name = Path(label_path).stem  # Filename without extension
-    image_extensions = get_image_extensions()
     
-    for ext in image_extensions:
-        image_path = images_dir / f"{label_name}{ext}"
-        if image_path.exists():
-            return image_path
+    # One directory scan per images_dir, then a case-insensitive stem lookup
+    image_path = get_catalog(images_dir, get_image_extensions()).find(label_name)
+    return Path(image_path) if image_path else None
+
+
+def select_labels_from_index(index, labels_dir, filter_mode, target_classes):
+    """
+    Refresh the label index for a labels directory and return the matching label paths
+    
+    Args:
+        index (LabelIndex): Open label index
+        labels_dir (Path): Directory containing label files
+        filter_mode (str): Either "content" or "classes"
+        target_classes (list): List of target class IDs
+        
+    Returns:
+        set: Index keys (see label_index.index_key) of labels that should be copied
+    """
+    parsed, removed = index.refresh(labels_dir)
+    print(f"Label index refreshed: {parsed} parsed, {removed} removed")
+    
+    if filter_mode == "content":
+        return index.files_with_content(labels_dir)
+    elif filter_mode == "classes":
+        return index.files_with_classes(labels_dir, target_classes)
+    else:
+        print(f"Unknown filter mode: {filter_mode}")
+        return set()
+
+
+def select_labels_from_pack(labels_dir, filter_mode, target_classes):
+    """
+    Re-pack a labels directory and return the matching label paths
+    
+    Args:
+        labels_dir (Path): Directory containing label files
+        filter_mode (str): Either "content" or "classes"
+        target_classes (list): List of target class IDs
+        
+    Returns:
+        set: Index keys (see label_index.index_key) of labels that should be copied
+    """
+    pack = update_pack(labels_dir)
     
-    return None
+    if filter_mode == "content":
+        names = pack.files_with_content()
+    elif filter_mode == "classes":
+        names = pack.files_with_classes(target_classes)
+    else:
+        print(f"Unknown filter mode: {filter_mode}")
+        names = []
+    return {index_key(labels_dir / name) for name in names}
 
 
 def process_yolo_dataset(base_path, output_images_dir, output_labels_dir, 
-                        filter_mode, target_classes, subdirs_to_process):
+                        filter_mode, target_classes, subdirs_to_process,
+                        use_index=DEFAULT_USE_INDEX, use_pack=DEFAULT_USE_PACK,
+                        link_mode=DEFAULT_LINK_MODE):
     """
     Process the YOLO dataset and copy files based on filter criteria
     
@@ -156,11 +209,16 @@ def process_yolo_dataset(base_path, output_images_dir, output_labels_dir,
         filter_mode (str): Filter mode ("content" or "classes")
         target_classes (list): List of target class IDs
         subdirs_to_process (list): List of subdirectories to process
+        use_index (bool): Answer the filter from the persistent label index
+        use_pack (bool): Answer the filter from the packed label file
+        link_mode (str): How images are written (see file_transfer.LINK_MODES)
     """
     # Create output directories
     output_images_dir.mkdir(exist_ok=True)
     output_labels_dir.mkdir(exist_ok=True)
     
+    index = open_index(base_path) if use_index else None
+    
     total_copied = 0
     total_processed = 0
     
@@ -178,30 +236,31 @@ def process_yolo_dataset(base_path, output_images_dir, output_labels_dir,
         
         print(f"\nProcessing {subdir} directory...")
         
+        selected = None
+        if index is not None:
+            selected = select_labels_from_index(index, labels_dir, filter_mode, target_classes)
+        elif use_pack:
+            selected = select_labels_from_pack(labels_dir, filter_mode, target_classes)
+        
+        # Pairs are collected first and transferred concurrently afterwards
+        copy_pairs = []
+        
         # Loop through all label files
         for label_file in labels_dir.glob("*.txt"):
             total_processed += 1
             
             # Check if label meets filter criteria
-            if should_copy_label(label_file, filter_mode, target_classes):
+            if selected is not None:
+                copy_label = index_key(label_file) in selected
+            else:
+                copy_label = should_copy_label(label_file, filter_mode, target_classes)
+            
+            if copy_label:
                 # Find corresponding image
                 image_file = find_matching_image(label_file, images_dir)
                 
                 if image_file:
-                    try:
-                        # Copy label to output labels directory
-                        target_label = output_labels_dir / label_file.name
-                        shutil.copy2(label_file, target_label)
-                        
-                        # Copy image to output images directory
-                        target_image = output_images_dir / image_file.name
-                        shutil.copy2(image_file, target_image)
-                        
-                        print(f"Copied: {label_file.name} + {image_file.name}")
-                        total_copied += 1
-                        
-                    except Exception as e:
-                        print(f"Error copying {label_file.name}: {e}")
+                    copy_pairs.append((label_file, image_file))
                 else:
                     print(f"No matching image found for {label_file.name}")
             else:
@@ -209,6 +268,25 @@ def process_yolo_dataset(base_path, output_images_dir, output_labels_dir,
                     print(f"Label {label_file.name} is empty, skipping...")
                 elif filter_mode == "classes":
                     print(f"Label {label_file.name} does not contain target classes {target_classes}, skipping...")
+        
+        # Copy labels to the output labels directory, copy (or link) images to the output images directory
+        jobs = []
+        for label_file, image_file in copy_pairs:
+            jobs.append((label_file, output_labels_dir / label_file.name, "copy"))
+            jobs.append((image_file, output_images_dir / image_file.name, link_mode))
+        report = transfer_files(jobs, desc=subdir)
+        
+        failed = {src for src, _, _ in report.failures}
+        for label_file, image_file in copy_pairs:
+            if str(label_file) in failed or str(image_file) in failed:
+                error = next(e for src, _, e in report.failures if src in (str(label_file), str(image_file)))
+                print(f"Error copying {label_file.name}: {error}")
+            else:
+                print(f"Copied: {label_file.name} + {image_file.name}")
+                total_copied += 1
+    
+    if index is not None:
+        index.close()
     
     print(f"\n=== CONFIGURATION ===")
     print(f"Filter mode: {filter_mode}")
@@ -217,6 +295,7 @@ def process_yolo_dataset(base_path, output_images_dir, output_labels_dir,
     print(f"=== SUMMARY ===")
     print(f"Total processed labels: {total_processed}")
     print(f"Total copied pairs: {total_copied}")
+    print(f"Image mode: {link_mode}")
     print(f"Output images directory: {output_images_dir}")
     print(f"Output labels directory: {output_labels_dir}")
 
@@ -329,6 +408,15 @@ Examples:
   # Filter by multiple classes
   python yolo_filter.py --input /path/to/dataset --mode classes --classes 0 1 2
   
+  # Use the persistent label index (fast repeat runs)
+  python yolo_filter.py --input /path/to/dataset --mode classes --classes 3 --use-index
+  
+  # Use the packed label files (no per-label open on network shares)
+  python yolo_filter.py --input /path/to/dataset --mode classes --classes 3 --use-pack
+  
+  # Hardlink images instead of copying them (no extra disk space)
+  python yolo_filter.py --input /path/to/dataset --mode content --link-mode hardlink
+  
   # Specify custom output directories
   python yolo_filter.py --input /path/to/dataset --output-images my_images --output-labels my_labels
         """
@@ -372,6 +460,24 @@ Examples:
         help=f'Subdirectories to process (default: {DEFAULT_SUBDIRS_TO_PROCESS})'
     )
     
+    parser.add_argument(
+        '--use-index',
+        action='store_true',
+        help='Use the persistent label index in the dataset folder (only changed labels are re-read)'
+    )
+    
+    parser.add_argument(
+        '--use-pack',
+        action='store_true',
+        help='Read labels from packed <labels>.labelpack files (re-packed incrementally)'
+    )
+    
+    parser.add_argument(
+        '--link-mode',
+        choices=LINK_MODES,
+        help=f'How images are written: copy, hardlink, reflink, symlink or auto (default: {DEFAULT_LINK_MODE})'
+    )
+    
     parser.add_argument(
         '--no-confirm',
         action='store_true',
@@ -408,6 +514,9 @@ def main():
         output_images_dir = dataset_path / user_input['output_images']
         output_labels_dir = dataset_path / user_input['output_labels']
         subdirs = user_input['subdirs']
+        use_index = DEFAULT_USE_INDEX
+        use_pack = DEFAULT_USE_PACK
+        link_mode = DEFAULT_LINK_MODE
         no_confirm = False
         
     else:
@@ -425,6 +534,9 @@ def main():
         output_images_dir = dataset_path / output_images_name
         output_labels_dir = dataset_path / output_labels_name
         subdirs = args.subdirs if args.subdirs else DEFAULT_SUBDIRS_TO_PROCESS
+        use_index = args.use_index or DEFAULT_USE_INDEX
+        use_pack = args.use_pack or DEFAULT_USE_PACK
+        link_mode = args.link_mode if args.link_mode else DEFAULT_LINK_MODE
         no_confirm = args.no_confirm
     
     # Display configuration
@@ -437,6 +549,9 @@ def main():
     print(f"Output images directory: {output_images_dir.name}")
     print(f"Output labels directory: {output_labels_dir.name}")
     print(f"Subdirectories to process: {subdirs}")
+    print(f"Use label index: {use_index}")
+    print(f"Use label pack: {use_pack}")
+    print(f"Image mode: {link_mode}")
     
     # Confirmation prompt (unless --no-confirm is used or we're in interactive mode that already confirmed)
     if not no_confirm:
@@ -452,7 +567,10 @@ def main():
             output_labels_dir,
             filter_mode,
             target_classes,
-            subdirs
+            subdirs,
+            use_index,
+            use_pack,
+            link_mode
         )
         print("\nScript executed successfully!")
         
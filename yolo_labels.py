@@ -0,0 +1,213 @@
+"""
+YOLO Label Parser
+
+Shared, vectorized reader for YOLO label files (.txt). A whole file is read in
+one pass and returned as compact NumPy arrays instead of per-line Python lists:
+
+    class_ids    : int16   (N,)      class id per object
+    boxes        : float32 (N, 4)    x_center y_center width height (normalised)
+    poly_coords  : float32 (M,)      flat x1 y1 x2 y2 ... buffer of all polygons
+    poly_offsets : int64   (N + 1,)  row i uses poly_coords[poly_offsets[i]:poly_offsets[i + 1]]
+
+Both label flavours are supported and may be mixed in one file:
+    bbox         : <class_id> x_center y_center width height
+    segmentation : <class_id> x1 y1 x2 y2 x3 y3 ...
+
+For segmentation rows the box is derived from the polygon extremes; for bbox
+rows the polygon span is empty. Empty lines and '#' comments are ignored,
+malformed lines (non-numeric values, odd coordinate count, too few values,
+a class id that is negative, not an integer or above MAX_CLASS_ID) are skipped
+and counted in `n_bad`.
+
+Usage:
+    from yolo_labels import read_label_file
+    labels = read_label_file("image_001.txt")
+    print(labels.class_ids, labels.boxes)
+"""
+
+from typing import NamedTuple
+
+import numpy as np  # pip install numpy
+
+MAX_CLASS_ID = np.iinfo(np.int16).max  # class ids are stored as int16
+
+
+class LabelArrays(NamedTuple):
+    class_ids: np.ndarray     # int16   (N,)
+    boxes: np.ndarray         # float32 (N, 4)
+    poly_coords: np.ndarray   # float32 (M,)
+    poly_offsets: np.ndarray  # int64   (N + 1,)
+    n_bad: int                # non-empty lines that could not be parsed
+
+    def __len__(self) -> int:
+        return len(self.class_ids)
+
+    @property
+    def num_points(self) -> np.ndarray:
+        """Number of polygon points per row (0 for bbox rows)."""
+        return np.diff(self.poly_offsets) // 2
+
+    @property
+    def is_polygon(self) -> np.ndarray:
+        """Boolean mask of rows that came from a segmentation line."""
+        return np.diff(self.poly_offsets) > 0
+
+    def polygon(self, i: int) -> np.ndarray:
+        """Return the polygon of row i as a (K, 2) float32 array (K=0 for bbox rows)."""
+        return self.poly_coords[self.poly_offsets[i]:self.poly_offsets[i + 1]].reshape(-1, 2)
+
+
+def empty_labels(n_bad: int = 0) -> LabelArrays:
+    return LabelArrays(
+        class_ids=np.zeros(0, dtype=np.int16),
+        boxes=np.zeros((0, 4), dtype=np.float32),
+        poly_coords=np.zeros(0, dtype=np.float32),
+        poly_offsets=np.zeros(1, dtype=np.int64),
+        n_bad=n_bad,
+    )
+
+
+def split_rows_with_lines(text: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[int]]:
+    """
+    Tokenize label text into a flat float32 value buffer, keeping line numbers.
+
+    Returns (lengths, values, line_numbers, bad_lines): lengths[i] is the number of
+    values on row i (class id included), values holds all rows back to back,
+    line_numbers[i] is the 1-based source line of row i and bad_lines lists the
+    lines with non-numeric values (those rows are dropped).
+    """
+    rows, line_numbers = [], []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        tokens = line.split()
+        if tokens and not tokens[0].startswith('#'):
+            rows.append(tokens)
+            line_numbers.append(line_no)
+
+    if not rows:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32),
+                np.zeros(0, dtype=np.int64), [])
+
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+    try:
+        # One C-level string -> float conversion for the whole file
+        values = np.array([t for r in rows for t in r], dtype=np.float32)
+        return lengths, values, np.array(line_numbers, dtype=np.int64), []
+    except ValueError:
+        pass
+
+    # Slow path: at least one line contains a non-numeric token
+    kept_lengths, kept_values, kept_lines, bad_lines = [], [], [], []
+    for tokens, line_no in zip(rows, line_numbers):
+        try:
+            kept_values.append(np.array(tokens, dtype=np.float32))
+            kept_lengths.append(len(tokens))
+            kept_lines.append(line_no)
+        except ValueError:
+            bad_lines.append(line_no)
+    if not kept_values:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32),
+                np.zeros(0, dtype=np.int64), bad_lines)
+    return (np.array(kept_lengths, dtype=np.int64), np.concatenate(kept_values),
+            np.array(kept_lines, dtype=np.int64), bad_lines)
+
+
+def split_rows(text: str) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Tokenize label text into a flat float32 value buffer.
+
+    Returns (lengths, values, n_bad) where lengths[i] is the number of values on
+    row i (class id included) and values holds all rows back to back. Rows with
+    non-numeric values are dropped and counted in n_bad.
+    """
+    lengths, values, _, bad_lines = split_rows_with_lines(text)
+    return lengths, values, len(bad_lines)
+
+
+def polygon_boxes(poly_coords: np.ndarray, poly_offsets: np.ndarray) -> np.ndarray:
+    """
+    Compute xywh boxes for every polygon span at once (segmented min/max).
+
+    Spans of length 0 get a zero box.
+    """
+    n_rows = len(poly_offsets) - 1
+    boxes = np.zeros((n_rows, 4), dtype=np.float32)
+    spans = np.diff(poly_offsets)
+    has_poly = spans > 0
+    if not has_poly.any():
+        return boxes
+
+    xs = poly_coords[0::2]
+    ys = poly_coords[1::2]
+    starts = poly_offsets[:-1][has_poly] // 2
+
+    x_min = np.minimum.reduceat(xs, starts)
+    x_max = np.maximum.reduceat(xs, starts)
+    y_min = np.minimum.reduceat(ys, starts)
+    y_max = np.maximum.reduceat(ys, starts)
+
+    boxes[has_poly, 0] = (x_min + x_max) / 2.0
+    boxes[has_poly, 1] = (y_min + y_max) / 2.0
+    boxes[has_poly, 2] = x_max - x_min
+    boxes[has_poly, 3] = y_max - y_min
+    return boxes
+
+
+def parse_label_text(text: str) -> LabelArrays:
+    """Parse the full contents of a YOLO label file into LabelArrays."""
+    lengths, values, n_bad = split_rows(text)
+    if len(lengths) == 0:
+        return empty_labels(n_bad)
+
+    row_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    n_coords = lengths - 1
+
+    # bbox rows: exactly 4 values; polygon rows: >= 3 points and an even count
+    is_bbox = n_coords == 4
+    is_poly = (n_coords >= 6) & (n_coords % 2 == 0) & ~is_bbox
+    # The class id must be a whole number that fits in int16 (7.9 is not class 7)
+    classes = values[row_starts]
+    good_class = (classes >= 0) & (classes <= MAX_CLASS_ID) & (classes == np.floor(classes))
+    valid = (is_bbox | is_poly) & good_class
+    n_bad += int((~valid).sum())
+
+    row_starts = row_starts[valid]
+    n_coords = n_coords[valid]
+    is_bbox = is_bbox[valid]
+    is_poly = is_poly[valid]
+
+    class_ids = values[row_starts].astype(np.int16)
+
+    # Gather all polygon coordinates into one flat buffer
+    poly_lengths = np.where(is_poly, n_coords, 0)
+    poly_offsets = np.zeros(len(n_coords) + 1, dtype=np.int64)
+    np.cumsum(poly_lengths, out=poly_offsets[1:])
+    if poly_offsets[-1]:
+        src_starts = row_starts[is_poly] + 1
+        src_lengths = poly_lengths[is_poly]
+        gather = np.repeat(src_starts - poly_offsets[:-1][is_poly], src_lengths) + np.arange(poly_offsets[-1])
+        poly_coords = values[gather]
+    else:
+        poly_coords = np.zeros(0, dtype=np.float32)
+
+    boxes = polygon_boxes(poly_coords, poly_offsets)
+    if is_bbox.any():
+        bbox_starts = row_starts[is_bbox] + 1
+        boxes[is_bbox] = values[bbox_starts[:, None] + np.arange(4)]
+
+    return LabelArrays(class_ids, boxes, poly_coords, poly_offsets, n_bad)
+
+
+def read_label_file(label_path) -> LabelArrays:
+    """Read and parse a YOLO label file. Raises OSError if the file cannot be read."""
+    with open(label_path, 'r', encoding='utf-8', errors='replace') as f:
+        return parse_label_text(f.read())
+
+
+def format_bbox_lines(class_ids: np.ndarray, boxes: np.ndarray) -> str:
+    """Format class ids + xywh boxes as YOLO bbox lines (with trailing newline, '' if empty)."""
+    if len(class_ids) == 0:
+        return ""
+    return "".join(
+        f"{c} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n"
+        for c, (x, y, w, h) in zip(class_ids.tolist(), boxes.tolist())
+    )